@@ -1,18 +1,90 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.container import ServiceContainer
+from app.core.circuit_breaker import breaker
+from app.core.config import settings
+from app.utils.exceptions import DatabaseUnavailableException, ForbiddenException
 from app.services.auth import AuthService
-from typing import Dict
+from app.services.organization import OrganizationService
+from app.services.usage import UsageService
+from app.services.idempotency import IdempotencyService
+from app.services.search import SearchService
+from app.services.stats import StatsService
+from app.services.indexes import TenantIndexService
+from app.services.documents import TenantDocumentService
+from typing import Dict, Optional
+import hmac
 
 security = HTTPBearer()
 
 
+def require_database():
+    """Dependency failing fast with 503 while the database circuit breaker is open"""
+    if settings.DB_BREAKER_ENABLED and not breaker.allow():
+        breaker.reject()
+        raise DatabaseUnavailableException(breaker.retry_after())
+
+
+def get_container(request: Request) -> ServiceContainer:
+    """Dependency to get the application-scoped service container"""
+    return request.app.state.container
+
+
+def get_org_service(container: ServiceContainer = Depends(get_container)) -> OrganizationService:
+    """Dependency to get the shared organization service"""
+    return container.org_service
+
+
+def get_auth_service(container: ServiceContainer = Depends(get_container)) -> AuthService:
+    """Dependency to get the shared auth service"""
+    return container.auth_service
+
+
+def get_usage_service(container: ServiceContainer = Depends(get_container)) -> UsageService:
+    """Dependency to get the shared usage accounting service"""
+    return container.usage
+
+
+def get_idempotency_service(container: ServiceContainer = Depends(get_container)) -> IdempotencyService:
+    """Dependency to get the shared Idempotency-Key service"""
+    return container.idempotency
+
+
+def get_search_service(container: ServiceContainer = Depends(get_container)) -> SearchService:
+    """Dependency to get the shared organization search index"""
+    return container.search
+
+
+def get_stats_service(container: ServiceContainer = Depends(get_container)) -> StatsService:
+    """Dependency to get the shared storage statistics service"""
+    return container.stats
+
+
+def get_index_service(container: ServiceContainer = Depends(get_container)) -> TenantIndexService:
+    """Dependency to get the shared tenant index service"""
+    return container.indexes
+
+
+def get_document_service(container: ServiceContainer = Depends(get_container)) -> TenantDocumentService:
+    """Dependency to get the shared tenant document service"""
+    return container.documents
+
+
+def require_operator(operator_key: Optional[str] = Header(None, alias="X-Operator-Key")):
+    """Dependency guarding cross-tenant endpoints with the OPERATOR_API_KEY shared secret"""
+    if not settings.OPERATOR_API_KEY:
+        raise ForbiddenException("Operator endpoints are disabled")
+    if not operator_key or not hmac.compare_digest(operator_key.encode(), settings.OPERATOR_API_KEY.encode()):
+        raise ForbiddenException("Invalid operator key")
+
+
 async def get_current_admin(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Dict:
     """Dependency to get current authenticated admin from JWT token"""
     
     token = credentials.credentials
-    auth_service = AuthService()
     
     try:
         payload = await auth_service.verify_token(token)
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Depends, Request, status
 from app.schemas.auth import LoginRequest, LoginResponse
 from app.services.auth import AuthService
+from app.api.deps import get_auth_service
+from app.middleware.rate_limit import check_rate_limit
+from app.middleware.login_throttle import login_throttle, check_login_throttle
+from app.utils.exceptions import UnauthorizedException
 
 router = APIRouter()
 
@@ -10,9 +14,14 @@ router = APIRouter()
     response_model=LoginResponse,
     status_code=status.HTTP_200_OK,
     summary="Admin Login",
-    description="Authenticate admin user and receive JWT token"
+    description="Authenticate admin user and receive JWT token",
+    dependencies=[Depends(check_rate_limit)]
 )
-async def admin_login(request: LoginRequest):
+async def admin_login(
+    request: LoginRequest,
+    http_request: Request,
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """
     Admin login endpoint that validates credentials and returns JWT token.
     
@@ -20,6 +29,20 @@ async def admin_login(request: LoginRequest):
     - **password**: Admin password
     
     Returns JWT token containing admin and organization information.
+    Repeated failures for an email or IP are locked out with exponential backoff (429).
     """
-    auth_service = AuthService()
-    return await auth_service.login(request)
+    client_ip = http_request.client.host
+    check_login_throttle(request.email, http_request)
+    
+    try:
+        response = await auth_service.login(request)
+    except UnauthorizedException:
+        # The reserved attempt stands as the failure
+        raise
+    except BaseException:
+        # Not a wrong password (database error, deadline...): give the attempt back
+        login_throttle.release(request.email, client_ip)
+        raise
+    
+    login_throttle.record_success(request.email, client_ip)
+    return response
@@ -1,18 +1,67 @@
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, Header, Request, Response, status, Query
 from app.schemas.organization import (
     CreateOrganizationRequest,
     UpdateOrganizationRequest,
     OrganizationResponse,
-    DeleteOrganizationRequest
+    BatchGetOrganizationsRequest,
+    BatchGetOrganizationsResponse,
+    DeleteOrganizationRequest,
+    UsageResponse,
+    OrganizationSearchResponse,
+    StorageStats,
+    AllStorageStatsResponse,
+    CreateIndexRequest,
+    IndexResponse,
+    IndexListResponse,
+    BulkWriteRequest,
+    BulkWriteResponse,
+    DocumentQueryRequest
 )
 from app.services.organization import OrganizationService
-from app.api.deps import get_current_admin
+from app.services.usage import UsageService
+from app.services.idempotency import IdempotencyService
+from app.services.search import SearchService
+from app.services.stats import StatsService
+from app.services.indexes import TenantIndexService
+from app.services.documents import TenantDocumentService, raw_bytes
+from app.api.deps import (
+    get_current_admin,
+    get_org_service,
+    get_usage_service,
+    get_idempotency_service,
+    get_search_service,
+    get_stats_service,
+    get_index_service,
+    get_document_service,
+    require_operator
+)
 from app.middleware.rate_limit import check_rate_limit
-from typing import Dict
+from app.core.config import settings
+from app.utils.conditional import is_not_modified, format_http_date
+from app.utils.exceptions import DocumentNotFoundException
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from typing import Dict, Optional
+from datetime import datetime
 
 router = APIRouter()
 
 
+BSON_MEDIA_TYPE = "application/bson"
+
+
+def _wants_bson(request: Request) -> bool:
+    return BSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _cache_headers(etag: str, last_modified: datetime) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_http_date(last_modified),
+        "Cache-Control": f"public, max-age={settings.ORG_CACHE_MAX_AGE_SECONDS}"
+    }
+
+
 @router.post(
     "/create",
     response_model=OrganizationResponse,
@@ -21,7 +70,12 @@ router = APIRouter()
     description="Create new organization with admin user and dynamic collection",
     dependencies=[Depends(check_rate_limit)]
 )
-async def create_organization(request: CreateOrganizationRequest):
+async def create_organization(
+    request: CreateOrganizationRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+    org_service: OrganizationService = Depends(get_org_service),
+    idempotency: IdempotencyService = Depends(get_idempotency_service)
+):
     """
     Create a new organization with the following:
     
@@ -34,9 +88,17 @@ async def create_organization(request: CreateOrganizationRequest):
     2. Create a dynamic MongoDB collection for the organization
     3. Create an admin user with hashed password
     4. Store metadata in master database
+    
+    Send an `Idempotency-Key` header to make retries safe: a repeat with the same key
+    and body returns the original response instead of creating again.
     """
-    org_service = OrganizationService()
-    return await org_service.create_organization(request)
+    return await idempotency.run(
+        "POST /org/create",
+        idempotency_key,
+        request,
+        lambda: org_service.create_organization(request),
+        status_code=status.HTTP_201_CREATED
+    )
 
 
 @router.get(
@@ -48,7 +110,10 @@ async def create_organization(request: CreateOrganizationRequest):
     dependencies=[Depends(check_rate_limit)]
 )
 async def get_organization(
-    organization_name: str = Query(..., description="Name of the organization to retrieve")
+    request: Request,
+    response: Response,
+    organization_name: str = Query(..., description="Name of the organization to retrieve"),
+    org_service: OrganizationService = Depends(get_org_service)
 ):
     """
     Get organization details from master database.
@@ -56,9 +121,76 @@ async def get_organization(
     - **organization_name**: Name of the organization
     
     Returns organization metadata including collection name and admin email.
+    Responses carry `ETag`, `Last-Modified` and `Cache-Control`; send `If-None-Match`
+    or `If-Modified-Since` to get `304 Not Modified` when nothing changed.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match or if_modified_since:
+        # Answer revalidations from the version fields alone
+        etag, last_modified = await org_service.get_validators(organization_name)
+        if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers=_cache_headers(etag, last_modified)
+            )
+    
+    org, etag, last_modified = await org_service.get_organization_versioned(organization_name)
+    response.headers.update(_cache_headers(etag, last_modified))
+    return org
+
+
+@router.post(
+    "/batch-get",
+    response_model=BatchGetOrganizationsResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get Organizations",
+    description="Retrieve details of many organizations by name in one request",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def batch_get_organizations(
+    request: BatchGetOrganizationsRequest,
+    org_service: OrganizationService = Depends(get_org_service)
+):
+    """
+    Get details of several organizations from the master database.
+    
+    - **names**: Organization names, at most `ORG_BATCH_GET_MAX_NAMES` distinct ones
+    
+    Organizations and their admins are resolved with a single database query. Results follow
+    the order of `names` (duplicates listed once); names with no live organization come back
+    with `found: false`.
     """
-    org_service = OrganizationService()
-    return await org_service.get_organization(organization_name)
+    return await org_service.get_organizations(request.names)
+
+
+@router.get(
+    "/search",
+    response_model=OrganizationSearchResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Search Organizations",
+    description="Prefix and typo-tolerant search over organization names and admin emails, for operators",
+    dependencies=[Depends(check_rate_limit), Depends(require_operator)]
+)
+async def search_organizations(
+    q: str = Query(..., min_length=3, max_length=100, description="Search text"),
+    limit: int = Query(10, ge=1, le=settings.SEARCH_MAX_RESULTS, description="Maximum number of results"),
+    search_service: SearchService = Depends(get_search_service)
+):
+    """
+    Search organizations by name or admin email.
+    
+    - **q**: Search text; matches whole names, name parts and email prefixes
+    - **limit**: Maximum number of results (default 10)
+    
+    Exact matches come first, then prefix matches (shortest first), then names within
+    one or two typos. Answered from an in-memory index; organizations created or renamed
+    through another server process may take up to a minute to appear.
+    
+    **Requires the `X-Operator-Key` header to match `OPERATOR_API_KEY`**, since results
+    span every tenant and include admin emails.
+    """
+    return {"query": q, "results": search_service.search(q, limit)}
 
 
 @router.put(
@@ -71,7 +203,10 @@ async def get_organization(
 )
 async def update_organization(
     request: UpdateOrganizationRequest,
-    current_admin: Dict = Depends(get_current_admin)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+    current_admin: Dict = Depends(get_current_admin),
+    org_service: OrganizationService = Depends(get_org_service),
+    idempotency: IdempotencyService = Depends(get_idempotency_service)
 ):
     """
     Update organization with new name (authenticated endpoint).
@@ -87,10 +222,16 @@ async def update_organization(
     4. Update metadata in master database
     5. Delete old collection
     
+    Accepts an `Idempotency-Key` header, like create.
+    
     **Requires JWT token in Authorization header.**
     """
-    org_service = OrganizationService()
-    return await org_service.update_organization(request, current_admin["email"])
+    return await idempotency.run(
+        f"PUT /org/update:{current_admin['admin_id']}",
+        idempotency_key,
+        request,
+        lambda: org_service.update_organization(request, current_admin["email"])
+    )
 
 
 @router.delete(
@@ -102,7 +243,10 @@ async def update_organization(
 )
 async def delete_organization(
     request: DeleteOrganizationRequest,
-    current_admin: Dict = Depends(get_current_admin)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+    current_admin: Dict = Depends(get_current_admin),
+    org_service: OrganizationService = Depends(get_org_service),
+    idempotency: IdempotencyService = Depends(get_idempotency_service)
 ):
     """
     Delete organization and all its associated data (authenticated endpoint).
@@ -111,12 +255,296 @@ async def delete_organization(
     
     This will:
     1. Verify admin owns this organization
-    2. Delete the dynamic collection
-    3. Delete admin user
-    4. Delete organization metadata
+    2. Mark the organization as deleted (it disappears immediately)
+    3. Drop the dynamic collection, admin user and metadata in the background
+    
+    Accepts an `Idempotency-Key` header, like create.
     
     **Requires JWT token in Authorization header.**
     **Only the organization's admin can delete it.**
     """
-    org_service = OrganizationService()
-    return await org_service.delete_organization(request.organization_name, current_admin["email"])
+    return await idempotency.run(
+        f"DELETE /org/delete:{current_admin['admin_id']}",
+        idempotency_key,
+        request,
+        lambda: org_service.delete_organization(request.organization_name, current_admin["email"])
+    )
+
+
+@router.get(
+    "/usage",
+    response_model=UsageResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get Organization Usage",
+    description="Daily request counts, latency and bytes served for the caller's organization",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def get_usage(
+    days: int = Query(30, ge=1, le=366, description="Number of days to return, including today"),
+    current_admin: Dict = Depends(get_current_admin),
+    usage_service: UsageService = Depends(get_usage_service)
+):
+    """
+    Get usage of the organization in the JWT token (authenticated endpoint).
+    
+    - **days**: Number of days to return, including today (1-366, default 30)
+    
+    Counters are kept in memory by each server process and written every
+    `USAGE_FLUSH_INTERVAL_SECONDS`. The response adds only this process's unwritten
+    counters, so the latest interval's totals are approximate.
+    
+    **Requires JWT token in Authorization header.**
+    """
+    return {
+        "organization_name": current_admin["organization_name"],
+        "days": await usage_service.get_usage(current_admin["organization_id"], days)
+    }
+
+
+@router.get(
+    "/stats",
+    response_model=StorageStats,
+    status_code=status.HTTP_200_OK,
+    summary="Get Organization Storage Statistics",
+    description="Document count and data, storage and index sizes of the caller's organization",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def get_stats(
+    current_admin: Dict = Depends(get_current_admin),
+    stats_service: StatsService = Depends(get_stats_service)
+):
+    """
+    Get storage statistics of the organization in the JWT token (authenticated endpoint).
+    
+    Sizes are in bytes, from `$collStats`. For organizations in the shared collection
+    `size` is the total BSON size of their documents and the on-disk sizes are null.
+    Results are cached for `STATS_CACHE_TTL_SECONDS`; `generated_at` tells their age.
+    
+    **Requires JWT token in Authorization header.**
+    """
+    return await stats_service.get_organization_stats(current_admin)
+
+
+@router.get(
+    "/stats/all",
+    response_model=AllStorageStatsResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get Storage Statistics of All Organizations",
+    description="Storage statistics of every organization, for operators",
+    dependencies=[Depends(check_rate_limit), Depends(require_operator)]
+)
+async def get_all_stats(stats_service: StatsService = Depends(get_stats_service)):
+    """
+    Get storage statistics of every organization (operator endpoint).
+    
+    Collections are queried at most `STATS_CONCURRENCY` at a time and the report is
+    cached for `STATS_CACHE_TTL_SECONDS`. An organization whose statistics could not
+    be read carries an `error` instead of sizes.
+    
+    **Requires the `X-Operator-Key` header to match `OPERATOR_API_KEY`.**
+    """
+    return await stats_service.get_all_stats()
+
+
+@router.post(
+    "/indexes",
+    response_model=IndexResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Create Collection Index",
+    description="Declare a secondary index on the caller's organization collection; it is built in the background",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def create_index(
+    request: CreateIndexRequest,
+    current_admin: Dict = Depends(get_current_admin),
+    index_service: TenantIndexService = Depends(get_index_service)
+):
+    """
+    Declare an index on the organization's collection (authenticated endpoint).
+    
+    - **keys**: Fields in order, each with `direction` 1 (ascending) or -1 (descending); dotted paths allowed
+    - **name**: Optional index name (letters, digits, `_` and `-`); derived from the keys if omitted
+    - **unique** / **sparse**: Index options
+    
+    Returns `202 Accepted` with status `building`; follow progress with `GET /org/indexes`.
+    At most `TENANT_MAX_INDEXES` indexes per organization. Declared indexes are rebuilt
+    automatically when the organization is renamed.
+    
+    **Requires JWT token in Authorization header.**
+    """
+    return await index_service.declare(current_admin, request)
+
+
+@router.get(
+    "/indexes",
+    response_model=IndexListResponse,
+    status_code=status.HTTP_200_OK,
+    summary="List Collection Indexes",
+    description="Declared indexes of the caller's organization collection with their build status",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def list_indexes(
+    current_admin: Dict = Depends(get_current_admin),
+    index_service: TenantIndexService = Depends(get_index_service)
+):
+    """
+    List the organization's declared indexes (authenticated endpoint).
+    
+    Each index is `building` (with `progress` when the server reports it), `ready`,
+    or `failed` with the build `error` (for example duplicates under a unique index).
+    
+    **Requires JWT token in Authorization header.**
+    """
+    return {
+        "organization_name": current_admin["organization_name"],
+        "limit": settings.TENANT_MAX_INDEXES,
+        "indexes": await index_service.list_indexes(current_admin)
+    }
+
+
+@router.delete(
+    "/indexes/{name}",
+    status_code=status.HTTP_200_OK,
+    summary="Drop Collection Index",
+    description="Drop a declared index from the caller's organization collection",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def drop_index(
+    name: str,
+    current_admin: Dict = Depends(get_current_admin),
+    index_service: TenantIndexService = Depends(get_index_service)
+):
+    """
+    Drop a declared index, aborting its build if it is still running (authenticated endpoint).
+    
+    **Requires JWT token in Authorization header.**
+    """
+    await index_service.drop(current_admin, name)
+    return {"message": f"Index '{name}' dropped"}
+
+
+@router.post(
+    "/documents/bulk",
+    response_model=BulkWriteResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Write Documents",
+    description="Insert, update and delete documents in the caller's organization collection in one batch",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def write_documents(
+    request: BulkWriteRequest,
+    current_admin: Dict = Depends(get_current_admin),
+    document_service: TenantDocumentService = Depends(get_document_service)
+):
+    """
+    Apply a batch of writes to the organization's collection (authenticated endpoint).
+    
+    Each operation has an `op`:
+    - **insert**: `document` to insert; an `_id` is assigned if missing
+    - **update**: `filter` and `update` (operators only, e.g. `$set`), optional `upsert`; `many` updates every match
+    - **delete**: `filter`; `many` deletes every match
+    
+    Values may use Extended JSON (`{"$oid": ...}`, `{"$date": ...}`). A single write is a batch of one.
+    With `ordered` (default) the batch stops at the first failure; otherwise the rest still run.
+    Failures are listed in `errors` by operation index. At most `DOCUMENTS_MAX_BULK_OPERATIONS` operations.
+    
+    **Requires JWT token in Authorization header.**
+    """
+    return await document_service.bulk_write(current_admin, request.operations, request.ordered)
+
+
+@router.post(
+    "/documents/query",
+    status_code=status.HTTP_200_OK,
+    summary="Query Documents",
+    description="Page through documents of the caller's organization collection matching a filter",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def query_documents(
+    request: DocumentQueryRequest,
+    http_request: Request,
+    current_admin: Dict = Depends(get_current_admin),
+    document_service: TenantDocumentService = Depends(get_document_service)
+):
+    """
+    Query the organization's collection (authenticated endpoint).
+    
+    - **filter**: MongoDB query filter (`$where`, `$function` and `$accumulator` are rejected)
+    - **projection**: Optional projection; `_id` is always returned
+    - **batch_size**: Documents per page, capped at `DOCUMENTS_MAX_BATCH_SIZE`
+    - **cursor**: `next_cursor` from the previous page
+    - **direction**: `1` for ascending `_id`, `-1` for descending
+    
+    Pages are keyed on `_id`, so they stay stable while documents are written. The response is
+    Relaxed Extended JSON; with `Accept: application/bson` it is the documents' BSON back to back,
+    copied from the server without decoding, with the next cursor in `X-Next-Cursor`.
+    
+    **Requires JWT token in Authorization header.**
+    """
+    documents, next_cursor, batch_size = await document_service.query(
+        current_admin,
+        request.filter,
+        request.projection,
+        request.batch_size,
+        request.cursor,
+        request.direction
+    )
+    if _wants_bson(http_request):
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return Response(b"".join(raw_bytes(document) for document in documents), media_type=BSON_MEDIA_TYPE, headers=headers)
+    body = json_util.dumps(
+        {"documents": documents, "next_cursor": next_cursor, "batch_size": batch_size},
+        json_options=RELAXED_JSON_OPTIONS
+    )
+    return Response(body, media_type="application/json")
+
+
+@router.get(
+    "/documents/{document_id}",
+    status_code=status.HTTP_200_OK,
+    summary="Get Document",
+    description="Fetch one document of the caller's organization collection by _id",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def get_document(
+    document_id: str,
+    http_request: Request,
+    current_admin: Dict = Depends(get_current_admin),
+    document_service: TenantDocumentService = Depends(get_document_service)
+):
+    """
+    Fetch a document by `_id` (authenticated endpoint).
+    
+    A 24-character hex id is matched as an ObjectId, anything else as a string.
+    Returns Relaxed Extended JSON, or raw BSON with `Accept: application/bson`.
+    
+    **Requires JWT token in Authorization header.**
+    """
+    document = await document_service.get(current_admin, document_id)
+    if document is None:
+        raise DocumentNotFoundException(document_id)
+    if _wants_bson(http_request):
+        return Response(raw_bytes(document), media_type=BSON_MEDIA_TYPE)
+    return Response(json_util.dumps(document, json_options=RELAXED_JSON_OPTIONS), media_type="application/json")
+
+
+@router.delete(
+    "/documents/{document_id}",
+    status_code=status.HTTP_200_OK,
+    summary="Delete Document",
+    description="Delete one document of the caller's organization collection by _id",
+    dependencies=[Depends(check_rate_limit)]
+)
+async def delete_document(
+    document_id: str,
+    current_admin: Dict = Depends(get_current_admin),
+    document_service: TenantDocumentService = Depends(get_document_service)
+):
+    """
+    Delete a document by `_id` (authenticated endpoint).
+    
+    **Requires JWT token in Authorization header.**
+    """
+    if not await document_service.delete(current_admin, document_id):
+        raise DocumentNotFoundException(document_id)
+    return {"message": f"Document '{document_id}' deleted"}
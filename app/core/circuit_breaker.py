@@ -0,0 +1,188 @@
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import metrics
+from pymongo import monitoring
+from collections import deque
+from typing import Deque, List
+import math
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+# Server error codes meaning the cluster (not the request) is unhealthy
+UNAVAILABLE_CODES = {6, 7, 89, 91, 189, 10107, 11600, 11602, 13435, 13436}
+
+metrics.register("db_circuit_state", "gauge", "1 for the current state of the database circuit breaker")
+metrics.register("db_circuit_transitions_total", "counter", "Database circuit breaker state transitions")
+metrics.register("db_circuit_rejected_total", "counter", "Requests failed fast while the database circuit was open")
+
+
+class CircuitBreaker:
+    """
+    Error-rate and latency circuit breaker for the database.
+    
+    Outcomes of every driver command are recorded in a sliding window of one-second
+    buckets. The circuit opens when, with at least min_calls in the window, the share
+    of failed or slow calls reaches its threshold. While open, requests fail fast;
+    after open_seconds a few trial requests are let through (half-open) and their
+    commands decide between closing and reopening.
+    """
+    
+    def __init__(
+        self,
+        window_seconds: int = 10,
+        min_calls: int = 20,
+        error_rate: float = 0.5,
+        slow_call_ms: float = 2000,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 5,
+        half_open_calls: int = 3
+    ):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        
+        # Driver events arrive on executor threads
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._changed_at = time.monotonic()
+        # [second, calls, failures, slow calls]
+        self._buckets: Deque[List[int]] = deque()
+        self._trials = 0
+        self._trial_successes = 0
+        self._publish_state()
+    
+    # Gate
+    
+    def allow(self) -> bool:
+        """Whether a request may use the database now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._changed_at < self.open_seconds:
+                    return False
+                self._transition(HALF_OPEN, now)
+            if self.state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    # Trials that never reached the database must not wedge the breaker
+                    if now - self._changed_at < self.open_seconds:
+                        return False
+                    self._changed_at = now
+                    self._trials = 0
+                self._trials += 1
+            return True
+    
+    def retry_after(self) -> int:
+        """Seconds until the breaker tries the database again"""
+        with self._lock:
+            remaining = self.open_seconds - (time.monotonic() - self._changed_at)
+        return max(1, math.ceil(remaining))
+    
+    def reject(self):
+        metrics.inc("db_circuit_rejected_total")
+    
+    # Outcomes
+    
+    def record(self, success: bool, duration_ms: float = 0.0):
+        """Record one database call"""
+        slow = duration_ms >= self.slow_call_ms
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                return
+            if self.state == HALF_OPEN:
+                if not success or slow:
+                    self._transition(OPEN, now)
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self._transition(CLOSED, now)
+                return
+            
+            second = int(now)
+            if not self._buckets or self._buckets[-1][0] != second:
+                self._buckets.append([second, 0, 0, 0])
+            bucket = self._buckets[-1]
+            bucket[1] += 1
+            bucket[2] += not success
+            bucket[3] += slow
+            while self._buckets and self._buckets[0][0] <= second - self.window_seconds:
+                self._buckets.popleft()
+            
+            calls = sum(b[1] for b in self._buckets)
+            if calls < self.min_calls:
+                return
+            failures = sum(b[2] for b in self._buckets)
+            slow_calls = sum(b[3] for b in self._buckets)
+            if failures / calls >= self.error_rate or slow_calls / calls >= self.slow_call_rate:
+                self._transition(OPEN, now)
+    
+    def record_failure(self):
+        self.record(False)
+    
+    def _transition(self, state: str, now: float):
+        previous, self.state = self.state, state
+        self._changed_at = now
+        self._buckets.clear()
+        self._trials = 0
+        self._trial_successes = 0
+        metrics.inc("db_circuit_transitions_total", **{"from": previous, "to": state})
+        self._publish_state()
+        log = logger.warning if state == OPEN else logger.info
+        log(f"Database circuit breaker {previous} -> {state}")
+    
+    def _publish_state(self):
+        for state in STATES:
+            metrics.set("db_circuit_state", 1 if state == self.state else 0, state=state)
+    
+    def reset(self):
+        """Close the circuit and forget recorded outcomes"""
+        with self._lock:
+            if self.state != CLOSED:
+                self._transition(CLOSED, time.monotonic())
+            self._buckets.clear()
+
+
+class BreakerCommandListener(monitoring.CommandListener):
+    """Feeds driver command outcomes and latencies into a circuit breaker"""
+    
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+    
+    def started(self, event: monitoring.CommandStartedEvent):
+        pass
+    
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self.breaker.record(True, event.duration_micros / 1000)
+    
+    def failed(self, event: monitoring.CommandFailedEvent):
+        failure = event.failure or {}
+        # Driver-side exceptions (network errors, timeouts) carry errtype; server
+        # errors only count when they mean the node cannot serve requests
+        unavailable = "errtype" in failure or failure.get("code") in UNAVAILABLE_CODES
+        self.breaker.record(not unavailable, event.duration_micros / 1000)
+
+
+def _from_settings() -> CircuitBreaker:
+    return CircuitBreaker(
+        window_seconds=settings.DB_BREAKER_WINDOW_SECONDS,
+        min_calls=settings.DB_BREAKER_MIN_CALLS,
+        error_rate=settings.DB_BREAKER_ERROR_RATE,
+        slow_call_ms=settings.DB_BREAKER_SLOW_CALL_MS,
+        slow_call_rate=settings.DB_BREAKER_SLOW_CALL_RATE,
+        open_seconds=settings.DB_BREAKER_OPEN_SECONDS,
+        half_open_calls=settings.DB_BREAKER_HALF_OPEN_CALLS
+    )
+
+
+# Global breaker shared by every database client of this process
+breaker = _from_settings()
+breaker_listener = BreakerCommandListener(breaker)
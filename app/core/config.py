@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator, ConfigDict
+from typing import Dict, List
 import secrets
 
 
@@ -10,6 +11,127 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     ENVIRONMENT: str = "development"
+    # Read routing for read-only lookups; writes always go to the primary
+    READ_PREFERENCE: str = "secondaryPreferred"
+    READ_MAX_STALENESS_SECONDS: int = 90  # -1 = no staleness bound
+    CAUSAL_CONSISTENCY: bool = True
+    # Cache-Control max-age for GET /org/get
+    ORG_CACHE_MAX_AGE_SECONDS: int = 30
+    # Tenant placement targets as JSON, e.g.
+    # [{"name": "east", "database": "tenants_east", "uri": "mongodb://east:27017"}]
+    # "uri" defaults to MONGODB_URI. The master database is always target "default".
+    PLACEMENT_TARGETS: List[Dict[str, str]] = []
+    PLACEMENT_VIRTUAL_NODES: int = 100
+    PLACEMENT_COPY_BATCH_SIZE: int = 1000
+    # Wait after pausing a tenant's writes before copying its data, so writes that were
+    # already past the check land in the source first (the default request deadline)
+    MIGRATION_WRITE_DRAIN_MS: int = 10_000
+    # "collection" = one org_<name> collection per tenant,
+    # "shared" = all tenants in SHARED_TENANT_COLLECTION keyed by tenant_id
+    TENANCY_MODE: str = "collection"
+    SHARED_TENANT_COLLECTION: str = "tenant_data"
+    # Background purge of deleted organizations and orphan reclamation
+    MAINTENANCE_ENABLED: bool = True
+    PURGE_INTERVAL_SECONDS: float = 5.0
+    PURGE_LEASE_SECONDS: int = 300
+    PURGE_BATCH_SIZE: int = 500
+    PURGE_BATCH_DELAY_SECONDS: float = 0.1
+    RECONCILE_INTERVAL_SECONDS: int = 600
+    RECONCILE_GRACE_SECONDS: int = 3600
+    RECONCILE_SCAN_BATCH: int = 500
+    RECONCILE_MAX_ACTIONS: int = 100
+    # Adaptive concurrency limit: AIMD on request latency, excess queued briefly then shed with 503
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_INITIAL_LIMIT: int = 20
+    CONCURRENCY_MIN_LIMIT: int = 2
+    CONCURRENCY_MAX_LIMIT: int = 500
+    CONCURRENCY_LATENCY_TARGET_MS: float = 250.0
+    CONCURRENCY_MAX_QUEUE: int = 100
+    CONCURRENCY_QUEUE_TIMEOUT_MS: float = 100.0
+    CONCURRENCY_CRITICAL_RESERVE: int = 4
+    CONCURRENCY_RETRY_AFTER_SECONDS: int = 1
+    # "METHOD /path" or "/path" -> critical | high | normal | low (unlisted routes are normal)
+    CONCURRENCY_PRIORITY_ROUTES: Dict[str, str] = {
+        "/health": "critical",
+        "PUT /org/update": "high",
+        "DELETE /org/delete": "high"
+    }
+    # "METHOD /path" or "/path" -> latency target in ms for that route (unlisted routes use
+    # CONCURRENCY_LATENCY_TARGET_MS; 0 = its latency never moves the limit). Password hashing
+    # alone takes about BCRYPT_TARGET_HASH_MS, so those routes would read as overload
+    CONCURRENCY_LATENCY_TARGET_ROUTES: Dict[str, float] = {
+        "POST /admin/login": 0,
+        "POST /org/create": 0,
+        "PUT /org/update": 0
+    }
+    # Per-organization usage counters, buffered in memory and flushed with one bulk write
+    USAGE_ENABLED: bool = True
+    USAGE_FLUSH_INTERVAL_SECONDS: float = 10.0
+    USAGE_MAX_PENDING_KEYS: int = 10_000
+    # Prebuilt schema from `python -m app.tools.build_openapi`, loaded at startup
+    # instead of generating it on the first /docs request ("" = generate)
+    OPENAPI_SCHEMA_FILE: str = ""
+    # Idempotency-Key handling for create/update/delete
+    IDEMPOTENCY_TTL_SECONDS: int = 86_400
+    IDEMPOTENCY_LOCK_SECONDS: int = 60  # a claim older than this is considered abandoned
+    IDEMPOTENCY_CACHE_SIZE: int = 10_000
+    # Database circuit breaker: opens on error rate or slow-call rate over a sliding window
+    DB_BREAKER_ENABLED: bool = True
+    DB_BREAKER_WINDOW_SECONDS: int = 10
+    DB_BREAKER_MIN_CALLS: int = 20
+    DB_BREAKER_ERROR_RATE: float = 0.5
+    DB_BREAKER_SLOW_CALL_MS: float = 2000.0
+    DB_BREAKER_SLOW_CALL_RATE: float = 0.8
+    DB_BREAKER_OPEN_SECONDS: float = 5.0
+    DB_BREAKER_HALF_OPEN_CALLS: int = 3
+    # Request deadlines: the budget is applied to every MongoDB operation of the request
+    # and the handler is cancelled when it runs out or the client disconnects
+    REQUEST_DEADLINE_ENABLED: bool = True
+    REQUEST_DEADLINE_MS: int = 10_000
+    REQUEST_DEADLINE_MAX_MS: int = 120_000  # cap on the X-Request-Deadline-Ms header
+    # "METHOD /path" or "/path" -> deadline in ms (unlisted routes use REQUEST_DEADLINE_MS)
+    REQUEST_DEADLINE_ROUTES: Dict[str, int] = {
+        "/health": 2_000,
+        "PUT /org/update": 60_000,
+        "DELETE /org/delete": 30_000
+    }
+    # Response compression, negotiated from Accept-Encoding (br and zstd need the
+    # optional brotli / zstandard packages)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ENCODINGS: List[str] = ["zstd", "br", "gzip"]  # server preference order
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; smaller bodies are sent as-is
+    COMPRESSION_LEVEL: int = 5
+    COMPRESSION_OFFLOAD_SIZE: int = 256 * 1024  # chunks this large are compressed in a thread
+    # Organization search index, held in memory and rebuilt from the database
+    # periodically to pick up other workers' changes (0 = only at startup)
+    SEARCH_REFRESH_INTERVAL_SECONDS: float = 60.0
+    SEARCH_MAX_RESULTS: int = 50
+    # Most names one POST /org/batch-get may resolve
+    ORG_BATCH_GET_MAX_NAMES: int = 200
+    # Tenant storage statistics ($collStats), cached so polling dashboards stay cheap
+    STATS_CACHE_TTL_SECONDS: float = 60.0
+    STATS_CACHE_MAX_ENTRIES: int = 10_000
+    STATS_CONCURRENCY: int = 8  # collections queried at once by the operator-wide report
+    # Shared secret for cross-tenant operator endpoints, sent as X-Operator-Key ("" = disabled)
+    OPERATOR_API_KEY: str = ""
+    # Secondary indexes tenants may declare on their own collection
+    TENANT_MAX_INDEXES: int = 10
+    # Tenant document API: largest query page and write batch
+    DOCUMENTS_MAX_BATCH_SIZE: int = 1000
+    DOCUMENTS_MAX_BULK_OPERATIONS: int = 1000
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0 = one worker per CPU core
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_CALIBRATE: bool = False
+    BCRYPT_TARGET_HASH_MS: int = 250
+    BCRYPT_MIN_ROUNDS: int = 10
+    LOGIN_THROTTLE_EMAIL_FREE_ATTEMPTS: int = 5
+    LOGIN_THROTTLE_IP_FREE_ATTEMPTS: int = 20
+    LOGIN_THROTTLE_BASE_DELAY_SECONDS: float = 1.0
+    LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS: int = 900
+    LOGIN_THROTTLE_MAX_ENTRIES: int = 100_000
     
     @field_validator('SECRET_KEY')
     @classmethod
@@ -23,10 +145,63 @@ class Settings(BaseSettings):
     @field_validator('MONGODB_URI')
     @classmethod
     def validate_mongodb_uri(cls, v):
-        if not v.startswith(('mongodb://', 'mongodb+srv://')):
+        # memory:// selects the in-process backend (tests, benchmarks, local runs)
+        if not v.startswith(('mongodb://', 'mongodb+srv://', 'memory://')):
             raise ValueError('Invalid MongoDB URI format')
         return v
     
+    @field_validator('READ_PREFERENCE')
+    @classmethod
+    def validate_read_preference(cls, v):
+        modes = ("primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest")
+        if v not in modes:
+            raise ValueError(f'READ_PREFERENCE must be one of {", ".join(modes)}')
+        return v
+    
+    @field_validator('READ_MAX_STALENESS_SECONDS')
+    @classmethod
+    def validate_max_staleness(cls, v):
+        if v != -1 and v < 90:
+            raise ValueError('READ_MAX_STALENESS_SECONDS must be -1 or at least 90')
+        return v
+    
+    @field_validator('TENANCY_MODE')
+    @classmethod
+    def validate_tenancy_mode(cls, v):
+        if v not in ("collection", "shared"):
+            raise ValueError('TENANCY_MODE must be "collection" or "shared"')
+        return v
+    
+    @field_validator('CONCURRENCY_PRIORITY_ROUTES')
+    @classmethod
+    def validate_priority_routes(cls, v):
+        for priority in v.values():
+            if priority not in ("critical", "high", "normal", "low"):
+                raise ValueError('CONCURRENCY_PRIORITY_ROUTES values must be critical, high, normal or low')
+        return v
+    
+    @field_validator('BCRYPT_ROUNDS', 'BCRYPT_MIN_ROUNDS')
+    @classmethod
+    def validate_bcrypt_rounds(cls, v):
+        if not 4 <= v <= 31:
+            raise ValueError('bcrypt rounds must be between 4 and 31')
+        return v
+    
+    @field_validator('COMPRESSION_ENCODINGS')
+    @classmethod
+    def validate_compression_encodings(cls, v):
+        for encoding in v:
+            if encoding not in ("zstd", "br", "gzip"):
+                raise ValueError('COMPRESSION_ENCODINGS entries must be zstd, br or gzip')
+        return v
+    
+    @field_validator('COMPRESSION_LEVEL')
+    @classmethod
+    def validate_compression_level(cls, v):
+        if not 1 <= v <= 9:
+            raise ValueError('COMPRESSION_LEVEL must be between 1 and 9')
+        return v
+    
     model_config = ConfigDict(
         env_file=".env",
         case_sensitive=True
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+from typing import Optional
+from app.repositories.organization import OrganizationRepository
+from app.repositories.usage import UsageRepository
+from app.repositories.idempotency import IdempotencyRepository
+from app.services.organization import OrganizationService
+from app.services.auth import AuthService
+from app.services.maintenance import MaintenanceService
+from app.services.usage import UsageService
+from app.services.idempotency import IdempotencyService
+from app.services.search import SearchService
+from app.services.stats import StatsService
+from app.services.indexes import TenantIndexService
+from app.services.documents import TenantDocumentService
+
+
+class ServiceContainer:
+    """Application-scoped holder for long-lived repositories, services and executors"""
+    
+    def __init__(self):
+        self.repo: Optional[OrganizationRepository] = None
+        self.org_service: Optional[OrganizationService] = None
+        self.auth_service: Optional[AuthService] = None
+        self.maintenance: Optional[MaintenanceService] = None
+        self.usage: Optional[UsageService] = None
+        self.idempotency: Optional[IdempotencyService] = None
+        self.search: Optional[SearchService] = None
+        self.stats: Optional[StatsService] = None
+        self.indexes: Optional[TenantIndexService] = None
+        self.documents: Optional[TenantDocumentService] = None
+        # Password hashing and checks; bcrypt is CPU-bound and releases the GIL, so one
+        # thread per core, kept apart from the default executor other offloaded work uses
+        self.executor: Optional[ThreadPoolExecutor] = None
+    
+    async def startup(self):
+        """Build shared objects once the database is connected"""
+        self.executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="password-hash")
+        self.repo = OrganizationRepository()
+        usage_repo = UsageRepository()
+        idempotency_repo = IdempotencyRepository()
+        # Independent round trips; overlap them to shorten startup
+        await asyncio.gather(
+            self.repo.ensure_indexes(),
+            usage_repo.ensure_indexes(),
+            idempotency_repo.ensure_indexes(),
+            asyncio.get_running_loop().run_in_executor(self.executor, AuthService.build_dummy_hash)
+        )
+        self.search = SearchService(self.repo)
+        await self.search.rebuild()
+        self.search.start()
+        self.org_service = OrganizationService(repo=self.repo, search=self.search, executor=self.executor)
+        self.auth_service = AuthService(repo=self.repo, executor=self.executor)
+        self.stats = StatsService(self.repo)
+        self.indexes = TenantIndexService(self.repo)
+        self.documents = TenantDocumentService(self.repo)
+        self.idempotency = IdempotencyService(idempotency_repo)
+        self.maintenance = MaintenanceService(self.repo)
+        self.maintenance.start()
+        self.usage = UsageService(usage_repo)
+        self.usage.start()
+    
+    async def shutdown(self):
+        """Flush buffered usage, release executors and drop references to shared objects"""
+        if self.usage:
+            await self.usage.stop()
+            self.usage = None
+        if self.indexes:
+            await self.indexes.stop()
+            self.indexes = None
+        if self.search:
+            await self.search.stop()
+            self.search = None
+        if self.maintenance:
+            await self.maintenance.stop()
+            self.maintenance = None
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.org_service = None
+        self.auth_service = None
+        self.idempotency = None
+        self.stats = None
+        self.documents = None
+        self.repo = None
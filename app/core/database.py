@@ -1,15 +1,50 @@
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorClientSession
+from pymongo.read_preferences import ReadPreference, make_read_preference, read_pref_mode_from_name
 from app.core.config import settings
-from typing import Optional
+from app.core.memory import MemoryClient, is_memory_uri
+from app.core.circuit_breaker import breaker_listener
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Optional
+import os
+import time
+
+# Upper bound on remembered write tokens for read-your-writes
+MAX_CAUSAL_TOKENS = 10_000
+
+# Causal state of the HTTP request being served, set by CausalTokenMiddleware:
+# {"read": (cluster_time, operation_time) the client brought back, "write": same for this request's writes}
+request_causal: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_causal", default=None)
+
+
+def causal_token_ttl() -> int:
+    """Seconds a write token matters; secondaries within the staleness bound have caught up once it elapses"""
+    return settings.READ_MAX_STALENESS_SECONDS if settings.READ_MAX_STALENESS_SECONDS > 0 else 300
+
+
+def create_client(uri: str):
+    """Motor client for a MongoDB URI, or the in-process backend for memory:// URIs"""
+    if is_memory_uri(uri):
+        return MemoryClient(uri)
+    # Every command outcome feeds the circuit breaker
+    listeners = [breaker_listener] if settings.DB_BREAKER_ENABLED else []
+    return AsyncIOMotorClient(uri, event_listeners=listeners)
 
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
+    # PID of the process that created the client; Motor clients must not cross a fork
+    _owner_pid: Optional[int] = None
+    # key -> (cluster_time, operation_time, expires_at) of recent writes in this process;
+    # other workers see a client's writes through the token it carries (request_causal)
+    _causal_tokens: "OrderedDict[str, tuple]" = OrderedDict()
     
     @classmethod
     async def connect(cls):
         """Establish MongoDB connection"""
-        cls.client = AsyncIOMotorClient(settings.MONGODB_URI)
+        cls.client = create_client(settings.MONGODB_URI)
+        cls._owner_pid = os.getpid()
         try:
             await cls.client.admin.command('ping')
             print("✅ MongoDB connected successfully")
@@ -22,21 +57,88 @@ class Database:
         """Close MongoDB connection"""
         if cls.client:
             cls.client.close()
+            cls.client = None
+            cls._owner_pid = None
             print("MongoDB connection closed")
     
     @classmethod
-    def get_master_db(cls) -> AsyncIOMotorDatabase:
-        """Get master database instance"""
+    def _reset_after_fork(cls):
+        """Drop an inherited client in a forked child without closing the parent's sockets"""
+        cls.client = None
+        cls._owner_pid = None
+    
+    @classmethod
+    def get_client(cls) -> AsyncIOMotorClient:
+        """Get the connected client owned by this process"""
         if not cls.client:
             raise Exception("Database not connected. Call connect() first.")
-        return cls.client[settings.DATABASE_NAME]
+        if cls._owner_pid != os.getpid():
+            raise Exception("Database client was created in another process. Call connect() in this worker.")
+        return cls.client
+    
+    @classmethod
+    def get_read_preference(cls) -> ReadPreference:
+        """Read preference for read-only lookups, from settings"""
+        mode = read_pref_mode_from_name(settings.READ_PREFERENCE)
+        if mode == 0:
+            return ReadPreference.PRIMARY
+        return make_read_preference(mode, None, settings.READ_MAX_STALENESS_SECONDS)
+    
+    @classmethod
+    @asynccontextmanager
+    async def read_session(cls, *keys: str) -> AsyncIterator[Optional[AsyncIOMotorClientSession]]:
+        """Causally consistent session that observes recent writes recorded under any of keys,
+        and those of the client whose request is being served"""
+        if not settings.CAUSAL_CONSISTENCY:
+            yield None
+            return
+        async with await cls.get_client().start_session(causal_consistency=True) as session:
+            now = time.monotonic()
+            tokens = [cls._causal_tokens.get(key) for key in keys]
+            tokens = [token for token in tokens if token and token[2] > now]
+            state = request_causal.get()
+            if state and state["read"]:
+                tokens.append(state["read"])
+            for token in tokens:
+                session.advance_cluster_time(token[0])
+                session.advance_operation_time(token[1])
+            yield session
+    
+    @classmethod
+    @asynccontextmanager
+    async def write_session(cls, *keys: str) -> AsyncIterator[Optional[AsyncIOMotorClientSession]]:
+        """Causally consistent session whose writes are remembered under keys for later reads"""
+        async with cls.read_session(*keys) as session:
+            yield session
+            if session is not None and session.operation_time is not None:
+                cls._remember_write(keys, session.cluster_time, session.operation_time)
+    
+    @classmethod
+    def _remember_write(cls, keys, cluster_time, operation_time):
+        state = request_causal.get()
+        if state is not None:
+            # Handed back to the client, which brings it to whichever worker serves its next read
+            state["write"] = (cluster_time, operation_time)
+        token = (cluster_time, operation_time, time.monotonic() + causal_token_ttl())
+        for key in keys:
+            cls._causal_tokens[key] = token
+            cls._causal_tokens.move_to_end(key)
+        while len(cls._causal_tokens) > MAX_CAUSAL_TOKENS:
+            cls._causal_tokens.popitem(last=False)
+    
+    @classmethod
+    def get_master_db(cls) -> AsyncIOMotorDatabase:
+        """Get master database instance"""
+        return cls.get_client()[settings.DATABASE_NAME]
     
     @classmethod
     def get_org_collection(cls, org_collection_name: str):
         """Get organization-specific collection"""
-        if not cls.client:
-            raise Exception("Database not connected. Call connect() first.")
-        return cls.client[settings.DATABASE_NAME][org_collection_name]
+        return cls.get_client()[settings.DATABASE_NAME][org_collection_name]
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=Database._reset_after_fork)
 
 
 # Create instance
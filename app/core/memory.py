@@ -0,0 +1,1236 @@
+"""
+In-process MongoDB stand-in selected with MONGODB_URI=memory://.
+
+Implements the subset of the Motor API this service uses: CRUD, counts,
+bulk writes, find_one_and_update, unique and TTL-free indexes, collection
+management, cursors with sort/skip/limit/batching, a small aggregation
+subset and causally consistent sessions. Documents are stored BSON
+round-tripped, so types, datetime precision and copying behave as they do
+against a server. Data lives per URI for the life of the process
+(memory://name gives a separate instance) and survives disconnect/connect,
+like a server would. Collection validators, transactions and read
+preferences are accepted and ignored.
+"""
+import asyncio
+import itertools
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+import bson
+from bson import Binary, Decimal128, Int64, MaxKey, MinKey, ObjectId, Regex
+from bson.errors import InvalidId
+from bson.timestamp import Timestamp
+from pymongo import ReturnDocument
+from pymongo.errors import (
+    BulkWriteError,
+    CollectionInvalid,
+    DuplicateKeyError,
+    OperationFailure,
+    WriteError
+)
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+MEMORY_SCHEME = "memory://"
+DEFAULT_BATCH_SIZE = 101
+
+_servers: Dict[str, "_Server"] = {}
+_servers_lock = threading.Lock()
+_clock = itertools.count(1)
+
+
+def is_memory_uri(uri: str) -> bool:
+    return uri.startswith(MEMORY_SCHEME)
+
+
+def _copy(document: Mapping[str, Any]) -> Dict[str, Any]:
+    # BSON round trip: deep copy with server-side type and precision semantics
+    return bson.decode(bson.encode(document))
+
+
+# --- Value comparison -------------------------------------------------------
+
+def _type_rank(value: Any) -> int:
+    """BSON comparison order of a value's type"""
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, Mapping):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    if isinstance(value, Timestamp):
+        return 10
+    return 11
+
+
+def _sort_key(value: Any):
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank == 4:
+        return (rank, tuple((key, _sort_key(item)) for key, item in value.items()))
+    if rank == 5:
+        return (rank, tuple(_sort_key(item) for item in value))
+    if rank == 11:
+        return (rank, str(value))
+    return (rank, value)
+
+
+def _equal(left: Any, right: Any) -> bool:
+    if isinstance(right, re.Pattern):
+        return isinstance(left, str) and right.search(left) is not None
+    if _type_rank(left) != _type_rank(right):
+        return False
+    return left == right
+
+
+# --- Field paths ------------------------------------------------------------
+
+_MISSING = object()
+
+
+def _get_path(document: Mapping[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if isinstance(value, Mapping) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+
+def _candidates(document: Mapping[str, Any], path: str) -> List[Any]:
+    """Values a query on path compares against; arrays match by any element"""
+    values = [document]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, Mapping):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    found.append(value[int(part)])
+                else:
+                    found.extend(item[part] for item in value if isinstance(item, Mapping) and part in item)
+        values = found
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _set_path(document: Dict[str, Any], path: str, value: Any):
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        child = target.get(part)
+        if not isinstance(child, dict):
+            child = target[part] = {}
+        target = child
+    target[parts[-1]] = value
+
+
+def _unset_path(document: Dict[str, Any], path: str):
+    parts = path.split(".")
+    target = document
+    for part in parts[:-1]:
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return
+    target.pop(parts[-1], None)
+
+
+# --- Query matching ---------------------------------------------------------
+
+def _is_operator_dict(value: Any) -> bool:
+    return isinstance(value, Mapping) and bool(value) and all(str(key).startswith("$") for key in value)
+
+
+def matches(document: Mapping[str, Any], query: Optional[Mapping[str, Any]]) -> bool:
+    """Whether a document satisfies a MongoDB query filter"""
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, sub) for sub in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"Query operator {key} is not supported by the memory backend")
+        elif not _match_field(_candidates(document, key), condition):
+            return False
+    return True
+
+
+def _match_field(values: List[Any], condition: Any) -> bool:
+    if _is_operator_dict(condition):
+        return all(
+            _match_operator(values, operator, argument, condition)
+            for operator, argument in condition.items()
+        )
+    return _match_equal(values, condition)
+
+
+def _match_equal(values: List[Any], target: Any) -> bool:
+    if target is None:
+        # Null matches explicit nulls and missing fields
+        return not values or any(value is None for value in values)
+    return any(_equal(value, target) for value in values)
+
+
+def _compare(values: List[Any], argument: Any, test: Callable[[Any, Any], bool]) -> bool:
+    # Comparisons only match values of the same type bracket
+    rank = _type_rank(argument)
+    key = _sort_key(argument)
+    return any(_type_rank(value) == rank and test(_sort_key(value), key) for value in values)
+
+
+def _type_alias(value: Any) -> str:
+    """$type alias of a value as the server would store it"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, Int64):
+        return "long"
+    if isinstance(value, int):
+        return "int" if -2 ** 31 <= value < 2 ** 31 else "long"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, Decimal128):
+        return "decimal"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, Mapping):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, (bytes, Binary)):
+        return "binData"
+    if isinstance(value, ObjectId):
+        return "objectId"
+    if isinstance(value, datetime):
+        return "date"
+    if isinstance(value, Timestamp):
+        return "timestamp"
+    if isinstance(value, (re.Pattern, Regex)):
+        return "regex"
+    if isinstance(value, MinKey):
+        return "minKey"
+    if isinstance(value, MaxKey):
+        return "maxKey"
+    raise OperationFailure(f"Values of type {type(value).__name__} are not supported by the memory backend")
+
+
+_NUMBER_ALIASES = {"double", "int", "long", "decimal"}
+
+
+def _match_operator(values: List[Any], operator: str, argument: Any, condition: Mapping[str, Any]) -> bool:
+    if operator == "$eq":
+        return _match_equal(values, argument)
+    if operator == "$ne":
+        return not _match_equal(values, argument)
+    if operator == "$gt":
+        return _compare(values, argument, lambda left, right: left > right)
+    if operator == "$gte":
+        return _compare(values, argument, lambda left, right: left >= right)
+    if operator == "$lt":
+        return _compare(values, argument, lambda left, right: left < right)
+    if operator == "$lte":
+        return _compare(values, argument, lambda left, right: left <= right)
+    if operator == "$in":
+        return any(_match_equal(values, item) for item in argument)
+    if operator == "$nin":
+        return not any(_match_equal(values, item) for item in argument)
+    if operator == "$exists":
+        return bool(values) == bool(argument)
+    if operator == "$type":
+        wanted = set(argument if isinstance(argument, list) else [argument])
+        if "number" in wanted:
+            wanted |= _NUMBER_ALIASES
+        if wanted - _NUMBER_ALIASES - {
+            "null", "bool", "string", "object", "array", "binData", "objectId", "date", "timestamp", "regex",
+            "minKey", "maxKey", "symbol"
+        }:
+            raise OperationFailure(f"$type {argument} is not supported by the memory backend")
+        return any(_type_alias(value) in wanted for value in values)
+    if operator == "$not":
+        if isinstance(argument, re.Pattern):
+            return not _match_equal(values, argument)
+        return not _match_field(values, argument)
+    if operator == "$regex":
+        flags = 0
+        for option in condition.get("$options", ""):
+            flags |= {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}.get(option, 0)
+        pattern = argument if isinstance(argument, re.Pattern) else re.compile(argument, flags)
+        return _match_equal(values, pattern)
+    if operator == "$options":
+        return True
+    if operator == "$size":
+        return any(isinstance(value, list) and len(value) == argument for value in values)
+    if operator == "$all":
+        return all(_match_equal(values, item) for item in argument)
+    if operator == "$elemMatch":
+        return any(
+            isinstance(value, list) and any(
+                matches(item, argument) if isinstance(item, Mapping) and not _is_operator_dict(argument)
+                else _match_field([item], argument)
+                for item in value
+            )
+            for value in values
+        )
+    raise OperationFailure(f"Query operator {operator} is not supported by the memory backend")
+
+
+# --- Updates ----------------------------------------------------------------
+
+def _apply_update(document: Dict[str, Any], update: Mapping[str, Any], inserting: bool) -> Dict[str, Any]:
+    """Return the updated document; update is an operator document or a replacement"""
+    if not any(str(key).startswith("$") for key in update):
+        replacement = dict(update)
+        if "_id" in replacement and replacement["_id"] != document["_id"]:
+            raise WriteError("After applying the update, the (immutable) field '_id' was found to have been altered", 66)
+        replacement["_id"] = document["_id"]
+        return replacement
+    
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            if path == "_id" and operator != "$setOnInsert" and not inserting:
+                if operator != "$set" or value != document["_id"]:
+                    raise WriteError("Performing an update on the path '_id' would modify the immutable field '_id'", 66)
+            current = _get_path(document, path)
+            if operator == "$set":
+                _set_path(document, path, value)
+            elif operator == "$setOnInsert":
+                if inserting:
+                    _set_path(document, path, value)
+            elif operator == "$unset":
+                _unset_path(document, path)
+            elif operator == "$inc":
+                _set_path(document, path, (0 if current is _MISSING else current) + value)
+            elif operator == "$min":
+                if current is _MISSING or _sort_key(value) < _sort_key(current):
+                    _set_path(document, path, value)
+            elif operator == "$max":
+                if current is _MISSING or _sort_key(value) > _sort_key(current):
+                    _set_path(document, path, value)
+            elif operator == "$currentDate":
+                _set_path(document, path, datetime.utcnow())
+            elif operator in ("$push", "$addToSet"):
+                items = value["$each"] if isinstance(value, Mapping) and "$each" in value else [value]
+                array = [] if current is _MISSING else list(current)
+                for item in items:
+                    if operator == "$push" or not any(_equal(existing, item) for existing in array):
+                        array.append(item)
+                _set_path(document, path, array)
+            elif operator == "$pull":
+                if isinstance(current, list):
+                    if _is_operator_dict(value):
+                        kept = [item for item in current if not _match_field([item], value)]
+                    elif isinstance(value, Mapping):
+                        kept = [item for item in current if not (isinstance(item, Mapping) and matches(item, value))]
+                    else:
+                        kept = [item for item in current if not _equal(item, value)]
+                    _set_path(document, path, kept)
+            elif operator == "$rename":
+                if current is not _MISSING:
+                    _unset_path(document, path)
+                    _set_path(document, value, current)
+            else:
+                raise WriteError(f"Unknown modifier: {operator}", 9)
+    return document
+
+
+def _upsert_seed(query: Mapping[str, Any]) -> Dict[str, Any]:
+    """Equality fields of a filter, which an upserted document starts from"""
+    seed: Dict[str, Any] = {}
+    for key, condition in query.items():
+        if key == "$and":
+            for sub in condition:
+                seed.update(_upsert_seed(sub))
+        elif key.startswith("$"):
+            continue
+        elif _is_operator_dict(condition):
+            if "$eq" in condition:
+                _set_path(seed, key, condition["$eq"])
+        else:
+            _set_path(seed, key, condition)
+    return seed
+
+
+# --- Projection and sorting -------------------------------------------------
+
+def _project(document: Dict[str, Any], projection: Optional[Any]) -> Dict[str, Any]:
+    if not projection:
+        return document
+    if not isinstance(projection, Mapping):
+        projection = {field: 1 for field in projection}
+    
+    include_id = bool(projection.get("_id", 1))
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    for value in fields.values():
+        if isinstance(value, Mapping):
+            raise OperationFailure("Projection operators are not supported by the memory backend")
+    
+    if any(fields.values()):
+        result: Dict[str, Any] = {}
+        if include_id and "_id" in document:
+            result["_id"] = document["_id"]
+        for path in fields:
+            value = _get_path(document, path)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+        return result
+    
+    result = dict(document)
+    for path in fields:
+        _unset_path(result, path)
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _normalize_sort(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, Mapping):
+        return list(key_or_list.items())
+    return [tuple(item) for item in key_or_list]
+
+
+def _sort(documents: List[Dict[str, Any]], spec: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    # Stable sorts from the last key to the first give a multi-key ordering
+    for path, direction in reversed(spec):
+        def key(document, path=path):
+            value = _get_path(document, path)
+            return _sort_key(None if value is _MISSING else value)
+        documents.sort(key=key, reverse=direction < 0)
+    return documents
+
+
+def _field_path(value: Any, path: str) -> Any:
+    """Value of a "$field" expression; a path through an array of documents gives an array"""
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = [item[part] for item in value if isinstance(item, Mapping) and part in item]
+        elif isinstance(value, Mapping) and part in value:
+            value = value[part]
+        else:
+            return None
+    return value
+
+
+def _convert(value: Any, argument: Mapping[str, Any]) -> Any:
+    if value is None:
+        return argument.get("onNull")
+    to = argument["to"]
+    try:
+        if to == "objectId":
+            return value if isinstance(value, ObjectId) else ObjectId(value)
+        if to == "string":
+            return str(value)
+    except (InvalidId, TypeError):
+        if "onError" in argument:
+            return argument["onError"]
+        raise OperationFailure(f"Failed to convert {value!r} to {to}")
+    raise OperationFailure(f"$convert to {to} is not supported by the memory backend")
+
+
+def _evaluate(document: Dict[str, Any], expression: Any) -> Any:
+    """Aggregation expression: constants, "$field", "$$ROOT", $bsonSize, $convert and $first"""
+    if expression == "$$ROOT":
+        return document
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _field_path(document, expression[1:])
+    if isinstance(expression, Mapping):
+        (name, argument), = expression.items()
+        if name == "$bsonSize":
+            value = _evaluate(document, argument)
+            return len(bson.encode(value)) if value is not None else None
+        if name == "$convert":
+            return _convert(_evaluate(document, argument["input"]), argument)
+        if name == "$first":
+            value = _evaluate(document, argument)
+            return value[0] if isinstance(value, list) and value else None
+        raise OperationFailure(f"Expression {name} is not supported by the memory backend")
+    return expression
+
+
+def _index_spec(keys: Any) -> List[Tuple[str, int]]:
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [tuple(item) for item in keys]
+
+
+def _index_name(spec: List[Tuple[str, int]]) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in spec)
+
+
+# --- Storage ----------------------------------------------------------------
+
+class _Index:
+    __slots__ = ("name", "spec", "unique", "sparse", "options", "entries")
+    
+    def __init__(self, name: str, spec: List[Tuple[str, int]], unique: bool, sparse: bool, options: Dict[str, Any]):
+        self.name = name
+        self.spec = spec
+        self.unique = unique
+        self.sparse = sparse
+        self.options = options
+        # key -> _id, maintained for unique indexes only
+        self.entries: Dict[Any, Any] = {}
+    
+    def key(self, document: Mapping[str, Any]):
+        values = []
+        for field, _ in self.spec:
+            value = _get_path(document, field)
+            values.append(_sort_key(None if value is _MISSING else value))
+        return tuple(values)
+    
+    def applies(self, document: Mapping[str, Any]) -> bool:
+        if "partialFilterExpression" in self.options and not matches(document, self.options["partialFilterExpression"]):
+            return False
+        return not self.sparse or any(_get_path(document, field) is not _MISSING for field, _ in self.spec)
+
+
+class _CollectionData:
+    def __init__(self, name: str):
+        self.name = name
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        self.indexes: Dict[str, _Index] = {}
+        self.options: Dict[str, Any] = {}
+    
+    def _id_key(self, value: Any):
+        return _sort_key(value)
+    
+    def check_unique(self, document: Mapping[str, Any], replacing: Any = _MISSING):
+        """Raise DuplicateKeyError if document collides with another on _id or a unique index"""
+        if replacing is _MISSING and self._id_key(document["_id"]) in self.documents:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.name} index: _id_ dup key: {{ _id: {document['_id']!r} }}",
+                11000
+            )
+        for index in self.indexes.values():
+            if index.unique and index.applies(document):
+                owner = index.entries.get(index.key(document), _MISSING)
+                if owner is not _MISSING and (replacing is _MISSING or owner != self._id_key(replacing)):
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.name} index: {index.name}",
+                        11000
+                    )
+    
+    def store(self, document: Dict[str, Any]):
+        key = self._id_key(document["_id"])
+        self.documents[key] = document
+        for index in self.indexes.values():
+            if index.unique and index.applies(document):
+                index.entries[index.key(document)] = key
+    
+    def unstore(self, document: Mapping[str, Any]):
+        self._unindex(document)
+        self.documents.pop(self._id_key(document["_id"]), None)
+    
+    def replace(self, old: Mapping[str, Any], new: Dict[str, Any]):
+        """Swap in an updated version of a document, keeping its natural-order position"""
+        self._unindex(old)
+        self.store(new)
+    
+    def _unindex(self, document: Mapping[str, Any]):
+        key = self._id_key(document["_id"])
+        for index in self.indexes.values():
+            if index.unique and index.applies(document):
+                if index.entries.get(index.key(document)) == key:
+                    del index.entries[index.key(document)]
+    
+    def scan(self, query: Optional[Mapping[str, Any]]) -> Iterable[Dict[str, Any]]:
+        query = query or {}
+        identifier = query.get("_id", _MISSING)
+        if identifier is not _MISSING and not _is_operator_dict(identifier) and not isinstance(identifier, re.Pattern):
+            # Point lookup on _id
+            document = self.documents.get(self._id_key(identifier))
+            candidates = [document] if document is not None else []
+        else:
+            candidates = list(self.documents.values())
+        return [document for document in candidates if matches(document, query)]
+
+
+class _Server:
+    """All databases behind one memory:// URI"""
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.databases: Dict[str, Dict[str, _CollectionData]] = {}
+
+
+def _server_for(uri: str) -> _Server:
+    with _servers_lock:
+        server = _servers.get(uri)
+        if server is None:
+            server = _servers[uri] = _Server()
+        return server
+
+
+# --- Motor-like API ---------------------------------------------------------
+
+class MemorySession:
+    """Client session; operation and cluster times advance on every operation"""
+    
+    def __init__(self, client: "MemoryClient", causal_consistency: bool = True):
+        self.client = client
+        self.causal_consistency = causal_consistency
+        self.operation_time: Optional[Timestamp] = None
+        self.cluster_time: Optional[Dict[str, Any]] = None
+        self.has_ended = False
+    
+    def _touch(self):
+        now = Timestamp(int(time.time()), next(_clock) % 2**31)
+        self.advance_operation_time(now)
+        self.advance_cluster_time({"clusterTime": now})
+    
+    def advance_operation_time(self, operation_time: Timestamp):
+        if self.operation_time is None or operation_time > self.operation_time:
+            self.operation_time = operation_time
+    
+    def advance_cluster_time(self, cluster_time: Mapping[str, Any]):
+        if self.cluster_time is None or cluster_time["clusterTime"] > self.cluster_time["clusterTime"]:
+            self.cluster_time = dict(cluster_time)
+    
+    async def end_session(self):
+        self.has_ended = True
+    
+    async def __aenter__(self) -> "MemorySession":
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.end_session()
+
+
+class MemoryCursor:
+    """Async cursor over a lazily evaluated result, yielding in batches"""
+    
+    def __init__(
+        self,
+        fetch: Callable[[], List[Dict[str, Any]]],
+        projection: Optional[Any] = None,
+        batch_size: int = 0
+    ):
+        self._fetch = fetch
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self._results: Optional[List[Dict[str, Any]]] = None
+        self._position = 0
+        self.alive = True
+    
+    def _check_unstarted(self):
+        if self._results is not None:
+            raise Exception("Cannot set cursor options after executing query")
+    
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._check_unstarted()
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+    
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._check_unstarted()
+        self._skip = skip
+        return self
+    
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._check_unstarted()
+        self._limit = limit
+        return self
+    
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        self._batch_size = batch_size or DEFAULT_BATCH_SIZE
+        return self
+    
+    def max_time_ms(self, max_time_ms: Optional[int]) -> "MemoryCursor":
+        # Operations run synchronously in memory; there is nothing to interrupt
+        return self
+    
+    def hint(self, index: Any) -> "MemoryCursor":
+        return self
+    
+    def _ensure_results(self) -> List[Dict[str, Any]]:
+        if self._results is None:
+            documents = self._fetch()
+            if self._sort:
+                documents = _sort(list(documents), self._sort)
+            documents = documents[self._skip:]
+            if self._limit:
+                documents = documents[:abs(self._limit)]
+            self._results = documents
+        return self._results
+    
+    def _next_document(self) -> Dict[str, Any]:
+        document = self._results[self._position]
+        self._position += 1
+        return _copy(_project(document, self._projection))
+    
+    def __aiter__(self) -> "MemoryCursor":
+        return self
+    
+    async def __anext__(self) -> Dict[str, Any]:
+        results = self._ensure_results()
+        if self._position >= len(results):
+            self.alive = False
+            raise StopAsyncIteration
+        if self._position and self._position % self._batch_size == 0:
+            # Batch boundary: let other tasks run, as a getMore round trip would
+            await asyncio.sleep(0)
+        return self._next_document()
+    
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._ensure_results()
+        end = len(results) if length is None else min(len(results), self._position + length)
+        documents = [self._next_document() for _ in range(self._position, end)]
+        if self._position >= len(results):
+            self.alive = False
+        return documents
+    
+    async def close(self):
+        self.alive = False
+        self._results = []
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+    
+    def __getitem__(self, name: str) -> "MemoryCollection":
+        return MemoryCollection(self.database, f"{self.name}.{name}")
+    
+    def __getattr__(self, name: str) -> "MemoryCollection":
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+    
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, MemoryCollection) and (self.database, self.name) == (other.database, other.name)
+    
+    def __hash__(self) -> int:
+        return hash((self.database, self.name))
+    
+    @property
+    def _lock(self) -> threading.RLock:
+        return self.database.client._server.lock
+    
+    def _data(self, create: bool = False) -> Optional[_CollectionData]:
+        return self.database._collection_data(self.name, create)
+    
+    def with_options(self, **kwargs) -> "MemoryCollection":
+        # Read preference, write concern and codec options have no effect in memory
+        return MemoryCollection(self.database, self.name)
+    
+    # Reads
+    
+    def find(self, filter: Optional[Mapping[str, Any]] = None, projection: Optional[Any] = None, **kwargs) -> MemoryCursor:
+        session = kwargs.get("session")
+        
+        def fetch() -> List[Dict[str, Any]]:
+            with self._lock:
+                if session is not None:
+                    session._touch()
+                data = self._data()
+                return data.scan(filter) if data else []
+        
+        cursor = MemoryCursor(fetch, projection, kwargs.get("batch_size", 0))
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("skip"):
+            cursor.skip(kwargs["skip"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+    
+    async def find_one(self, filter: Optional[Any] = None, *args, **kwargs) -> Optional[Dict[str, Any]]:
+        if filter is not None and not isinstance(filter, Mapping):
+            filter = {"_id": filter}
+        documents = await self.find(filter, *args, **kwargs).limit(1).to_list(length=1)
+        return documents[0] if documents else None
+    
+    async def count_documents(self, filter: Mapping[str, Any], session=None, **kwargs) -> int:
+        with self._lock:
+            if session is not None:
+                session._touch()
+            data = self._data()
+            count = len(data.scan(filter)) if data else 0
+        count = max(0, count - kwargs.get("skip", 0))
+        return min(count, kwargs["limit"]) if kwargs.get("limit") else count
+    
+    async def estimated_document_count(self, **kwargs) -> int:
+        with self._lock:
+            data = self._data()
+            return len(data.documents) if data else 0
+    
+    async def distinct(self, key: str, filter: Optional[Mapping[str, Any]] = None, session=None, **kwargs) -> List[Any]:
+        with self._lock:
+            data = self._data()
+            values: List[Any] = []
+            for document in (data.scan(filter) if data else []):
+                for value in _candidates(document, key):
+                    if not isinstance(value, list) and not any(_equal(value, seen) for seen in values):
+                        values.append(value)
+            return _copy({"values": values})["values"]
+    
+    # Writes
+    
+    def _insert(self, data: _CollectionData, document: Dict[str, Any]) -> Any:
+        if "_id" not in document:
+            # Like pymongo, the generated _id is added to the caller's document
+            document["_id"] = ObjectId()
+        stored = _copy(document)
+        data.check_unique(stored)
+        data.store(stored)
+        return stored["_id"]
+    
+    async def insert_one(self, document: Dict[str, Any], session=None, **kwargs) -> InsertOneResult:
+        with self._lock:
+            if session is not None:
+                session._touch()
+            return InsertOneResult(self._insert(self._data(create=True), document), True)
+    
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True, session=None, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        if not documents:
+            raise TypeError("documents must be a non-empty list")
+        result = await self.bulk_write([InsertOne(document) for document in documents], ordered=ordered, session=session)
+        return InsertManyResult([document["_id"] for document in documents], result.acknowledged)
+    
+    def _update(
+        self,
+        data: _CollectionData,
+        filter: Mapping[str, Any],
+        update: Mapping[str, Any],
+        upsert: bool,
+        multi: bool,
+        sort: Optional[Any] = None
+    ) -> Tuple[int, int, Any, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Apply an update; returns (matched, modified, upserted_id, before, after) of the last document"""
+        documents = data.scan(filter)
+        if sort:
+            documents = _sort(list(documents), _normalize_sort(sort))
+        if not multi:
+            documents = documents[:1]
+        
+        if not documents:
+            if not upsert:
+                return 0, 0, None, None, None
+            seed = _copy(_upsert_seed(filter))
+            seed.setdefault("_id", ObjectId())
+            stored = _copy(_apply_update(seed, update, inserting=True))
+            data.check_unique(stored)
+            data.store(stored)
+            return 0, 0, stored["_id"], None, stored
+        
+        modified = 0
+        before = after = None
+        for document in documents:
+            original = bson.encode(document)
+            updated = _copy(_apply_update(_copy(document), update, inserting=False))
+            before, after = document, updated
+            if bson.encode(updated) == original:
+                continue
+            data.check_unique(updated, replacing=document["_id"])
+            data.replace(document, updated)
+            modified += 1
+        return len(documents), modified, None, before, after
+    
+    @staticmethod
+    def _update_result(matched: int, modified: int, upserted_id: Any) -> UpdateResult:
+        raw = {"n": matched + (1 if upserted_id is not None else 0), "nModified": modified, "ok": 1.0}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, True)
+    
+    async def update_one(self, filter: Mapping[str, Any], update: Mapping[str, Any], upsert: bool = False, session=None, **kwargs) -> UpdateResult:
+        with self._lock:
+            if session is not None:
+                session._touch()
+            matched, modified, upserted_id, _, _ = self._update(self._data(create=True), filter, update, upsert, False, kwargs.get("sort"))
+            return self._update_result(matched, modified, upserted_id)
+    
+    async def update_many(self, filter: Mapping[str, Any], update: Mapping[str, Any], upsert: bool = False, session=None, **kwargs) -> UpdateResult:
+        with self._lock:
+            if session is not None:
+                session._touch()
+            matched, modified, upserted_id, _, _ = self._update(self._data(create=True), filter, update, upsert, True)
+            return self._update_result(matched, modified, upserted_id)
+    
+    async def replace_one(self, filter: Mapping[str, Any], replacement: Mapping[str, Any], upsert: bool = False, session=None, **kwargs) -> UpdateResult:
+        if any(str(key).startswith("$") for key in replacement):
+            raise ValueError("replacement can not include $ operators")
+        return await self.update_one(filter, replacement, upsert=upsert, session=session)
+    
+    async def find_one_and_update(
+        self,
+        filter: Mapping[str, Any],
+        update: Mapping[str, Any],
+        projection: Optional[Any] = None,
+        sort: Optional[Any] = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        session=None,
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if session is not None:
+                session._touch()
+            _, _, _, before, after = self._update(self._data(create=True), filter, update, upsert, False, sort)
+            document = after if return_document == ReturnDocument.AFTER else before
+            return _copy(_project(document, projection)) if document is not None else None
+    
+    async def find_one_and_delete(self, filter: Mapping[str, Any], projection: Optional[Any] = None, sort: Optional[Any] = None, session=None, **kwargs) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if session is not None:
+                session._touch()
+            data = self._data()
+            documents = data.scan(filter) if data else []
+            if sort:
+                documents = _sort(list(documents), _normalize_sort(sort))
+            if not documents:
+                return None
+            data.unstore(documents[0])
+            return _copy(_project(documents[0], projection))
+    
+    def _delete(self, data: Optional[_CollectionData], filter: Mapping[str, Any], multi: bool) -> int:
+        documents = data.scan(filter) if data else []
+        if not multi:
+            documents = documents[:1]
+        for document in documents:
+            data.unstore(document)
+        return len(documents)
+    
+    async def delete_one(self, filter: Mapping[str, Any], session=None, **kwargs) -> DeleteResult:
+        with self._lock:
+            if session is not None:
+                session._touch()
+            return DeleteResult({"n": self._delete(self._data(), filter, False), "ok": 1.0}, True)
+    
+    async def delete_many(self, filter: Mapping[str, Any], session=None, **kwargs) -> DeleteResult:
+        with self._lock:
+            if session is not None:
+                session._touch()
+            return DeleteResult({"n": self._delete(self._data(), filter, True), "ok": 1.0}, True)
+    
+    async def bulk_write(self, requests: Iterable[Any], ordered: bool = True, session=None, **kwargs) -> BulkWriteResult:
+        raw: Dict[str, Any] = {
+            "writeErrors": [],
+            "writeConcernErrors": [],
+            "nInserted": 0,
+            "nUpserted": 0,
+            "nMatched": 0,
+            "nModified": 0,
+            "nRemoved": 0,
+            "upserted": []
+        }
+        with self._lock:
+            if session is not None:
+                session._touch()
+            data = self._data(create=True)
+            for position, request in enumerate(requests):
+                try:
+                    if isinstance(request, InsertOne):
+                        self._insert(data, request._doc)
+                        raw["nInserted"] += 1
+                    elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                        matched, modified, upserted_id, _, _ = self._update(
+                            data, request._filter, request._doc, bool(request._upsert), isinstance(request, UpdateMany)
+                        )
+                        raw["nMatched"] += matched
+                        raw["nModified"] += modified
+                        if upserted_id is not None:
+                            raw["nUpserted"] += 1
+                            raw["upserted"].append({"index": position, "_id": upserted_id})
+                    elif isinstance(request, (DeleteOne, DeleteMany)):
+                        raw["nRemoved"] += self._delete(data, request._filter, isinstance(request, DeleteMany))
+                    else:
+                        raise TypeError(f"{request!r} is not a valid request")
+                except (DuplicateKeyError, WriteError) as error:
+                    raw["writeErrors"].append({
+                        "index": position,
+                        "code": error.code,
+                        "errmsg": str(error),
+                        "op": getattr(request, "_doc", None) or getattr(request, "_filter", None)
+                    })
+                    if ordered:
+                        break
+        if raw["writeErrors"]:
+            raise BulkWriteError(raw)
+        return BulkWriteResult(raw, True)
+    
+    # Indexes and collection management
+    
+    async def create_index(self, keys: Any, session=None, **kwargs) -> str:
+        spec = _index_spec(keys)
+        name = kwargs.pop("name", None) or _index_name(spec)
+        unique = bool(kwargs.pop("unique", False))
+        sparse = bool(kwargs.pop("sparse", False))
+        kwargs.pop("background", None)
+        with self._lock:
+            data = self._data(create=True)
+            existing = data.indexes.get(name)
+            if existing is not None:
+                if existing.spec != spec or existing.unique != unique:
+                    raise OperationFailure(f"Index with name: {name} already exists with different options", 85)
+                return name
+            index = _Index(name, spec, unique, sparse, kwargs)
+            if unique:
+                for key, document in data.documents.items():
+                    if not index.applies(document):
+                        continue
+                    entry = index.key(document)
+                    if entry in index.entries:
+                        raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}", 11000)
+                    index.entries[entry] = key
+            data.indexes[name] = index
+        return name
+    
+    async def create_indexes(self, indexes: List[Any], session=None, **kwargs) -> List[str]:
+        return [await self.create_index(model.document["key"].items(), **{
+            key: value for key, value in model.document.items() if key != "key"
+        }) for model in indexes]
+    
+    async def drop_index(self, index_or_name: Any, session=None, **kwargs):
+        name = index_or_name if isinstance(index_or_name, str) else _index_name(_index_spec(index_or_name))
+        with self._lock:
+            data = self._data()
+            if data is None or name not in data.indexes:
+                raise OperationFailure(f"index not found with name [{name}]", 27)
+            del data.indexes[name]
+    
+    async def index_information(self, session=None) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            data = self._data()
+            info: Dict[str, Dict[str, Any]] = {"_id_": {"v": 2, "key": [("_id", 1)]}} if data else {}
+            for index in (data.indexes.values() if data else []):
+                info[index.name] = {"v": 2, "key": list(index.spec), **index.options}
+                if index.unique:
+                    info[index.name]["unique"] = True
+                if index.sparse:
+                    info[index.name]["sparse"] = True
+            return info
+    
+    async def drop(self, session=None, **kwargs):
+        await self.database.drop_collection(self.name)
+    
+    # Aggregation
+    
+    def aggregate(self, pipeline: List[Mapping[str, Any]], session=None, **kwargs) -> MemoryCursor:
+        def fetch() -> List[Dict[str, Any]]:
+            with self._lock:
+                if session is not None:
+                    session._touch()
+                data = self._data()
+                stages = list(pipeline)
+                if stages and "$collStats" in stages[0]:
+                    # Only valid as the first stage; replaces the documents with one stats document
+                    documents = [self._coll_stats(data)]
+                    stages = stages[1:]
+                else:
+                    documents = [_copy(document) for document in (data.documents.values() if data else [])]
+                for stage in stages:
+                    documents = self._run_stage(documents, stage)
+                return documents
+        
+        return MemoryCursor(fetch, batch_size=kwargs.get("batchSize", 0))
+    
+    def _coll_stats(self, data: Optional[_CollectionData]) -> Dict[str, Any]:
+        if data is None:
+            raise OperationFailure(f"Collection [{self.full_name}] not found.", 26)
+        size = sum(len(bson.encode(document)) for document in data.documents.values())
+        count = len(data.documents)
+        return {
+            "ns": self.full_name,
+            "storageStats": {
+                "count": count,
+                "size": size,
+                "avgObjSize": size // count if count else 0,
+                # No compression or index storage in memory; report the raw document bytes
+                "storageSize": size,
+                "totalIndexSize": 0,
+                "nindexes": 1 + len(data.indexes)
+            }
+        }
+    
+    def _run_stage(self, documents: List[Dict[str, Any]], stage: Mapping[str, Any]) -> List[Dict[str, Any]]:
+        (operator, argument), = stage.items()
+        if operator == "$match":
+            return [document for document in documents if matches(document, argument)]
+        if operator == "$project":
+            return [_project(document, argument) for document in documents]
+        if operator in ("$addFields", "$set"):
+            added = []
+            for document in documents:
+                copy = _copy(document)
+                for path, expression in argument.items():
+                    _set_path(copy, path, _evaluate(document, expression))
+                added.append(copy)
+            return added
+        if operator == "$sort":
+            return _sort(documents, _normalize_sort(argument))
+        if operator == "$skip":
+            return documents[argument:]
+        if operator == "$limit":
+            return documents[:argument]
+        if operator == "$count":
+            return [{argument: len(documents)}] if documents else []
+        if operator == "$unwind":
+            path = argument if isinstance(argument, str) else argument["path"]
+            path = path.lstrip("$")
+            unwound = []
+            for document in documents:
+                value = _get_path(document, path)
+                for item in (value if isinstance(value, list) else [] if value is _MISSING else [value]):
+                    copy = _copy(document)
+                    _set_path(copy, path, item)
+                    unwound.append(copy)
+            return unwound
+        if operator == "$lookup" and "localField" in argument:
+            foreign = self.database[argument["from"]]._data()
+            for document in documents:
+                local = _candidates(document, argument["localField"]) or [None]
+                document[argument["as"]] = [
+                    _copy(other) for other in (foreign.documents.values() if foreign else [])
+                    if any(_match_equal(_candidates(other, argument["foreignField"]), value) for value in local)
+                ]
+            return documents
+        if operator == "$group":
+            groups: Dict[Any, Dict[str, Any]] = {}
+            for document in documents:
+                key = _evaluate(document, argument["_id"])
+                group = groups.setdefault(_sort_key(key), {"_id": key})
+                for field, accumulator in argument.items():
+                    if field == "_id":
+                        continue
+                    (name, expression), = accumulator.items()
+                    if name != "$sum":
+                        raise OperationFailure(f"Accumulator {name} is not supported by the memory backend")
+                    value = _evaluate(document, expression)
+                    group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+            return list(groups.values())
+        raise OperationFailure(f"Aggregation stage {operator} is not supported by the memory backend")
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+    
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return MemoryCollection(self, name)
+    
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+    
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, MemoryDatabase) and (self.client, self.name) == (other.client, other.name)
+    
+    def __hash__(self) -> int:
+        return hash((self.client, self.name))
+    
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        return self[name]
+    
+    def with_options(self, **kwargs) -> "MemoryDatabase":
+        return self
+    
+    def _collection_data(self, name: str, create: bool = False) -> Optional[_CollectionData]:
+        server = self.client._server
+        with server.lock:
+            collections = server.databases.get(self.name)
+            if collections is None:
+                if not create:
+                    return None
+                collections = server.databases[self.name] = {}
+            data = collections.get(name)
+            if data is None and create:
+                data = collections[name] = _CollectionData(name)
+            return data
+    
+    async def list_collection_names(self, session=None, **kwargs) -> List[str]:
+        with self.client._server.lock:
+            return list(self.client._server.databases.get(self.name, {}))
+    
+    async def create_collection(self, name: str, session=None, **kwargs) -> MemoryCollection:
+        with self.client._server.lock:
+            if self._collection_data(name) is not None:
+                raise CollectionInvalid(f"collection {name} already exists")
+            self._collection_data(name, create=True).options = kwargs
+        return self[name]
+    
+    async def drop_collection(self, name_or_collection: Any, session=None, **kwargs):
+        name = name_or_collection.name if isinstance(name_or_collection, MemoryCollection) else name_or_collection
+        with self.client._server.lock:
+            self.client._server.databases.get(self.name, {}).pop(name, None)
+    
+    async def command(self, command: Any, *args, session=None, **kwargs) -> Dict[str, Any]:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"Command {name} is not supported by the memory backend", 59)
+
+
+class MemoryClient:
+    """Stand-in for AsyncIOMotorClient backed by process memory"""
+    
+    def __init__(self, uri: str = MEMORY_SCHEME, **kwargs):
+        self.uri = uri
+        self._server = _server_for(uri)
+        self.admin = MemoryDatabase(self, "admin")
+    
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return MemoryDatabase(self, name)
+    
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+    
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+    
+    async def list_database_names(self, session=None) -> List[str]:
+        with self._server.lock:
+            return list(self._server.databases)
+    
+    async def drop_database(self, name_or_database: Any, session=None):
+        name = name_or_database.name if isinstance(name_or_database, MemoryDatabase) else name_or_database
+        with self._server.lock:
+            self._server.databases.pop(name, None)
+    
+    async def start_session(self, causal_consistency: bool = True, **kwargs) -> MemorySession:
+        return MemorySession(self, causal_consistency)
+    
+    def close(self):
+        # Data outlives the client, as it would on a server
+        pass
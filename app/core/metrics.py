@@ -0,0 +1,51 @@
+from typing import Dict, Tuple
+import threading
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class Metrics:
+    """Process-local counters and gauges rendered in the Prometheus text format"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> (type, help)
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[LabelSet, float]] = {}
+    
+    def register(self, name: str, kind: str, help_text: str):
+        """Declare a metric; kind is "counter" or "gauge" """
+        with self._lock:
+            self._meta.setdefault(name, (kind, help_text))
+            self._values.setdefault(name, {})
+    
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+    
+    def set(self, name: str, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+    
+    def get(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(name, {}).get(tuple(sorted(labels.items())), 0)
+    
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in self._values.items():
+                kind, help_text = self._meta.get(name, ("untyped", ""))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in series.items():
+                    label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                    lines.append(f"{name}{{{label_text}}} {value:g}" if label_text else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry, served at GET /metrics
+metrics = Metrics()
@@ -0,0 +1,95 @@
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from app.core.config import settings
+from app.core.database import db, create_client
+from typing import Dict, List, Optional
+import bisect
+import hashlib
+import os
+
+DEFAULT_TARGET = "default"
+
+
+class PlacementRouter:
+    """Maps organizations to one of several configured databases or clusters"""
+    
+    def __init__(self, targets: List[Dict[str, str]], virtual_nodes: int = 100):
+        self.targets: Dict[str, Dict[str, str]] = {}
+        for target in targets:
+            name = target.get("name")
+            if not name or not target.get("database"):
+                raise ValueError("Placement targets need a 'name' and a 'database'")
+            if name == DEFAULT_TARGET:
+                raise ValueError(f"Placement target name '{DEFAULT_TARGET}' is reserved for the master database")
+            self.targets[name] = {
+                "name": name,
+                "database": target["database"],
+                "uri": target.get("uri") or settings.MONGODB_URI
+            }
+        self.virtual_nodes = virtual_nodes
+        self.clients: Dict[str, AsyncIOMotorClient] = {}
+        self._ring: List[int] = []
+        self._ring_targets: List[str] = []
+        self._build_ring()
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+    
+    def _build_ring(self):
+        names = list(self.targets) or [DEFAULT_TARGET]
+        points = sorted(
+            (self._hash(f"{name}#{i}"), name)
+            for name in names
+            for i in range(self.virtual_nodes)
+        )
+        self._ring = [point for point, _ in points]
+        self._ring_targets = [name for _, name in points]
+    
+    def target_names(self) -> List[str]:
+        """All targets an organization may be placed on"""
+        return [DEFAULT_TARGET] + list(self.targets)
+    
+    def default_target_for(self, org_name: str) -> str:
+        """Consistent-hashing placement for an organization without a placement record"""
+        index = bisect.bisect(self._ring, self._hash(org_name)) % len(self._ring)
+        return self._ring_targets[index]
+    
+    async def connect(self):
+        """Open one pooled client per distinct target URI (the master URI reuses db.client)"""
+        for target in self.targets.values():
+            uri = target["uri"]
+            if uri != settings.MONGODB_URI and uri not in self.clients:
+                self.clients[uri] = create_client(uri)
+    
+    async def disconnect(self):
+        """Close the extra target clients"""
+        for client in self.clients.values():
+            client.close()
+        self.clients.clear()
+    
+    def _reset_after_fork(self):
+        self.clients = {}
+    
+    def get_database(self, target: Optional[str] = None) -> AsyncIOMotorDatabase:
+        """Resolve a placement record to its database; legacy orgs without one use the master"""
+        if not target or target == DEFAULT_TARGET:
+            return db.get_master_db()
+        if target not in self.targets:
+            raise Exception(f"Unknown placement target '{target}'")
+        config = self.targets[target]
+        if config["uri"] == settings.MONGODB_URI:
+            return db.get_client()[config["database"]]
+        client = self.clients.get(config["uri"])
+        if client is None:
+            raise Exception("Placement router not connected. Call connect() first.")
+        return client[config["database"]]
+    
+    def get_collection(self, target: Optional[str], collection_name: str):
+        """Get a tenant collection on its placement target"""
+        return self.get_database(target)[collection_name]
+
+
+placement = PlacementRouter(settings.PLACEMENT_TARGETS, settings.PLACEMENT_VIRTUAL_NODES)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=placement._reset_after_fork)
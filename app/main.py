@@ -1,12 +1,28 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import json
 from app.core.database import db
+from app.core.placement import placement
+from app.core.container import ServiceContainer
+from app.core.config import settings
+from app.core.circuit_breaker import breaker
+from app.core.metrics import metrics
+from app.api.deps import require_database
+from app.utils.security import SecurityUtils
+from app.services.auth import AuthService
 from app.api.routes import organization, admin
+from app.middleware.concurrency import AdaptiveConcurrencyMiddleware
+from app.middleware.usage import UsageMiddleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.causal import CausalTokenMiddleware
 
 from fastapi.exceptions import RequestValidationError
-from pymongo.errors import PyMongoError
+from pymongo.errors import PyMongoError, ServerSelectionTimeoutError
 from app.middleware.error_handler import (
     validation_exception_handler,
     pymongo_exception_handler,
@@ -14,12 +30,40 @@ from app.middleware.error_handler import (
 )
 
 
+async def _calibrate_bcrypt():
+    rounds = await asyncio.to_thread(
+        SecurityUtils.calibrate_rounds,
+        settings.BCRYPT_TARGET_HASH_MS,
+        min_rounds=settings.BCRYPT_MIN_ROUNDS
+    )
+    SecurityUtils.bcrypt_rounds = rounds
+    # Unknown emails must keep costing the same as real hashes
+    await asyncio.to_thread(AuthService.build_dummy_hash)
+    print(f"✅ bcrypt cost calibrated to {rounds} rounds")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    calibration = None
+    if settings.BCRYPT_CALIBRATE:
+        # Only when not started through app.server, which calibrates once for all workers;
+        # measured off the event loop while hashes keep using BCRYPT_ROUNDS
+        calibration = asyncio.create_task(_calibrate_bcrypt())
+    if settings.OPENAPI_SCHEMA_FILE:
+        with open(settings.OPENAPI_SCHEMA_FILE, encoding="utf-8") as f:
+            # FastAPI serves a set openapi_schema as-is
+            app.openapi_schema = json.load(f)
     await db.connect()
+    await placement.connect()
+    app.state.container = ServiceContainer()
+    await app.state.container.startup()
     yield
-    # Shutdown
+    # Shutdown (flushes buffered usage counters before the database goes away)
+    if calibration is not None:
+        calibration.cancel()
+    await app.state.container.shutdown()
+    await placement.disconnect()
     await db.disconnect()
 
 
@@ -39,6 +83,21 @@ app.add_exception_handler(Exception, generic_exception_handler)
 # Security: Trust only specific hosts in production
 # app.add_middleware(TrustedHostMiddleware, allowed_hosts=["localhost", "127.0.0.1"])
 
+# Response compression; innermost so usage accounting meters the bytes actually sent
+app.add_middleware(CompressionMiddleware)
+
+# Per-organization usage accounting; innermost so shed requests are not counted
+app.add_middleware(UsageMiddleware)
+
+# Adaptive concurrency limit; added before CORS so it runs inside it and 503s carry CORS headers
+app.add_middleware(AdaptiveConcurrencyMiddleware)
+
+# Request deadlines; outside the concurrency limit so time spent queued counts against the budget
+app.add_middleware(DeadlineMiddleware)
+
+# Read-your-writes across worker processes: clients carry their last write token in a cookie
+app.add_middleware(CausalTokenMiddleware)
+
 # CORS middleware with stricter settings
 app.add_middleware(
     CORSMiddleware,
@@ -60,16 +119,19 @@ async def add_security_headers(request, call_next):
     return response
 
 # Include routers
+# Database-backed routers fail fast while the database circuit breaker is open
 app.include_router(
     organization.router,
     prefix="/org",
-    tags=["Organization Management"]
+    tags=["Organization Management"],
+    dependencies=[Depends(require_database)]
 )
 
 app.include_router(
     admin.router,
     prefix="/admin",
-    tags=["Authentication"]
+    tags=["Authentication"],
+    dependencies=[Depends(require_database)]
 )
 
 
@@ -85,9 +147,22 @@ async def root():
 
 @app.get("/health", tags=["Health"])
 async def health_check():
+    if settings.DB_BREAKER_ENABLED and not breaker.allow():
+        return {"status": "unhealthy", "database": "circuit open", "retry_after": breaker.retry_after()}
     try:
         # Check database connection
         await db.client.admin.command('ping')
         return {"status": "healthy", "database": "connected"}
+    except ServerSelectionTimeoutError as e:
+        # The ping never reached a server, so the command listener did not see it;
+        # probes from load balancers then keep the breaker informed with no user traffic
+        breaker.record_failure()
+        return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def get_metrics():
+    """Process metrics in the Prometheus text format"""
+    return metrics.render()
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import time
+from http.cookies import CookieError, SimpleCookie
+from typing import Any, Optional, Tuple
+import bson
+from bson.errors import BSONError
+from app.core.config import settings
+from app.core.database import causal_token_ttl, request_causal
+
+# Signed (cluster_time, operation_time) of the client's last write
+CAUSAL_COOKIE = "causal_token"
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(settings.SECRET_KEY.encode(), payload, hashlib.sha256).digest()
+
+
+def encode_token(cluster_time: Any, operation_time: Any, ttl: int) -> str:
+    payload = bson.encode({"c": cluster_time, "o": operation_time, "e": int(time.time()) + ttl})
+    return ".".join(base64.urlsafe_b64encode(part).decode().rstrip("=") for part in (payload, _sign(payload)))
+
+
+def decode_token(value: str) -> Optional[Tuple[Any, Any]]:
+    """(cluster_time, operation_time) of a cookie value, or None if it is malformed, forged or expired"""
+    try:
+        payload, signature = (base64.urlsafe_b64decode(part + "=" * (-len(part) % 4)) for part in value.split("."))
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        token = bson.decode(payload)
+        if token["e"] < time.time():
+            return None
+        return token["c"], token["o"]
+    except (ValueError, binascii.Error, BSONError, KeyError, TypeError):
+        return None
+
+
+def cookie_token(scope) -> Optional[Tuple[Any, Any]]:
+    for name, value in scope.get("headers") or []:
+        if name == b"cookie":
+            try:
+                morsel = SimpleCookie(value.decode("latin-1")).get(CAUSAL_COOKIE)
+            except CookieError:
+                return None
+            return decode_token(morsel.value) if morsel else None
+    return None
+
+
+class CausalTokenMiddleware:
+    """ASGI middleware carrying read-your-writes across workers
+    
+    A response to a request that wrote sets a cookie with the write's signed cluster and
+    operation time. Causally consistent sessions of later requests bringing the cookie
+    back advance to it, so a secondary serving their reads waits until it has the write,
+    whichever worker process handles them.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.CAUSAL_CONSISTENCY:
+            await self.app(scope, receive, send)
+            return
+        
+        state = {"read": cookie_token(scope), "write": None}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state["write"]:
+                ttl = causal_token_ttl()
+                cookie = f"{CAUSAL_COOKIE}={encode_token(*state['write'], ttl)}; Max-Age={ttl}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+        
+        reset = request_causal.set(state)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_causal.reset(reset)
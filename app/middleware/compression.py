@@ -0,0 +1,215 @@
+import asyncio
+import zlib
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+# Bodies that are already compressed gain nothing from another pass
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/xml", "application/javascript", "image/svg+xml")
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31: gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+    
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        # Brotli's quality runs 0-11; map the shared 1-9 level onto the faster half
+        self._compressor = brotli.Compressor(quality=min(11, max(0, level - 2)))
+    
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+    
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+    
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encoders() -> Dict[str, type]:
+    """Encodings this process can produce, in server preference order"""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder
+    encoders["gzip"] = GzipEncoder
+    return encoders
+
+
+def negotiate(accept_encoding: str, offered: List[str]) -> Optional[str]:
+    """Pick the offered coding with the highest q-value in Accept-Encoding; ties go to offer order"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().lower().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            weights[coding.strip()] = quality
+    
+    best, best_quality = None, 0.0
+    for coding in offered:
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing response bodies with the best encoding the client accepts
+    
+    Bodies under the minimum size pass through untouched. Larger ones are compressed
+    chunk by chunk as they are sent, so streamed responses never sit in memory whole,
+    and chunks over the offload threshold are compressed in a worker thread.
+    """
+    
+    def __init__(
+        self,
+        app,
+        minimum_size: Optional[int] = None,
+        level: Optional[int] = None,
+        offload_size: Optional[int] = None,
+        encodings: Optional[List[str]] = None
+    ):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.level = settings.COMPRESSION_LEVEL if level is None else level
+        self.offload_size = settings.COMPRESSION_OFFLOAD_SIZE if offload_size is None else offload_size
+        available = available_encoders()
+        wanted = settings.COMPRESSION_ENCODINGS if encodings is None else encodings
+        self.encoders = {name: available[name] for name in wanted if name in available}
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED or not self.encoders:
+            await self.app(scope, receive, send)
+            return
+        
+        accept = ""
+        for name, value in scope.get("headers") or []:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        coding = negotiate(accept, list(self.encoders)) if accept else None
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        responder = _CompressingResponder(self, coding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Per-response state: holds the start message until the first body chunk decides"""
+    
+    def __init__(self, middleware: CompressionMiddleware, coding: str, send):
+        self.middleware = middleware
+        self.coding = coding
+        self.downstream = send
+        self.start: Optional[dict] = None
+        self.encoder = None
+        self.passthrough = False
+    
+    async def send(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start = message
+            self.passthrough = not self._eligible(message)
+            if self.passthrough:
+                await self.downstream(message)
+            return
+        
+        if kind != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+        
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Small single-chunk body: not worth the CPU or the header bytes
+                self.passthrough = True
+                await self.downstream(self.start)
+                await self.downstream(message)
+                return
+            self.encoder = self.middleware.encoders[self.coding](self.middleware.level)
+            await self.downstream(self._compressed_start())
+        
+        compressed = await self._run(self.encoder.compress, body) if body else b""
+        if not more_body:
+            compressed += self.encoder.finish()
+        if compressed or not more_body:
+            await self.downstream({"type": "http.response.body", "body": compressed, "more_body": more_body})
+    
+    def _eligible(self, message) -> bool:
+        if message["status"] < 200 or message["status"] in (204, 206, 304):
+            return False
+        headers = _header_map(message.get("headers") or [])
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1").lower()
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) < self.middleware.minimum_size:
+            return False
+        return True
+    
+    def _compressed_start(self) -> dict:
+        headers: List[Tuple[bytes, bytes]] = []
+        vary = None
+        for name, value in self.start.get("headers") or []:
+            lowered = name.lower()
+            if lowered == b"content-length":
+                continue
+            if lowered == b"vary":
+                vary = value
+                continue
+            if lowered == b"etag" and not value.startswith(b"W/"):
+                # The encoded bytes differ from the identity representation the strong tag names
+                value = b"W/" + value
+            headers.append((name, value))
+        headers.append((b"content-encoding", self.coding.encode()))
+        headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        return {**self.start, "headers": headers}
+    
+    async def _run(self, fn, data: bytes) -> bytes:
+        if len(data) >= self.middleware.offload_size:
+            # zlib, brotli and zstd release the GIL while compressing
+            return await asyncio.to_thread(fn, data)
+        return fn(data)
+
+
+def _header_map(headers) -> Dict[bytes, bytes]:
+    return {name.lower(): value for name, value in headers}
@@ -0,0 +1,220 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.utils.security import SecurityUtils
+
+# Priority classes, lower value = shed last
+CRITICAL = 0
+HIGH = 1
+NORMAL = 2
+LOW = 3
+PRIORITIES = {"critical": CRITICAL, "high": HIGH, "normal": NORMAL, "low": LOW}
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by observed latency, with a short priority queue"""
+    
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 500,
+        latency_target_ms: float = 250.0,
+        backoff: float = 0.9,
+        max_queue: int = 100,
+        queue_timeout_ms: float = 100.0,
+        critical_reserve: int = 4
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target_ms / 1000
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.critical_reserve = critical_reserve
+        self.in_flight = 0
+        self.rejected = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._queued = 0
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+    
+    def _capacity(self, priority: int) -> int:
+        # Critical requests may use a small reserve above the adaptive limit
+        return int(self.limit) + (self.critical_reserve if priority == CRITICAL else 0)
+    
+    async def acquire(self, priority: int) -> bool:
+        """Take a slot, waiting briefly in the priority queue; False means shed the request"""
+        if self.in_flight < self._capacity(priority) and not self._queued:
+            self.in_flight += 1
+            return True
+        
+        if self._queued >= self.max_queue and not self._evict_lower_than(priority):
+            self.rejected += 1
+            return False
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future))
+        self._queued += 1
+        self._dispatch()
+        try:
+            # _dispatch() hands the slot over before resolving the future with True
+            return await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            return self._leave_queue(future, timed_out=True)
+        except asyncio.CancelledError:
+            if self._leave_queue(future, timed_out=False):
+                self.release(None)
+            raise
+    
+    def _leave_queue(self, future: asyncio.Future, timed_out: bool) -> bool:
+        """Withdraw a waiter; True if it had already been granted a slot"""
+        if future.done():
+            # Granted (True) or evicted (False, already counted)
+            return future.result()
+        future.cancel()
+        self._queued -= 1
+        if timed_out:
+            self.rejected += 1
+        return False
+    
+    def _evict_lower_than(self, priority: int) -> bool:
+        """Reject the lowest-priority waiter if it ranks below priority"""
+        live = [entry for entry in self._queue if not entry[2].done()]
+        if not live:
+            return False
+        victim = max(live, key=lambda entry: (entry[0], entry[1]))
+        if victim[0] <= priority:
+            return False
+        victim[2].set_result(False)
+        self._queued -= 1
+        self.rejected += 1
+        return True
+    
+    def release(self, latency: Optional[float], target: Optional[float] = None):
+        """Return a slot, adjust the limit from the request's latency and wake the next waiter
+        
+        `target` overrides the latency target for this request (seconds); 0 leaves the
+        limit alone, for routes that are slow by design.
+        """
+        self.in_flight -= 1
+        if target is None:
+            target = self.latency_target
+        if latency is not None and target > 0:
+            self._adjust(latency, target)
+        
+        self._dispatch()
+    
+    def _dispatch(self):
+        """Admit queued waiters in priority order while capacity allows"""
+        while self._queue:
+            priority, _, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= self._capacity(priority):
+                break
+            heapq.heappop(self._queue)
+            self._queued -= 1
+            self.in_flight += 1
+            future.set_result(True)
+    
+    def _adjust(self, latency: float, target: float):
+        now = time.monotonic()
+        if latency > target:
+            # Multiplicative decrease, at most once per target interval so one slow burst
+            # does not collapse the limit
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        else:
+            # Additive increase: about +1 per limit's worth of fast requests
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+    
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "rejected": self.rejected
+        }
+
+
+class AdaptiveConcurrencyMiddleware:
+    """ASGI middleware bounding in-flight HTTP requests and shedding excess with 503"""
+    
+    def __init__(
+        self,
+        app,
+        limiter: Optional[AdaptiveLimiter] = None,
+        routes: Optional[Dict[str, str]] = None,
+        latency_targets: Optional[Dict[str, float]] = None
+    ):
+        self.app = app
+        self.limiter = limiter or AdaptiveLimiter(
+            initial_limit=settings.CONCURRENCY_INITIAL_LIMIT,
+            min_limit=settings.CONCURRENCY_MIN_LIMIT,
+            max_limit=settings.CONCURRENCY_MAX_LIMIT,
+            latency_target_ms=settings.CONCURRENCY_LATENCY_TARGET_MS,
+            max_queue=settings.CONCURRENCY_MAX_QUEUE,
+            queue_timeout_ms=settings.CONCURRENCY_QUEUE_TIMEOUT_MS,
+            critical_reserve=settings.CONCURRENCY_CRITICAL_RESERVE
+        )
+        routes = settings.CONCURRENCY_PRIORITY_ROUTES if routes is None else routes
+        self.routes = {key: PRIORITIES[value] for key, value in routes.items()}
+        targets = settings.CONCURRENCY_LATENCY_TARGET_ROUTES if latency_targets is None else latency_targets
+        self.latency_targets = {key: value / 1000 for key, value in targets.items()}
+    
+    def classify(self, scope) -> int:
+        """Priority of a request from its "METHOD /path" or "/path" entry in the route table"""
+        path = scope["path"]
+        priority = self.routes.get(f"{scope['method']} {path}", self.routes.get(path, NORMAL))
+        if priority == HIGH:
+            # Only authenticated calls earn the high class; anonymous ones would just get a 401.
+            # The token is verified (one HMAC, no database), so a made-up one does not jump the queue
+            headers = dict(scope.get("headers") or [])
+            scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or SecurityUtils.decode_access_token(token.strip()) is None:
+                return NORMAL
+        return priority
+    
+    def latency_target(self, scope) -> Optional[float]:
+        """Latency target (seconds) of a request's route, None for the limiter's default"""
+        path = scope["path"]
+        return self.latency_targets.get(f"{scope['method']} {path}", self.latency_targets.get(path))
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.CONCURRENCY_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        if not await self.limiter.acquire(self.classify(scope)):
+            await self._reject(send)
+            return
+        
+        start = time.monotonic()
+        latency = None
+        try:
+            await self.app(scope, receive, send)
+            latency = time.monotonic() - start
+        finally:
+            self.limiter.release(latency, self.latency_target(scope))
+    
+    @staticmethod
+    async def _reject(send):
+        body = json.dumps({"detail": "Server overloaded. Please retry later."}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.CONCURRENCY_RETRY_AFTER_SECONDS).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
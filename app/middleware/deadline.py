@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+import pymongo
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Clients may ask for a tighter (or, up to REQUEST_DEADLINE_MAX_MS, looser) budget
+DEADLINE_HEADER = b"x-request-deadline-ms"
+
+metrics.register("http_deadline_exceeded_total", "counter", "Requests stopped by their deadline")
+metrics.register("http_client_disconnects_total", "counter", "Requests cancelled because the client went away")
+
+
+def route_label(scope) -> str:
+    """Route template of a request once routing has run, so path parameters do not explode the labels"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
+
+
+def deadline_expired(scope) -> bool:
+    """True once the request's deadline (set by DeadlineMiddleware) has passed"""
+    deadline = (scope.get("state") or {}).get("deadline")
+    return deadline is not None and time.monotonic() >= deadline
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each request a time budget and cancelling its handler on
+    deadline or client disconnect
+    
+    The budget is applied as a pymongo timeout() context around the handler, so every
+    driver operation it issues carries the remaining time as maxTimeMS.
+    """
+    
+    def __init__(self, app, routes: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.routes = settings.REQUEST_DEADLINE_ROUTES if routes is None else routes
+    
+    def budget_ms(self, scope) -> float:
+        """Deadline of a request: the client header if valid, else its "METHOD /path" or "/path" entry"""
+        path = scope["path"]
+        budget = self.routes.get(f"{scope['method']} {path}", self.routes.get(path, settings.REQUEST_DEADLINE_MS))
+        for name, value in scope.get("headers") or []:
+            if name == DEADLINE_HEADER:
+                try:
+                    requested = float(value)
+                except ValueError:
+                    break
+                if requested > 0:
+                    budget = min(requested, settings.REQUEST_DEADLINE_MAX_MS)
+                break
+        return budget
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.REQUEST_DEADLINE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        budget = self.budget_ms(scope) / 1000
+        scope.setdefault("state", {})["deadline"] = time.monotonic() + budget
+        
+        # A pump owns the client channel so a disconnect is seen even while the handler
+        # is not reading; request messages are handed on through a queue
+        inbox: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response_started = False
+        response_complete = False
+        status_code = None
+        
+        async def pump():
+            while True:
+                message = await receive()
+                inbox.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+        
+        async def send_wrapper(message):
+            nonlocal response_started, response_complete, status_code
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+        
+        # Tasks copy the current context, so the driver timeout follows the handler
+        with pymongo.timeout(budget):
+            handler = asyncio.ensure_future(self.app(scope, inbox.get, send_wrapper))
+        pump_task = asyncio.ensure_future(pump())
+        watcher = asyncio.ensure_future(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait({handler, watcher}, timeout=budget, return_when=asyncio.FIRST_COMPLETED)
+            if handler in done:
+                handler.result()
+                if status_code == 504:
+                    # A driver operation ran out of the budget first
+                    metrics.inc("http_deadline_exceeded_total", route=route_label(scope))
+                return
+            if response_complete:
+                # The response is out and the client hung up; let the handler finish unwinding
+                await handler
+                return
+            
+            handler.cancel()
+            await asyncio.gather(handler, return_exceptions=True)
+            if watcher in done:
+                metrics.inc("http_client_disconnects_total", route=route_label(scope))
+                return
+            
+            metrics.inc("http_deadline_exceeded_total", route=route_label(scope))
+            if not response_started:
+                await self._timeout(send)
+        finally:
+            for task in (handler, pump_task, watcher):
+                task.cancel()
+    
+    @staticmethod
+    async def _timeout(send):
+        body = json.dumps({"detail": "Request deadline exceeded"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,7 +1,9 @@
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from pymongo.errors import PyMongoError
+from pymongo.errors import PyMongoError, ConnectionFailure, ServerSelectionTimeoutError
+from app.core.circuit_breaker import breaker
+from app.middleware.deadline import deadline_expired
 import traceback
 
 
@@ -26,6 +28,25 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 async def pymongo_exception_handler(request: Request, exc: PyMongoError):
     """Handle MongoDB errors"""
+    if isinstance(exc, ServerSelectionTimeoutError):
+        # Server selection gives up before any command runs, so the command listener never
+        # sees it; record it even when it surfaces as the request's deadline running out
+        breaker.record_failure()
+    
+    if exc.timeout and deadline_expired(request.scope):
+        # The request's own deadline ran out (maxTimeMS or client-side timeout), not the database
+        return JSONResponse(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            content={"detail": "Request deadline exceeded"}
+        )
+    
+    if isinstance(exc, ConnectionFailure):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Database temporarily unavailable. Please retry later."},
+            headers={"Retry-After": str(breaker.retry_after())}
+        )
+    
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
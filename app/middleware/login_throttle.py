@@ -0,0 +1,136 @@
+from fastapi import Request
+from collections import OrderedDict
+from typing import Optional
+import math
+import time
+from app.core.config import settings
+from app.utils.exceptions import TooManyRequestsException
+
+
+class _Counter:
+    """Failure counter for a single email or IP key"""
+    __slots__ = ("failures", "blocked_until", "last_seen")
+    
+    def __init__(self):
+        self.failures = 0
+        self.blocked_until = 0.0
+        self.last_seen = 0.0
+
+
+class LoginThrottle:
+    def __init__(
+        self,
+        email_free_attempts: int = 5,
+        ip_free_attempts: int = 20,
+        base_delay: float = 1.0,
+        max_lockout: int = 900,
+        max_entries: int = 100_000
+    ):
+        """
+        Login throttle: after the free attempts are used up, each further failure
+        doubles the lockout window (base_delay * 2^n), capped at max_lockout seconds.
+        Counters live in an LRU map bounded to max_entries keys.
+        """
+        self.email_free_attempts = email_free_attempts
+        self.ip_free_attempts = ip_free_attempts
+        self.base_delay = base_delay
+        self.max_lockout = max_lockout
+        self.max_entries = max_entries
+        self.storage: "OrderedDict[str, _Counter]" = OrderedDict()
+    
+    def _get(self, key: str, now: float) -> Optional[_Counter]:
+        counter = self.storage.get(key)
+        if counter is None:
+            return None
+        # Forget keys that have been quiet for longer than the longest lockout
+        if now - counter.last_seen > self.max_lockout and now >= counter.blocked_until:
+            del self.storage[key]
+            return None
+        self.storage.move_to_end(key)
+        return counter
+    
+    def _touch(self, key: str, now: float) -> _Counter:
+        counter = self._get(key, now)
+        if counter is None:
+            counter = _Counter()
+            self.storage[key] = counter
+            while len(self.storage) > self.max_entries:
+                self.storage.popitem(last=False)
+        counter.last_seen = now
+        return counter
+    
+    def retry_after(self, email: str, ip: str) -> int:
+        """Return seconds until a login may be attempted, 0 if allowed now"""
+        now = time.monotonic()
+        wait = 0.0
+        for key in (f"email:{email.lower()}", f"ip:{ip}"):
+            counter = self._get(key, now)
+            if counter and counter.blocked_until > now:
+                wait = max(wait, counter.blocked_until - now)
+        return math.ceil(wait)
+    
+    def _keys(self, email: str, ip: str):
+        return (
+            (f"email:{email.lower()}", self.email_free_attempts),
+            (f"ip:{ip}", self.ip_free_attempts)
+        )
+    
+    def reserve(self, email: str, ip: str) -> int:
+        """Admit an attempt, counting it as a failure up front; else seconds until one may be made
+        
+        Check and count happen in one step, so concurrent attempts cannot all pass the check
+        before any of them fails. Attempts that end without a wrong password give it back
+        through release() or record_success().
+        """
+        retry_after = self.retry_after(email, ip)
+        if retry_after == 0:
+            self.record_failure(email, ip)
+        return retry_after
+    
+    def record_failure(self, email: str, ip: str):
+        """Count a failed attempt and extend the lockout window when over the limit"""
+        now = time.monotonic()
+        for key, free_attempts in self._keys(email, ip):
+            counter = self._touch(key, now)
+            counter.failures += 1
+            excess = counter.failures - free_attempts
+            if excess > 0:
+                delay = min(self.base_delay * (2 ** min(excess - 1, 32)), self.max_lockout)
+                counter.blocked_until = now + delay
+    
+    def release(self, email: str, ip: str):
+        """Give back an attempt counted by reserve()"""
+        now = time.monotonic()
+        for key, free_attempts in self._keys(email, ip):
+            counter = self._get(key, now)
+            if counter is None:
+                continue
+            counter.failures = max(counter.failures - 1, 0)
+            if counter.failures <= free_attempts:
+                # Lockouts only start past the free attempts
+                counter.blocked_until = 0.0
+    
+    def record_success(self, email: str, ip: str):
+        """Give back the reserved attempt and clear the email counter after a successful login"""
+        self.release(email, ip)
+        self.storage.pop(f"email:{email.lower()}", None)
+
+
+# Global login throttle instance
+login_throttle = LoginThrottle(
+    email_free_attempts=settings.LOGIN_THROTTLE_EMAIL_FREE_ATTEMPTS,
+    ip_free_attempts=settings.LOGIN_THROTTLE_IP_FREE_ATTEMPTS,
+    base_delay=settings.LOGIN_THROTTLE_BASE_DELAY_SECONDS,
+    max_lockout=settings.LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS,
+    max_entries=settings.LOGIN_THROTTLE_MAX_ENTRIES
+)
+
+
+def check_login_throttle(email: str, request: Request):
+    """Reserve a login attempt, rejecting it before any password hashing work if locked out"""
+    retry_after = login_throttle.reserve(email, request.client.host)
+    if retry_after > 0:
+        raise TooManyRequestsException(
+            retry_after,
+            detail="Too many failed login attempts. Please try again later."
+        )
@@ -0,0 +1,62 @@
+import time
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.services.usage import request_organization
+from app.utils.security import SecurityUtils
+
+
+class UsageMiddleware:
+    """ASGI middleware counting requests, latency and response bytes per organization"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    @staticmethod
+    def organization_from_token(scope) -> Optional[Tuple[str, str]]:
+        """(organization_id, organization_name) of a valid bearer token, if any"""
+        for name, value in scope.get("headers") or []:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                payload = SecurityUtils.decode_access_token(token.strip())
+                if not payload or "organization_id" not in payload:
+                    return None
+                return payload["organization_id"], payload["organization_name"]
+        return None
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.USAGE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.monotonic()
+        status_code = 500
+        bytes_out = 0
+        
+        async def send_wrapper(message):
+            nonlocal status_code, bytes_out
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+        
+        state = {"organization": None}
+        reset = request_organization.set(state)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_organization.reset(reset)
+            self._record(scope, state, status_code, bytes_out, (time.monotonic() - start) * 1000)
+    
+    def _record(self, scope, state, status_code: int, bytes_out: int, latency_ms: float):
+        container = getattr(scope["app"].state, "container", None)
+        usage = getattr(container, "usage", None)
+        if usage is None:
+            return
+        
+        # Unauthenticated requests count only once a handler found the organization they name
+        organization = self.organization_from_token(scope) or state["organization"]
+        if organization:
+            usage.record(*organization, latency_ms, bytes_out, error=status_code >= 500)
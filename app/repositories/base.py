@@ -9,30 +9,30 @@ class BaseRepository(ABC):
     def __init__(self, collection: AsyncIOMotorCollection):
         self.collection = collection
     
-    async def find_one(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def find_one(self, query: Dict[str, Any], session=None) -> Optional[Dict[str, Any]]:
         """Find single document"""
-        return await self.collection.find_one(query)
+        return await self.collection.find_one(query, session=session)
     
-    async def find_many(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def find_many(self, query: Dict[str, Any], session=None) -> List[Dict[str, Any]]:
         """Find multiple documents"""
-        cursor = self.collection.find(query)
+        cursor = self.collection.find(query, session=session)
         return await cursor.to_list(length=None)
     
-    async def insert_one(self, document: Dict[str, Any]) -> str:
+    async def insert_one(self, document: Dict[str, Any], session=None) -> str:
         """Insert single document and return inserted ID"""
-        result = await self.collection.insert_one(document)
+        result = await self.collection.insert_one(document, session=session)
         return str(result.inserted_id)
     
-    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any]) -> bool:
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], session=None) -> bool:
         """Update single document"""
-        result = await self.collection.update_one(query, {"$set": update})
+        result = await self.collection.update_one(query, {"$set": update}, session=session)
         return result.modified_count > 0
     
-    async def delete_one(self, query: Dict[str, Any]) -> bool:
+    async def delete_one(self, query: Dict[str, Any], session=None) -> bool:
         """Delete single document"""
-        result = await self.collection.delete_one(query)
+        result = await self.collection.delete_one(query, session=session)
         return result.deleted_count > 0
     
-    async def count_documents(self, query: Dict[str, Any]) -> int:
+    async def count_documents(self, query: Dict[str, Any], session=None) -> int:
         """Count documents matching query"""
-        return await self.collection.count_documents(query)
+        return await self.collection.count_documents(query, session=session)
@@ -0,0 +1,67 @@
+from app.repositories.base import BaseRepository
+from app.core.database import db
+from typing import Optional, Dict, Any
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class IdempotencyRepository(BaseRepository):
+    """Repository for stored responses of requests sent with an Idempotency-Key"""
+    
+    def __init__(self):
+        super().__init__(db.get_master_db()["idempotency_keys"])
+    
+    async def ensure_indexes(self):
+        """Expire records once expires_at has passed"""
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+    
+    async def claim(
+        self, key: str, fingerprint: str, ttl_seconds: int, lock_seconds: int
+    ) -> Optional[Dict[str, Any]]:
+        """Reserve key for this request; returns None if claimed, else the existing record"""
+        now = datetime.utcnow()
+        for _ in range(2):
+            try:
+                await self.collection.insert_one({
+                    "_id": key,
+                    "fingerprint": fingerprint,
+                    "status": IN_PROGRESS,
+                    "locked_until": now + timedelta(seconds=lock_seconds),
+                    "expires_at": now + timedelta(seconds=ttl_seconds)
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+            
+            record = await self.collection.find_one({"_id": key})
+            if record is None:
+                continue
+            if record["expires_at"] <= now:
+                # Past its TTL but not yet removed by the TTL monitor
+                await self.collection.delete_one({"_id": key, "expires_at": record["expires_at"]})
+                continue
+            if record["status"] == IN_PROGRESS and record["locked_until"] <= now and record["fingerprint"] == fingerprint:
+                # The request holding the key died mid-way; take it over
+                result = await self.collection.update_one(
+                    {"_id": key, "status": IN_PROGRESS, "locked_until": record["locked_until"]},
+                    {"$set": {"locked_until": now + timedelta(seconds=lock_seconds)}}
+                )
+                if result.modified_count:
+                    return None
+            return record
+        return await self.collection.find_one({"_id": key})
+    
+    async def complete(self, key: str, response: Dict[str, Any]) -> bool:
+        """Store the final response of a claimed key"""
+        result = await self.collection.update_one(
+            {"_id": key, "status": IN_PROGRESS},
+            {"$set": {"status": COMPLETED, **response}, "$unset": {"locked_until": ""}}
+        )
+        return result.modified_count > 0
+    
+    async def release(self, key: str) -> bool:
+        """Drop an unfinished claim so the request can be retried"""
+        return await self.delete_one({"_id": key, "status": IN_PROGRESS})
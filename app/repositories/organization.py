@@ -1,7 +1,16 @@
 from app.repositories.base import BaseRepository
 from app.core.database import db
-from typing import Optional, Dict, Any
+from app.core.placement import DEFAULT_TARGET
+from app.utils.singleflight import SingleFlight
+from app.utils.conditional import utcnow_ms
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import ReturnDocument
+import asyncio
+
+# Matches organizations that have not been tombstoned (field missing or null)
+LIVE = {"deleted_at": None}
 
 
 class OrganizationRepository(BaseRepository):
@@ -11,41 +20,272 @@ class OrganizationRepository(BaseRepository):
         master_db = db.get_master_db()
         super().__init__(master_db["organizations"])
         self.admins_collection = master_db["admins"]
+        
+        # Read-only lookups may be served by secondaries; pass primary=True when
+        # the result guards a write (e.g. uniqueness checks)
+        read_preference = db.get_read_preference()
+        self.read_collection = self.collection.with_options(read_preference=read_preference)
+        self.admins_read_collection = self.admins_collection.with_options(read_preference=read_preference)
+        
+        # Concurrent identical secondary-eligible lookups share one query
+        self._flight = SingleFlight()
+    
+    async def _find_one(self, collection, query: Dict[str, Any], key, session, primary: bool):
+        """find_one, coalesced with identical in-flight lookups when freshness allows"""
+        # Primary reads guard writes, and sessions carrying a causal token need data at
+        # least as new as their own write; neither may join a query already running
+        if primary or (session is not None and session.operation_time is not None):
+            return await collection.find_one(query, session=session)
+        
+        document = await self._flight.do(key, lambda: collection.find_one(query))
+        # Each caller gets its own copy so one caller's changes cannot leak to another
+        return dict(document) if document is not None else None
+    
+    def _orgs(self, primary: bool):
+        return self.collection if primary else self.read_collection
     
-    async def get_by_name(self, org_name: str) -> Optional[Dict[str, Any]]:
+    def _admins(self, primary: bool):
+        return self.admins_collection if primary else self.admins_read_collection
+    
+    async def get_by_name(
+        self, org_name: str, session=None, primary: bool = False, include_deleted: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """Get organization by name"""
-        return await self.find_one({"organization_name": org_name})
+        query = {"organization_name": org_name}
+        if not include_deleted:
+            query.update(LIVE)
+        key = ("org_by_name", org_name, include_deleted)
+        return await self._find_one(self._orgs(primary), query, key, session, primary)
     
-    async def get_by_id(self, org_id: str) -> Optional[Dict[str, Any]]:
+    async def get_by_id(
+        self, org_id: str, session=None, primary: bool = False, include_deleted: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """Get organization by ID"""
-        return await self.find_one({"_id": ObjectId(org_id)})
+        query = {"_id": ObjectId(org_id)}
+        if not include_deleted:
+            query.update(LIVE)
+        key = ("org_by_id", org_id, include_deleted)
+        return await self._find_one(self._orgs(primary), query, key, session, primary)
+    
+    async def get_for_admin(
+        self, admin: Dict[str, Any], session=None, primary: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Live organization an access token was issued for, by its id
+        
+        None once the organization was deleted or renamed: the name in the token then no
+        longer identifies it, and may already belong to another organization.
+        """
+        org = await self.get_by_id(admin["organization_id"], session=session, primary=primary)
+        if org is None or org["organization_name"] != admin["organization_name"]:
+            return None
+        return org
+    
+    async def get_validator(self, org_name: str, session=None) -> Optional[Dict[str, Any]]:
+        """Get only the version fields of a live organization, answered from the validator index"""
+        # Filter and projection use only indexed fields; the tombstone check is done here
+        # because a null-equality filter would force a document fetch
+        query = {"organization_name": org_name}
+        projection = {"_id": 1, "updated_at": 1, "created_at": 1, "deleted_at": 1}
+        if session is not None and session.operation_time is not None:
+            document = await self.read_collection.find_one(query, projection, session=session)
+        else:
+            document = await self._flight.do(
+                ("validator", org_name),
+                lambda: self.read_collection.find_one(query, projection)
+            )
+        if document is None or document.get("deleted_at") is not None:
+            return None
+        return dict(document)
     
-    async def create_organization(self, org_data: Dict[str, Any]) -> str:
+    async def ensure_indexes(self):
+        """Create the indexes the lookups rely on"""
+        await asyncio.gather(
+            # Covers get_validator: filter and projection fields are all in the index
+            self.collection.create_index(
+                [("organization_name", 1), ("updated_at", 1), ("created_at", 1), ("deleted_at", 1), ("_id", 1)],
+                name="org_validator"
+            ),
+            self.admins_collection.create_index("email"),
+            self.admins_collection.create_index("organization_id")
+        )
+    
+    async def create_organization(self, org_data: Dict[str, Any], session=None) -> str:
         """Create new organization"""
-        return await self.insert_one(org_data)
+        return await self.insert_one(org_data, session=session)
     
-    async def update_organization(self, org_id: str, update_data: Dict[str, Any]) -> bool:
+    async def update_organization(self, org_id: str, update_data: Dict[str, Any], session=None) -> bool:
         """Update organization details"""
-        return await self.update_one({"_id": ObjectId(org_id)}, update_data)
+        return await self.update_one({"_id": ObjectId(org_id)}, update_data, session=session)
+    
+    async def add_index_spec(self, org_id: str, name: str, spec: Dict[str, Any], limit: int) -> bool:
+        """Declare an index on a live organization unless the name is taken or it is at its limit"""
+        result = await self.collection.update_one(
+            {
+                "_id": ObjectId(org_id),
+                **LIVE,
+                f"indexes.{name}": {"$exists": False},
+                "index_count": {"$not": {"$gte": limit}}
+            },
+            {"$set": {f"indexes.{name}": spec}, "$inc": {"index_count": 1}}
+        )
+        return result.modified_count > 0
+    
+    async def set_index_status(self, org_id: str, name: str, status: str, error: Optional[str] = None) -> bool:
+        """Record the outcome of an index build, if the index is still declared"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(org_id), f"indexes.{name}": {"$exists": True}},
+            {"$set": {f"indexes.{name}.status": status, f"indexes.{name}.error": error}}
+        )
+        return result.modified_count > 0
+    
+    async def remove_index_spec(self, org_id: str, name: str) -> bool:
+        """Withdraw a declared index"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(org_id), f"indexes.{name}": {"$exists": True}},
+            {"$unset": {f"indexes.{name}": ""}, "$inc": {"index_count": -1}}
+        )
+        return result.modified_count > 0
+    
+    async def tombstone_organization(self, org_id: str, session=None) -> bool:
+        """Mark organization as deleted; its data is purged in the background"""
+        now = utcnow_ms()
+        result = await self.collection.update_one(
+            {"_id": ObjectId(org_id), **LIVE},
+            {"$set": {"deleted_at": now, "updated_at": now}},
+            session=session
+        )
+        return result.modified_count > 0
+    
+    async def claim_tombstone(self, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """Atomically lease one tombstoned organization for purging"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"deleted_at": {"$ne": None}, "purge_lease_until": {"$not": {"$gt": now}}},
+            {"$set": {"purge_lease_until": now + timedelta(seconds=lease_seconds)}},
+            return_document=ReturnDocument.AFTER
+        )
     
-    async def delete_organization(self, org_name: str) -> bool:
+    async def get_ids(self, org_ids: List[ObjectId]) -> List[ObjectId]:
+        """Return which of the given organization IDs exist, tombstoned or not"""
+        cursor = self.collection.find({"_id": {"$in": org_ids}}, {"_id": 1})
+        return [org["_id"] async for org in cursor]
+    
+    async def get_search_entries(self) -> List[Dict[str, Any]]:
+        """Name and admin email of every live organization, from two projected scans"""
+        orgs, admins = await asyncio.gather(
+            self.read_collection.find(LIVE, {"organization_name": 1}).to_list(length=None),
+            self.admins_read_collection.find({}, {"email": 1, "organization_id": 1}).to_list(length=None)
+        )
+        emails = {admin.get("organization_id"): admin.get("email", "") for admin in admins}
+        return [
+            {
+                "id": str(org["_id"]),
+                "organization_name": org["organization_name"],
+                "admin_email": emails.get(str(org["_id"]), "")
+            }
+            for org in orgs
+        ]
+    
+    async def get_many_with_admins(self, org_names: List[str]) -> List[Dict[str, Any]]:
+        """Live organizations among org_names with their admin's email, in one aggregation"""
+        cursor = self.read_collection.aggregate([
+            {"$match": {"organization_name": {"$in": org_names}, **LIVE}},
+            # admin_id is stored as a string ("" until creation finishes)
+            {"$addFields": {
+                "admin_oid": {"$convert": {"input": "$admin_id", "to": "objectId", "onError": None, "onNull": None}}
+            }},
+            {"$lookup": {"from": "admins", "localField": "admin_oid", "foreignField": "_id", "as": "admin"}},
+            {"$addFields": {"admin_email": {"$first": "$admin.email"}}},
+            {"$project": {"_id": 0, "organization_name": 1, "collection_name": 1, "admin_email": 1, "created_at": 1}}
+        ])
+        return await cursor.to_list(length=len(org_names))
+    
+    async def get_storage_records(self) -> List[Dict[str, Any]]:
+        """Fields needed to locate every live organization's data"""
+        cursor = self.read_collection.find(
+            LIVE, {"organization_name": 1, "collection_name": 1, "placement": 1, "tenancy": 1}
+        ).sort("organization_name", 1)
+        return await cursor.to_list(length=None)
+    
+    async def get_referenced_collections(self, target: str, collection_names: List[str]) -> List[str]:
+        """Return which of the given collection names on a placement target belong to an organization"""
+        # Legacy documents without a placement record live on the default target
+        placements = [target, None] if target == DEFAULT_TARGET else [target]
+        cursor = self.collection.find(
+            {"collection_name": {"$in": collection_names}, "placement": {"$in": placements}},
+            {"collection_name": 1}
+        )
+        return [org["collection_name"] async for org in cursor]
+    
+    async def find_incomplete(self, created_before: datetime, limit: int) -> List[Dict[str, Any]]:
+        """Organizations whose creation never finished (no admin linked)"""
+        cursor = self.collection.find(
+            {"admin_id": "", "created_at": {"$lt": created_before}, **LIVE},
+            {"organization_name": 1}
+        ).limit(limit)
+        return await cursor.to_list(length=limit)
+    
+    async def get_admins_page(
+        self, after_id: Optional[ObjectId], created_before: datetime, limit: int
+    ) -> List[Dict[str, Any]]:
+        """Page through admins created before a cutoff in _id order"""
+        query: Dict[str, Any] = {"created_at": {"$lt": created_before}}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        cursor = self.admins_collection.find(query, {"organization_id": 1}).sort("_id", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+    
+    async def delete_admins_by_ids(self, admin_ids: List[ObjectId]) -> int:
+        """Delete admin users by ID"""
+        result = await self.admins_collection.delete_many({"_id": {"$in": admin_ids}})
+        return result.deleted_count
+    
+    async def delete_organization_by_id(self, org_id: str) -> bool:
+        """Delete organization document by ID"""
+        return await self.delete_one({"_id": ObjectId(org_id)})
+    
+    async def delete_admins_by_organization_id(self, org_id: str) -> int:
+        """Delete all admin users of an organization"""
+        result = await self.admins_collection.delete_many({"organization_id": org_id})
+        return result.deleted_count
+    
+    async def delete_organization(self, org_name: str, session=None) -> bool:
         """Delete organization"""
-        return await self.delete_one({"organization_name": org_name})
+        return await self.delete_one({"organization_name": org_name}, session=session)
     
-    async def create_admin(self, admin_data: Dict[str, Any]) -> str:
+    async def create_admin(self, admin_data: Dict[str, Any], session=None) -> str:
         """Create admin user"""
-        result = await self.admins_collection.insert_one(admin_data)
+        result = await self.admins_collection.insert_one(admin_data, session=session)
         return str(result.inserted_id)
     
-    async def get_admin_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+    async def get_admin_by_email(self, email: str, session=None, primary: bool = False) -> Optional[Dict[str, Any]]:
         """Get admin by email"""
-        return await self.admins_collection.find_one({"email": email})
+        key = ("admin_by_email", email)
+        return await self._find_one(self._admins(primary), {"email": email}, key, session, primary)
     
-    async def get_admin_by_id(self, admin_id: str) -> Optional[Dict[str, Any]]:
+    async def get_admin_by_id(self, admin_id: str, session=None, primary: bool = False) -> Optional[Dict[str, Any]]:
         """Get admin by ID"""
-        return await self.admins_collection.find_one({"_id": ObjectId(admin_id)})
+        key = ("admin_by_id", admin_id)
+        return await self._find_one(self._admins(primary), {"_id": ObjectId(admin_id)}, key, session, primary)
+    
+    async def update_admin(self, email: str, update_data: Dict[str, Any], session=None) -> bool:
+        """Update admin user by email"""
+        result = await self.admins_collection.update_one(
+            {"email": email},
+            {"$set": update_data},
+            session=session
+        )
+        return result.modified_count > 0
+    
+    async def update_admin_password(self, admin_id: str, hashed_password: str) -> bool:
+        """Replace an admin's stored password hash"""
+        result = await self.admins_collection.update_one(
+            {"_id": ObjectId(admin_id)},
+            {"$set": {"hashed_password": hashed_password}}
+        )
+        return result.modified_count > 0
     
-    async def delete_admin(self, org_name: str) -> bool:
+    async def delete_admin(self, org_name: str, session=None) -> bool:
         """Delete admin user by organization"""
-        result = await self.admins_collection.delete_one({"organization_name": org_name})
+        result = await self.admins_collection.delete_one({"organization_name": org_name}, session=session)
         return result.deleted_count > 0
@@ -0,0 +1,380 @@
+from app.repositories.base import BaseRepository
+from app.core.placement import placement
+from app.core.config import settings
+from bson import Binary, Decimal128, Int64, MaxKey, MinKey, ObjectId, Regex, Timestamp
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from collections.abc import Mapping
+from datetime import datetime
+from pymongo.errors import OperationFailure
+from typing import Optional, List, Dict, Any
+import re
+
+TENANCY_COLLECTION = "collection"
+TENANCY_SHARED = "shared"
+
+# Shared collections already created and indexed by this process
+_provisioned_shared = set()
+
+# _id operators translated to the whole namespaced id in the shared collection
+ID_EQUALITY_OPERATORS = {"$eq", "$ne", "$in", "$nin"}
+
+# BSON types an _id can have, grouped into the brackets range queries stay within,
+# in the order the server sorts them
+ID_TYPE_BRACKETS = [
+    ["minKey"],
+    ["null"],
+    ["double", "int", "long", "decimal"],
+    ["symbol", "string"],
+    ["object"],
+    ["binData"],
+    ["objectId"],
+    ["bool"],
+    ["date"],
+    ["timestamp"],
+    ["maxKey"]
+]
+
+
+def id_type_bracket(value: Any) -> int:
+    """Position of a value's type in ID_TYPE_BRACKETS"""
+    if isinstance(value, MinKey):
+        return 0
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 7
+    if isinstance(value, (int, float, Int64, Decimal128)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, Mapping):
+        return 4
+    if isinstance(value, (bytes, Binary)):
+        return 5
+    if isinstance(value, ObjectId):
+        return 6
+    if isinstance(value, datetime):
+        return 8
+    if isinstance(value, Timestamp):
+        return 9
+    if isinstance(value, MaxKey):
+        return 10
+    raise ValueError(f"{type(value).__name__} cannot be an _id")
+
+
+def id_keyset(after: Any, direction: int) -> Dict[str, Any]:
+    """Filter for _ids strictly after `after` in sort order, across type brackets
+    
+    A plain $gt/$lt only matches _ids of the same BSON type as `after`, so on its own it
+    would end a page walk at the last string before any ObjectIds.
+    """
+    bracket = id_type_bracket(after)
+    beyond = ID_TYPE_BRACKETS[bracket + 1:] if direction == 1 else ID_TYPE_BRACKETS[:bracket]
+    same_type = {"_id": {"$gt" if direction == 1 else "$lt": after}}
+    if not beyond:
+        return same_type
+    return {"$or": [same_type, {"_id": {"$type": [alias for types in beyond for alias in types]}}]}
+
+
+class TenantDataRepository(BaseRepository):
+    """Repository for one organization's data, in its own collection or a shared one"""
+    
+    def __init__(self, org: Dict[str, Any]):
+        self.tenancy = org.get("tenancy", TENANCY_COLLECTION)
+        self.tenant_id = str(org["_id"])
+        self.target = org.get("placement")
+        self.collection_name = org["collection_name"]
+        super().__init__(placement.get_collection(self.target, self.collection_name))
+    
+    @property
+    def shared(self) -> bool:
+        return self.tenancy == TENANCY_SHARED
+    
+    def stored_id(self, document_id: Any) -> Any:
+        """_id a document is stored under; in the shared collection ids are namespaced by tenant"""
+        if self.shared:
+            return {"tenant_id": self.tenant_id, "id": document_id}
+        return document_id
+    
+    def public_id(self, stored_id: Any) -> Any:
+        """_id as the tenant knows it"""
+        if self.shared and isinstance(stored_id, Mapping) and "id" in stored_id:
+            return stored_id["id"]
+        return stored_id
+    
+    def scope(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Restrict a query to this tenant's documents, translating _id conditions to stored ids"""
+        if self.shared:
+            return {**self._namespace_ids(query), "tenant_id": self.tenant_id}
+        return query
+    
+    def _namespace_ids(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        scoped = {}
+        for key, condition in query.items():
+            if key in ("$and", "$or", "$nor"):
+                scoped[key] = [self._namespace_ids(sub) for sub in condition]
+            elif key == "_id":
+                if isinstance(condition, Mapping) and condition and all(op in ID_EQUALITY_OPERATORS for op in condition):
+                    # Equality on the whole stored id uses the _id index and seeds upserts
+                    scoped[key] = {
+                        op: [self.stored_id(item) for item in argument] if op in ("$in", "$nin") else self.stored_id(argument)
+                        for op, argument in condition.items()
+                    }
+                elif isinstance(condition, Mapping) and any(str(op).startswith("$") for op in condition) \
+                        or isinstance(condition, (re.Pattern, Regex)):
+                    # Ranges, $type, $regex...: same semantics as in a collection of its own
+                    scoped["_id.id"] = condition
+                else:
+                    scoped[key] = self.stored_id(condition)
+            elif key.startswith("_id."):
+                scoped["_id.id." + key[4:]] = condition
+            else:
+                scoped[key] = condition
+        return scoped
+    
+    def projection(self, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Hide the tenant key from documents returned to callers"""
+        if not self.shared:
+            return projection
+        if projection and any(value for key, value in projection.items() if key != "_id"):
+            # Inclusion projection: tenant_id is already excluded unless requested
+            return {key: value for key, value in projection.items() if key != "tenant_id"}
+        return {**(projection or {}), "tenant_id": 0}
+    
+    def tag(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach the tenant key to a document being written, namespacing its _id"""
+        if self.shared:
+            rest = {key: value for key, value in document.items() if key not in ("_id", "tenant_id")}
+            document_id = document["_id"] if "_id" in document else ObjectId()
+            return {"_id": self.stored_id(document_id), **rest, "tenant_id": self.tenant_id}
+        return document
+    
+    def untag(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """A stored document as the tenant sees it"""
+        if self.shared:
+            document = {key: value for key, value in document.items() if key != "tenant_id"}
+            if "_id" in document:
+                document["_id"] = self.public_id(document["_id"])
+        return document
+    
+    def seed_id(self, scoped_query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        """Make sure a document an upsert inserts gets a namespaced _id"""
+        if not self.shared:
+            return update
+        pinned = scoped_query.get("_id")
+        if pinned is not None and (not isinstance(pinned, Mapping) or "$eq" in pinned or "tenant_id" in pinned):
+            # The server seeds the inserted _id from this equality
+            return update
+        set_on_insert = {**update.get("$setOnInsert", {}), "_id": self.stored_id(ObjectId())}
+        return {**update, "$setOnInsert": set_on_insert}
+    
+    async def find_one(self, query: Dict[str, Any], session=None) -> Optional[Dict[str, Any]]:
+        """Find single tenant document"""
+        document = await self.collection.find_one(self.scope(query), self.projection(), session=session)
+        return self.untag(document) if document is not None else None
+    
+    async def find_many(self, query: Dict[str, Any], session=None) -> List[Dict[str, Any]]:
+        """Find multiple tenant documents"""
+        cursor = self.collection.find(self.scope(query), self.projection(), session=session)
+        return [self.untag(document) async for document in cursor]
+    
+    async def insert_one(self, document: Dict[str, Any], session=None) -> str:
+        """Insert single tenant document and return inserted ID"""
+        result = await self.collection.insert_one(self.tag(document), session=session)
+        return str(self.public_id(result.inserted_id))
+    
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], session=None) -> bool:
+        """Update single tenant document"""
+        update = {key: value for key, value in update.items() if key not in ("_id", "tenant_id")}
+        result = await self.collection.update_one(self.scope(query), {"$set": update}, session=session)
+        return result.modified_count > 0
+    
+    async def delete_one(self, query: Dict[str, Any], session=None) -> bool:
+        """Delete single tenant document"""
+        result = await self.collection.delete_one(self.scope(query), session=session)
+        return result.deleted_count > 0
+    
+    async def count_documents(self, query: Dict[str, Any], session=None) -> int:
+        """Count tenant documents matching query"""
+        return await self.collection.count_documents(self.scope(query), session=session)
+    
+    async def find_page(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]],
+        after: Optional[Dict[str, Any]],
+        limit: int,
+        direction: int = 1
+    ) -> List[RawBSONDocument]:
+        """One keyset page in _id order, as undecoded BSON; fetches limit + 1 so callers can tell if more follow
+        
+        after is {"_id": <last _id of the previous page>}, or None for the first page.
+        """
+        # Raw documents skip decoding to dicts; the bytes go out as-is
+        raw = self.collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+        if self.shared:
+            query = self.scope(query)
+            if after is not None:
+                # Namespaced ids are documents, which compare across _id types on their own
+                keyset = {"_id": {"$gt" if direction == 1 else "$lt": self.stored_id(after["_id"])}}
+                query = {"$and": [query, keyset]}
+            # The server restores tenant-facing ids, so documents still pass through undecoded
+            pipeline = [
+                {"$match": query},
+                {"$sort": {"_id": direction}},
+                {"$limit": limit + 1},
+                {"$set": {"_id": "$_id.id"}},
+                {"$project": self.projection(projection)}
+            ]
+            return await raw.aggregate(pipeline, batchSize=limit + 1).to_list(length=limit + 1)
+        
+        if after is not None:
+            keyset = id_keyset(after["_id"], direction)
+            query = {"$and": [query, keyset]} if query else keyset
+        cursor = raw.find(query, projection).sort("_id", direction).limit(limit + 1)
+        # The whole page in one round trip
+        cursor.batch_size(limit + 1)
+        return await cursor.to_list(length=limit + 1)
+    
+    async def bulk_write(self, operations: List[Any], ordered: bool = True):
+        """Run a batch of InsertOne/UpdateOne/UpdateMany/DeleteOne/DeleteMany built for this tenant"""
+        return await self.collection.bulk_write(operations, ordered=ordered)
+    
+    async def storage_stats(self) -> Dict[str, Any]:
+        """Document count and sizes in bytes; sizes on disk are None for tenants in a shared collection"""
+        if self.shared:
+            # Storage and indexes are not split by tenant; sum the tenant's BSON sizes instead
+            cursor = self.collection.aggregate([
+                {"$match": self.scope({})},
+                {"$group": {"_id": None, "count": {"$sum": 1}, "size": {"$sum": {"$bsonSize": "$$ROOT"}}}}
+            ])
+            rows = await cursor.to_list(length=1)
+            row = rows[0] if rows else {}
+            return {
+                "count": row.get("count", 0),
+                "size": row.get("size", 0),
+                "storage_size": None,
+                "total_index_size": None,
+                "nindexes": None
+            }
+        
+        try:
+            # One document per shard on a sharded collection
+            rows = await self.collection.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(length=None)
+        except OperationFailure as e:
+            if e.code != 26:  # NamespaceNotFound: not created yet or already dropped
+                raise
+            rows = []
+        stats = {"count": 0, "size": 0, "storage_size": 0, "total_index_size": 0, "nindexes": 0}
+        for row in rows:
+            storage = row.get("storageStats", {})
+            stats["count"] += storage.get("count", 0)
+            stats["size"] += storage.get("size", 0)
+            stats["storage_size"] += storage.get("storageSize", 0)
+            stats["total_index_size"] += storage.get("totalIndexSize", 0)
+            stats["nindexes"] = max(stats["nindexes"], storage.get("nindexes", 0))
+        return stats
+    
+    async def create_index(self, name: str, spec: Dict[str, Any]) -> str:
+        """Build a tenant-declared secondary index (spec as stored on the organization)"""
+        return await self.collection.create_index(
+            [tuple(key) for key in spec["keys"]],
+            name=name,
+            unique=spec.get("unique", False),
+            sparse=spec.get("sparse", False)
+        )
+    
+    async def apply_indexes(self, specs: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """Create every declared index that has not failed, returning errors by index name"""
+        errors = {}
+        for name, spec in specs.items():
+            if spec.get("status") == "failed":
+                continue
+            try:
+                await self.create_index(name, spec)
+            except OperationFailure as e:
+                errors[name] = str(e)
+        return errors
+    
+    async def drop_index(self, name: str):
+        try:
+            await self.collection.drop_index(name)
+        except OperationFailure as e:
+            if e.code not in (26, 27):  # collection or index already gone
+                raise
+    
+    async def index_names(self) -> List[str]:
+        """Names of the indexes built on this tenant's collection"""
+        return list(await self.collection.index_information())
+    
+    async def index_build_progress(self, name: str) -> Optional[Dict[str, int]]:
+        """Progress of an index build running on the server, if it reports one"""
+        admin = placement.get_database(self.target).client.admin
+        try:
+            result = await admin.command({
+                "currentOp": True,
+                "command.createIndexes": self.collection_name,
+                "command.indexes.name": name
+            })
+        except OperationFailure:
+            # Needs the inprog privilege; progress is best effort
+            return None
+        for operation in result.get("inprog", []):
+            progress = operation.get("progress")
+            if progress:
+                return {"done": int(progress.get("done", 0)), "total": int(progress.get("total", 0))}
+        return None
+    
+    async def provision(self):
+        """Create the storage this tenant needs if it does not exist yet"""
+        key = (self.target, self.collection_name)
+        if self.shared and key in _provisioned_shared:
+            return
+        
+        tenant_db = placement.get_database(self.target)
+        existing_collections = await tenant_db.list_collection_names()
+        if self.collection_name not in existing_collections:
+            # Create collection with validation schema (optional)
+            await tenant_db.create_collection(
+                self.collection_name,
+                validator={
+                    "$jsonSchema": {
+                        "bsonType": "object",
+                        "description": "Organization-specific data collection"
+                    }
+                }
+            )
+            print(f"✅ Created collection: {self.collection_name}")
+        
+        if self.shared:
+            await self.collection.create_index([("tenant_id", 1), ("_id", 1)])
+            _provisioned_shared.add(key)
+    
+    async def delete_batch(self, limit: int) -> int:
+        """Delete up to limit of this tenant's documents, returning how many were removed"""
+        cursor = self.collection.find(self.scope({}), {"_id": 1}).limit(limit)
+        ids = [document["_id"] async for document in cursor]
+        if not ids:
+            return 0
+        # ids as stored, so no translation through scope()
+        query = {"_id": {"$in": ids}}
+        if self.shared:
+            query["tenant_id"] = self.tenant_id
+        result = await self.collection.delete_many(query)
+        return result.deleted_count
+    
+    async def delete_all(self):
+        """Remove all of this tenant's data"""
+        if self.shared:
+            await self.collection.delete_many(self.scope({}))
+        else:
+            await self.collection.drop()
+            print(f"✅ Deleted collection: {self.collection_name}")
+
+
+def collection_name_for(org_name: str, tenancy: Optional[str] = None) -> str:
+    """Collection holding an organization's data under the given tenancy mode"""
+    if (tenancy or settings.TENANCY_MODE) == TENANCY_SHARED:
+        return settings.SHARED_TENANT_COLLECTION
+    return f"org_{org_name}"
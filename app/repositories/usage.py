@@ -0,0 +1,69 @@
+from app.repositories.base import BaseRepository
+from app.repositories.organization import LIVE
+from app.core.database import db
+from typing import Dict, Any, List, Tuple
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+# Index of releases that keyed counters by organization name
+LEGACY_INDEX = "organization_name_1_day_1"
+
+
+class UsageRepository(BaseRepository):
+    """Repository for per-organization daily usage counters"""
+    
+    def __init__(self):
+        super().__init__(db.get_master_db()["usage"])
+    
+    async def ensure_indexes(self):
+        """One counter document per organization id and day
+        
+        Counters written by releases that keyed them by name are attributed to the live
+        organization of that name; those of names nobody holds any more stay unkeyed and
+        are never reported.
+        """
+        try:
+            await self.collection.drop_index(LEGACY_INDEX)
+        except OperationFailure:
+            pass
+        names = await self.collection.distinct("organization_name", {"organization_id": {"$exists": False}})
+        if names:
+            organizations = db.get_master_db()["organizations"]
+            async for org in organizations.find({"organization_name": {"$in": names}, **LIVE}, {"organization_name": 1}):
+                await self.collection.update_many(
+                    {"organization_name": org["organization_name"], "organization_id": {"$exists": False}},
+                    {"$set": {"organization_id": str(org["_id"])}}
+                )
+        await self.collection.create_index(
+            [("organization_id", 1), ("day", 1)],
+            unique=True,
+            partialFilterExpression={"organization_id": {"$exists": True}}
+        )
+    
+    async def increment_many(self, counters: Dict[Tuple[str, datetime], Dict[str, int]], names: Dict[str, str]) -> int:
+        """Apply buffered counters with a single unordered bulk write of $inc upserts
+        
+        `counters` are keyed by (organization id, day); `names` maps each id to the
+        organization's current name, stored alongside for readability only.
+        """
+        if not counters:
+            return 0
+        operations = [
+            UpdateOne(
+                {"organization_id": org_id, "day": day},
+                {"$inc": values, "$set": {"organization_name": names[org_id]}},
+                upsert=True
+            )
+            for (org_id, day), values in counters.items()
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+    
+    async def get_usage(self, org_id: str, since: datetime) -> List[Dict[str, Any]]:
+        """Daily counters of an organization from a given day on, oldest first"""
+        cursor = self.collection.find(
+            {"organization_id": org_id, "day": {"$gte": since}},
+            {"_id": 0, "organization_id": 0, "organization_name": 0}
+        ).sort("day", 1)
+        return await cursor.to_list(length=None)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator, model_validator
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime
 
 
@@ -53,6 +53,30 @@ class OrganizationResponse(BaseModel):
     )
 
 
+class BatchGetOrganizationsRequest(BaseModel):
+    names: List[str] = Field(..., min_length=1)
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "names": ["acme_corp", "globex", "initech"]
+            }
+        }
+    )
+
+
+class BatchGetOrganizationsItem(BaseModel):
+    organization_name: str
+    found: bool
+    organization: Optional[OrganizationResponse] = None
+
+
+class BatchGetOrganizationsResponse(BaseModel):
+    results: List[BatchGetOrganizationsItem]
+    found: int
+    missing: int
+
+
 class DeleteOrganizationRequest(BaseModel):
     organization_name: str = Field(..., min_length=3)
     
@@ -63,3 +87,228 @@ class DeleteOrganizationRequest(BaseModel):
             }
         }
     )
+
+
+class UsageDay(BaseModel):
+    day: datetime
+    requests: int
+    errors: int
+    latency_ms_sum: int
+    avg_latency_ms: float
+    bytes_out: int
+
+
+class UsageResponse(BaseModel):
+    organization_name: str
+    days: List[UsageDay]
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "organization_name": "acme_corp",
+                "days": [
+                    {
+                        "day": "2024-12-11T00:00:00",
+                        "requests": 1250,
+                        "errors": 2,
+                        "latency_ms_sum": 48750,
+                        "avg_latency_ms": 39.0,
+                        "bytes_out": 612480
+                    }
+                ]
+            }
+        }
+    )
+
+
+class OrganizationSearchHit(BaseModel):
+    organization_name: str
+    admin_email: str
+    match: str
+
+
+class OrganizationSearchResponse(BaseModel):
+    query: str
+    results: List[OrganizationSearchHit]
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "query": "acme",
+                "results": [
+                    {
+                        "organization_name": "acme_corp",
+                        "admin_email": "admin@acme.com",
+                        "match": "prefix"
+                    }
+                ]
+            }
+        }
+    )
+
+
+class StorageStats(BaseModel):
+    organization_name: str
+    collection_name: str
+    tenancy: str
+    placement: str
+    count: Optional[int] = None
+    size: Optional[int] = None
+    storage_size: Optional[int] = None
+    total_index_size: Optional[int] = None
+    nindexes: Optional[int] = None
+    generated_at: datetime
+    error: Optional[str] = None
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "organization_name": "acme_corp",
+                "collection_name": "org_acme_corp",
+                "tenancy": "collection",
+                "placement": "default",
+                "count": 15230,
+                "size": 7340032,
+                "storage_size": 2838528,
+                "total_index_size": 425984,
+                "nindexes": 1,
+                "generated_at": "2024-12-11T18:00:00"
+            }
+        }
+    )
+
+
+class StorageTotals(BaseModel):
+    count: int
+    size: int
+    storage_size: int
+    total_index_size: int
+
+
+class AllStorageStatsResponse(BaseModel):
+    generated_at: datetime
+    organizations: List[StorageStats]
+    totals: StorageTotals
+
+
+class IndexKey(BaseModel):
+    field: str = Field(..., max_length=128, pattern=r"^[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*$")
+    direction: Literal[1, -1] = 1
+
+
+class CreateIndexRequest(BaseModel):
+    keys: List[IndexKey] = Field(..., min_length=1, max_length=8)
+    name: Optional[str] = Field(None, max_length=64, pattern=r"^[A-Za-z0-9_-]+$")
+    unique: bool = False
+    sparse: bool = False
+    
+    @field_validator("name")
+    @classmethod
+    def check_name(cls, v):
+        # The server's own index on _id; declaring it would shadow or drop it
+        if v == "_id_":
+            raise ValueError("_id_ is reserved for the _id index")
+        return v
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "keys": [{"field": "customer_id", "direction": 1}, {"field": "created_at", "direction": -1}],
+                "unique": False
+            }
+        }
+    )
+
+
+class IndexProgress(BaseModel):
+    done: int
+    total: int
+
+
+class IndexResponse(BaseModel):
+    name: str
+    keys: List[IndexKey]
+    unique: bool
+    sparse: bool
+    status: str
+    error: Optional[str] = None
+    progress: Optional[IndexProgress] = None
+    created_at: datetime
+
+
+class IndexListResponse(BaseModel):
+    organization_name: str
+    limit: int
+    indexes: List[IndexResponse]
+
+
+class DocumentOperation(BaseModel):
+    op: Literal["insert", "update", "delete"]
+    document: Optional[Dict[str, Any]] = None
+    filter: Optional[Dict[str, Any]] = None
+    update: Optional[Dict[str, Any]] = None
+    upsert: bool = False
+    many: bool = False
+    
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op == "insert" and self.document is None:
+            raise ValueError("insert needs a document")
+        if self.op == "update" and (self.filter is None or not self.update):
+            raise ValueError("update needs a filter and an update")
+        if self.op == "delete" and self.filter is None:
+            raise ValueError("delete needs a filter")
+        return self
+
+
+class BulkWriteRequest(BaseModel):
+    operations: List[DocumentOperation] = Field(..., min_length=1)
+    ordered: bool = True
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "operations": [
+                    {"op": "insert", "document": {"sku": "A-1", "qty": 5}},
+                    {"op": "update", "filter": {"sku": "B-2"}, "update": {"$inc": {"qty": -1}}, "upsert": True},
+                    {"op": "delete", "filter": {"qty": 0}, "many": True}
+                ],
+                "ordered": True
+            }
+        }
+    )
+
+
+class BulkWriteErrorDetail(BaseModel):
+    index: int
+    code: Optional[int] = None
+    message: str
+
+
+class BulkWriteResponse(BaseModel):
+    inserted_count: int
+    matched_count: int
+    modified_count: int
+    deleted_count: int
+    upserted_count: int
+    inserted_ids: List[Any]
+    upserted_ids: Dict[str, Any]
+    errors: List[BulkWriteErrorDetail]
+
+
+class DocumentQueryRequest(BaseModel):
+    filter: Dict[str, Any] = Field(default_factory=dict)
+    projection: Optional[Dict[str, Any]] = None
+    batch_size: int = Field(100, ge=1)
+    cursor: Optional[str] = Field(None, max_length=4096)
+    direction: Literal[1, -1] = 1
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "filter": {"qty": {"$gt": 0}},
+                "projection": {"sku": 1, "qty": 1},
+                "batch_size": 100
+            }
+        }
+    )
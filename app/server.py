@@ -0,0 +1,65 @@
+"""
+Production entry point: python -m app.server [--workers N] [--host HOST] [--port PORT]
+
+Runs the app under uvicorn's multi-process supervisor. Each worker imports the
+app fresh and opens its own Motor client in the lifespan, so no client crosses
+a fork. With BCRYPT_CALIBRATE the bcrypt cost is measured once here and handed
+to every worker through the environment. SIGTERM stops accepting new connections and drains in-flight requests
+for up to SERVER_GRACEFUL_TIMEOUT_SECONDS before exiting.
+"""
+import argparse
+import importlib.util
+import os
+import uvicorn
+from app.core.config import settings
+from app.utils.security import SecurityUtils
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def resolve_workers(requested: int) -> int:
+    """Return the worker count, defaulting to one per CPU core"""
+    if requested > 0:
+        return requested
+    return os.cpu_count() or 1
+
+
+def calibrate_bcrypt() -> int:
+    """Measure the bcrypt cost once and export it, so workers share it instead of each benchmarking"""
+    rounds = SecurityUtils.calibrate_rounds(settings.BCRYPT_TARGET_HASH_MS, min_rounds=settings.BCRYPT_MIN_ROUNDS)
+    # Workers are spawned with this environment and read it into their settings
+    os.environ["BCRYPT_ROUNDS"] = str(rounds)
+    os.environ["BCRYPT_CALIBRATE"] = "false"
+    return rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Organization Management API")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    args = parser.parse_args()
+    
+    workers = resolve_workers(args.workers)
+    if settings.BCRYPT_CALIBRATE:
+        print(f"✅ bcrypt cost calibrated to {calibrate_bcrypt()} rounds")
+    loop = "uvloop" if _has_module("uvloop") else "asyncio"
+    http = "httptools" if _has_module("httptools") else "h11"
+    print(f"Starting {workers} worker(s) on {args.host}:{args.port} (loop={loop}, http={http})")
+    
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
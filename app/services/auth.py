@@ -1,33 +1,60 @@
 from app.repositories.organization import OrganizationRepository
+from app.core.database import db
 from app.utils.security import SecurityUtils
 from app.utils.exceptions import UnauthorizedException
 from app.schemas.auth import LoginRequest, LoginResponse
 from datetime import timedelta
 from app.core.config import settings
+from concurrent.futures import Executor
+from typing import Optional
+import asyncio
+import secrets
 
 
 class AuthService:
     """Service class for authentication logic"""
     
-    def __init__(self):
-        self.repo = OrganizationRepository()
+    # Hash verified for unknown emails so they cost the same bcrypt work as real ones
+    _dummy_hash: Optional[str] = None
+    
+    def __init__(self, repo: Optional[OrganizationRepository] = None, executor: Optional[Executor] = None):
+        self.repo = repo or OrganizationRepository()
+        # bcrypt runs here, off the event loop (None = the loop's default executor)
+        self.executor = executor
+    
+    async def _verify_password(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, SecurityUtils.verify_password, password, hashed_password
+        )
+    
+    async def _hash_password(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, SecurityUtils.hash_password, password)
     
     async def login(self, request: LoginRequest) -> LoginResponse:
         """Authenticate admin and return JWT token"""
         
-        # Get admin by email
-        admin = await self.repo.get_admin_by_email(request.email)
-        if not admin:
-            raise UnauthorizedException("Invalid email or password")
+        async with db.read_session(f"admin:{request.email}") as session:
+            # Get admin by email
+            admin = await self.repo.get_admin_by_email(request.email, session=session)
+            if not admin:
+                await self._verify_password(request.password, self._get_dummy_hash())
+                raise UnauthorizedException("Invalid email or password")
+            
+            # Verify password
+            if not await self._verify_password(request.password, admin["hashed_password"]):
+                raise UnauthorizedException("Invalid email or password")
+            
+            # Get organization details
+            org = await self.repo.get_by_id(admin["organization_id"], session=session)
+            if not org:
+                raise UnauthorizedException("Organization not found")
         
-        # Verify password
-        if not SecurityUtils.verify_password(request.password, admin["hashed_password"]):
-            raise UnauthorizedException("Invalid email or password")
-        
-        # Get organization details
-        org = await self.repo.get_by_id(admin["organization_id"])
-        if not org:
-            raise UnauthorizedException("Organization not found")
+        # Upgrade the stored hash if it was created with a lower cost
+        if SecurityUtils.needs_rehash(admin["hashed_password"]):
+            await self.repo.update_admin_password(
+                str(admin["_id"]),
+                await self._hash_password(request.password)
+            )
         
         # Create JWT token
         token_data = {
@@ -50,6 +77,22 @@ class AuthService:
             organization_id=admin["organization_id"]
         )
     
+    @classmethod
+    def build_dummy_hash(cls):
+        """Build the placeholder hash used for constant-time rejection at the current cost
+        
+        Called at startup (and after bcrypt calibration), so the first unknown email does
+        not pay for an extra hash that would set it apart from known ones.
+        """
+        cls._dummy_hash = SecurityUtils.hash_password(secrets.token_urlsafe(16))
+    
+    @classmethod
+    def _get_dummy_hash(cls) -> str:
+        if cls._dummy_hash is None:
+            # Services used outside the application lifespan
+            cls.build_dummy_hash()
+        return cls._dummy_hash
+    
     async def verify_token(self, token: str) -> dict:
         """Verify JWT token and return payload"""
         payload = SecurityUtils.decode_access_token(token)
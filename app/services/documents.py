@@ -0,0 +1,219 @@
+from app.repositories.organization import OrganizationRepository
+from app.repositories.tenant import TenantDataRepository, id_type_bracket
+from app.core.config import settings
+from app.schemas.organization import DocumentOperation
+from app.utils.exceptions import (
+    InvalidDocumentRequestException,
+    StaleTokenException,
+    TenantMigratingException
+)
+from bson import ObjectId, json_util
+from bson.errors import BSONError
+from bson.json_util import RELAXED_JSON_OPTIONS
+from bson.raw_bson import RawBSONDocument
+from pymongo import InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import binascii
+import bson
+import json
+
+# Server-side JavaScript has no place in tenant queries
+FORBIDDEN_OPERATORS = {"$where", "$function", "$accumulator"}
+
+
+def from_extended_json(value: Any) -> Any:
+    """Request JSON with Extended JSON values ({"$oid": ...}, {"$date": ...}) turned into BSON types"""
+    try:
+        return json_util.loads(json.dumps(value))
+    except (TypeError, ValueError, BSONError) as e:
+        raise InvalidDocumentRequestException(f"Invalid Extended JSON: {e}")
+
+
+def to_extended_json(value: Any) -> Any:
+    """BSON values as plain JSON-compatible Extended JSON"""
+    return json.loads(json_util.dumps(value, json_options=RELAXED_JSON_OPTIONS))
+
+
+def parse_document_id(document_id: str) -> Any:
+    return ObjectId(document_id) if ObjectId.is_valid(document_id) else document_id
+
+
+def encode_cursor(last_id: Any, direction: int) -> str:
+    return base64.urlsafe_b64encode(bson.encode({"_id": last_id, "d": direction})).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, direction: int) -> Dict[str, Any]:
+    try:
+        state = bson.decode(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, BSONError):
+        raise InvalidDocumentRequestException("Invalid cursor")
+    if "_id" not in state or state.get("d") != direction:
+        raise InvalidDocumentRequestException("Cursor does not belong to this query")
+    try:
+        id_type_bracket(state["_id"])
+    except ValueError:
+        raise InvalidDocumentRequestException("Invalid cursor")
+    return {"_id": state["_id"]}
+
+
+def raw_bytes(document: Any) -> bytes:
+    """BSON of a fetched document, without a decode/encode round trip when it arrived raw"""
+    if isinstance(document, RawBSONDocument):
+        return document.raw
+    return bson.encode(document)
+
+
+def written_fields(update: Dict[str, Any]) -> List[str]:
+    """Every field an operator update writes, including the destinations of $rename"""
+    fields = []
+    for operator, argument in update.items():
+        if not isinstance(argument, dict):
+            continue
+        fields.extend(argument)
+        if operator == "$rename":
+            fields.extend(str(destination) for destination in argument.values())
+    return fields
+
+
+def _check_query(value: Any):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in FORBIDDEN_OPERATORS:
+                raise InvalidDocumentRequestException(f"Operator {key} is not allowed")
+            _check_query(item)
+    elif isinstance(value, list):
+        for item in value:
+            _check_query(item)
+
+
+class TenantDocumentService:
+    """Reads and writes on the caller's own organization collection
+    
+    Every operation is scoped through TenantDataRepository, so tenants in the shared
+    collection only ever see and write documents carrying their tenant key.
+    """
+    
+    def __init__(self, repo: OrganizationRepository):
+        self.repo = repo
+    
+    async def _tenant(self, admin: Dict[str, Any], write: bool = False) -> TenantDataRepository:
+        # Looked up per call: renames and relocations move the collection. By id, since
+        # the token's organization name may have been taken over by another organization
+        org = await self.repo.get_for_admin(admin, primary=write)
+        if not org:
+            raise StaleTokenException()
+        # A write landing in the source after the copy read past it would be dropped with it
+        if write and org.get("migrating_at"):
+            raise TenantMigratingException()
+        return TenantDataRepository(org)
+    
+    def _write_model(self, tenant: TenantDataRepository, operation: DocumentOperation):
+        if operation.op == "insert":
+            document = from_extended_json(operation.document)
+            # Assigned here so the response can list every inserted id
+            document.setdefault("_id", ObjectId())
+            return InsertOne(tenant.tag(document))
+        
+        query = from_extended_json(operation.filter)
+        _check_query(query)
+        if operation.op == "delete":
+            return (DeleteMany if operation.many else DeleteOne)(tenant.scope(query))
+        
+        update = from_extended_json(operation.update)
+        if not all(key.startswith("$") for key in update):
+            raise InvalidDocumentRequestException("Updates must use update operators such as $set")
+        _check_query(update)
+        if tenant.shared:
+            for field in written_fields(update):
+                # _id holds the namespaced id, which only the repository writes
+                if field.split(".")[0] in ("tenant_id", "_id"):
+                    raise InvalidDocumentRequestException(f"{field.split('.')[0]} cannot be updated")
+        scoped = tenant.scope(query)
+        if operation.upsert:
+            update = tenant.seed_id(scoped, update)
+        return (UpdateMany if operation.many else UpdateOne)(scoped, update, upsert=operation.upsert)
+    
+    async def bulk_write(self, admin: Dict[str, Any], operations: List[DocumentOperation], ordered: bool = True) -> Dict[str, Any]:
+        """Apply a batch of inserts, updates and deletes in one round trip
+        
+        Failed operations are reported by index; with ordered=True the batch stops at the
+        first failure, otherwise every other operation is still attempted.
+        """
+        if len(operations) > settings.DOCUMENTS_MAX_BULK_OPERATIONS:
+            raise InvalidDocumentRequestException(
+                f"At most {settings.DOCUMENTS_MAX_BULK_OPERATIONS} operations per request"
+            )
+        tenant = await self._tenant(admin, write=True)
+        models = [self._write_model(tenant, operation) for operation in operations]
+        
+        try:
+            raw = (await tenant.bulk_write(models, ordered=ordered)).bulk_api_result
+        except BulkWriteError as e:
+            raw = e.details
+        
+        errors = sorted(raw.get("writeErrors", []), key=lambda error: error["index"])
+        failed = {error["index"] for error in errors}
+        # An ordered batch never attempted anything after its first failure
+        attempted = errors[0]["index"] if ordered and errors else len(models)
+        inserted_ids = [
+            tenant.public_id(model._doc["_id"]) for index, model in enumerate(models[:attempted])
+            if isinstance(model, InsertOne) and index not in failed
+        ]
+        return {
+            "inserted_count": raw.get("nInserted", 0),
+            "matched_count": raw.get("nMatched", 0),
+            "modified_count": raw.get("nModified", 0),
+            "deleted_count": raw.get("nRemoved", 0),
+            "upserted_count": raw.get("nUpserted", 0),
+            "inserted_ids": to_extended_json(inserted_ids),
+            "upserted_ids": {
+                str(item["index"]): to_extended_json(tenant.public_id(item["_id"]))
+                for item in raw.get("upserted", [])
+            },
+            "errors": [
+                {"index": error["index"], "code": error.get("code"), "message": error.get("errmsg", "")}
+                for error in errors
+            ]
+        }
+    
+    async def query(
+        self,
+        admin: Dict[str, Any],
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]],
+        batch_size: int,
+        cursor: Optional[str] = None,
+        direction: int = 1
+    ) -> Tuple[List[Any], Optional[str], int]:
+        """One page of matching documents in _id order, plus the cursor of the next page
+        
+        Returns (documents, next cursor or None, effective batch size). Documents come
+        back as RawBSONDocument from a real server and are meant to be passed through.
+        """
+        batch_size = min(batch_size, settings.DOCUMENTS_MAX_BATCH_SIZE)
+        query = from_extended_json(query)
+        _check_query(query)
+        if projection:
+            _check_query(projection)
+            # Pages are keyed on _id, so it is always returned
+            projection = {key: value for key, value in projection.items() if key != "_id"} or None
+        after = decode_cursor(cursor, direction) if cursor else None
+        
+        tenant = await self._tenant(admin)
+        documents = await tenant.find_page(query, projection, after, batch_size, direction)
+        next_cursor = None
+        if len(documents) > batch_size:
+            documents = documents[:batch_size]
+            next_cursor = encode_cursor(documents[-1]["_id"], direction)
+        return documents, next_cursor, batch_size
+    
+    async def get(self, admin: Dict[str, Any], document_id: str) -> Optional[Any]:
+        tenant = await self._tenant(admin)
+        documents = await tenant.find_page({"_id": parse_document_id(document_id)}, None, None, 1)
+        return documents[0] if documents else None
+    
+    async def delete(self, admin: Dict[str, Any], document_id: str) -> bool:
+        tenant = await self._tenant(admin, write=True)
+        return await tenant.delete_one({"_id": parse_document_id(document_id)})
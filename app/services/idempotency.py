@@ -0,0 +1,122 @@
+from app.repositories.idempotency import IdempotencyRepository, COMPLETED
+from app.core.config import settings
+from app.utils.exceptions import IdempotencyConflictException, IdempotencyKeyReusedException
+from app.utils.singleflight import SingleFlight
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import hmac
+import json
+
+
+class IdempotencyService:
+    """Runs a mutation at most once per Idempotency-Key and replays its stored response"""
+    
+    def __init__(self, repo: IdempotencyRepository):
+        self.repo = repo
+        # Completed records by key, least recently used first
+        self._cache: "OrderedDict[str, Tuple[Dict[str, Any], datetime]]" = OrderedDict()
+        # Duplicates arriving while the first request runs wait for its outcome
+        self._flight = SingleFlight()
+    
+    @staticmethod
+    def fingerprint(payload: BaseModel) -> str:
+        """Keyed digest of the request body; keyed because bodies can contain passwords"""
+        body = json.dumps(payload.model_dump(mode="json"), sort_keys=True).encode("utf-8")
+        return hmac.new(settings.SECRET_KEY.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    
+    async def run(
+        self,
+        scope: str,
+        idempotency_key: Optional[str],
+        payload: BaseModel,
+        operation: Callable[[], Awaitable[Any]],
+        status_code: int = status.HTTP_200_OK
+    ) -> Any:
+        """
+        Execute operation once for (scope, idempotency_key).
+        
+        Without a key the operation simply runs. With one, the first request runs it and
+        stores its response (including 4xx errors); retries with the same key and body get
+        that response back, marked with `Idempotent-Replayed: true`.
+        """
+        if idempotency_key is None:
+            return await operation()
+        
+        key = f"{scope}|{idempotency_key}"
+        fingerprint = self.fingerprint(payload)
+        leader = False
+        
+        async def execute() -> Dict[str, Any]:
+            nonlocal leader
+            leader = True
+            return await self._execute(key, fingerprint, operation, status_code)
+        
+        record = self._cached(key)
+        if record is None:
+            record = await self._flight.do(key, execute)
+        if record["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReusedException()
+        
+        headers = {**record.get("headers", {}), "Idempotent-Replayed": "false" if leader else "true"}
+        return JSONResponse(status_code=record["status_code"], content=record["body"], headers=headers)
+    
+    async def _execute(
+        self,
+        key: str,
+        fingerprint: str,
+        operation: Callable[[], Awaitable[Any]],
+        status_code: int
+    ) -> Dict[str, Any]:
+        existing = await self.repo.claim(
+            key, fingerprint, settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_LOCK_SECONDS
+        )
+        if existing is not None:
+            if existing["status"] != COMPLETED:
+                # Another worker is running this request right now
+                raise IdempotencyConflictException(retry_after=1)
+            self._remember(key, existing)
+            return existing
+        
+        try:
+            result = await operation()
+            response = {"status_code": status_code, "body": jsonable_encoder(result), "headers": {}}
+        except HTTPException as e:
+            if e.status_code >= 500:
+                await asyncio.shield(self.repo.release(key))
+                raise
+            # Client errors are part of the outcome and are replayed too
+            response = {"status_code": e.status_code, "body": {"detail": e.detail}, "headers": dict(e.headers or {})}
+        except BaseException:
+            # Unexpected failures leave nothing behind, so a retry runs the operation again
+            await asyncio.shield(self.repo.release(key))
+            raise
+        
+        record = {"fingerprint": fingerprint, "status": COMPLETED, **response}
+        self._remember(key, record)
+        await self.repo.complete(key, response)
+        return record
+    
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        record, expires_at = entry
+        if expires_at <= datetime.utcnow():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return record
+    
+    def _remember(self, key: str, record: Dict[str, Any]):
+        expires_at = record.get("expires_at") or datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        self._cache[key] = (record, expires_at)
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.IDEMPOTENCY_CACHE_SIZE:
+            self._cache.popitem(last=False)
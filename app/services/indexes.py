@@ -0,0 +1,159 @@
+from app.repositories.organization import OrganizationRepository
+from app.repositories.tenant import TenantDataRepository, TENANCY_COLLECTION
+from app.core.config import settings
+from app.core.logging import logger
+from app.schemas.organization import CreateIndexRequest
+from app.utils.conditional import utcnow_ms
+from app.utils.exceptions import (
+    IndexAlreadyExistsException,
+    IndexNotFoundException,
+    IndexLimitExceededException,
+    IndexesNotSupportedException,
+    StaleTokenException,
+    TenantMigratingException
+)
+from pymongo.errors import OperationFailure
+from typing import Any, Dict, List, Tuple
+import asyncio
+import contextvars
+
+BUILDING = "building"
+READY = "ready"
+FAILED = "failed"
+
+# createIndexes joining an identical build started elsewhere
+INDEX_BUILD_ALREADY_IN_PROGRESS = 276
+
+
+def index_name_for(keys: List[Tuple[str, int]]) -> str:
+    """Default name, like MongoDB's but with dots replaced so it can be used as a field name"""
+    return "_".join(f"{field.replace('.', '_')}_{direction}" for field, direction in keys)
+
+
+class TenantIndexService:
+    """Secondary indexes declared by tenants on their own collection, built in the background
+    
+    Declarations live on the organization document, so they survive restarts and are
+    re-applied when the organization's data moves to a new collection.
+    """
+    
+    def __init__(self, repo: OrganizationRepository):
+        self.repo = repo
+        # (organization id, index name) -> build running in this process
+        self._builds: Dict[Tuple[str, str], asyncio.Task] = {}
+    
+    async def stop(self):
+        """Stop waiting on builds; the server finishes them and the next listing notices"""
+        builds = list(self._builds.values())
+        for task in builds:
+            task.cancel()
+        await asyncio.gather(*builds, return_exceptions=True)
+        self._builds.clear()
+    
+    async def _get_org(self, admin: Dict[str, Any], write: bool = False) -> Dict[str, Any]:
+        # By id: the token's organization name may now belong to another organization
+        org = await self.repo.get_for_admin(admin, primary=True)
+        if not org:
+            raise StaleTokenException()
+        if org.get("tenancy", TENANCY_COLLECTION) != TENANCY_COLLECTION:
+            raise IndexesNotSupportedException()
+        # The copy rebuilds the declarations it read; changes made during it would be lost
+        if write and org.get("migrating_at"):
+            raise TenantMigratingException()
+        return org
+    
+    async def declare(self, admin: Dict[str, Any], request: CreateIndexRequest) -> Dict[str, Any]:
+        """Record an index and start building it; returns its description"""
+        org = await self._get_org(admin, write=True)
+        keys = [[key.field, key.direction] for key in request.keys]
+        name = request.name or index_name_for(keys)
+        spec = {
+            "keys": keys,
+            "unique": request.unique,
+            "sparse": request.sparse,
+            "status": BUILDING,
+            "error": None,
+            "created_at": utcnow_ms()
+        }
+        
+        org_id = str(org["_id"])
+        if not await self.repo.add_index_spec(org_id, name, spec, settings.TENANT_MAX_INDEXES):
+            current = await self.repo.get_by_id(org_id, primary=True) or org
+            if name in (current.get("indexes") or {}):
+                raise IndexAlreadyExistsException(name)
+            raise IndexLimitExceededException(settings.TENANT_MAX_INDEXES)
+        
+        self._start_build(org, name, spec)
+        return self._describe(name, spec, BUILDING, None)
+    
+    def _start_build(self, org: Dict[str, Any], name: str, spec: Dict[str, Any]):
+        key = (str(org["_id"]), name)
+        if key in self._builds:
+            return
+        # A fresh context, so the build is not bound by the declaring request's deadline
+        task = asyncio.get_running_loop().create_task(self._build(org, name, spec), context=contextvars.Context())
+        self._builds[key] = task
+        task.add_done_callback(lambda done, key=key: self._finish(key, done))
+    
+    def _finish(self, key: Tuple[str, str], task: asyncio.Task):
+        if self._builds.get(key) is task:
+            del self._builds[key]
+    
+    async def _build(self, org: Dict[str, Any], name: str, spec: Dict[str, Any]):
+        org_id = str(org["_id"])
+        try:
+            await TenantDataRepository(org).create_index(name, spec)
+        except OperationFailure as e:
+            if e.code == INDEX_BUILD_ALREADY_IN_PROGRESS:
+                return
+            logger.error(f"Index build {name} for {org['organization_name']} failed: {e}")
+            await self.repo.set_index_status(org_id, name, FAILED, str(e))
+            return
+        await self.repo.set_index_status(org_id, name, READY)
+    
+    async def list_indexes(self, admin: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Declared indexes with their build state, restarting builds nobody is running"""
+        org = await self._get_org(admin)
+        specs = org.get("indexes") or {}
+        if not specs:
+            return []
+        
+        tenant = TenantDataRepository(org)
+        built = set(await tenant.index_names())
+        described = []
+        for name, spec in sorted(specs.items()):
+            if name in built:
+                status, progress = READY, None
+            elif spec.get("status") == FAILED:
+                status, progress = FAILED, None
+            else:
+                # Declared but not built: still running, or its process went away mid-build
+                status, progress = BUILDING, await tenant.index_build_progress(name)
+                if progress is None and not org.get("migrating_at"):
+                    self._start_build(org, name, spec)
+            described.append(self._describe(name, spec, status, progress))
+        return described
+    
+    async def drop(self, admin: Dict[str, Any], name: str):
+        """Withdraw an index declaration and drop the index"""
+        org = await self._get_org(admin, write=True)
+        if not await self.repo.remove_index_spec(str(org["_id"]), name):
+            raise IndexNotFoundException(name)
+        build = self._builds.pop((str(org["_id"]), name), None)
+        if build is not None:
+            build.cancel()
+        # Dropping also aborts a build still running on the server
+        await TenantDataRepository(org).drop_index(name)
+    
+    @staticmethod
+    def _describe(name: str, spec: Dict[str, Any], status: str, progress) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "keys": [{"field": field, "direction": direction} for field, direction in spec["keys"]],
+            "unique": spec.get("unique", False),
+            "sparse": spec.get("sparse", False),
+            "status": status,
+            "error": spec.get("error") if status == FAILED else None,
+            "progress": progress,
+            "created_at": spec["created_at"]
+        }
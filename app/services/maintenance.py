@@ -0,0 +1,183 @@
+from app.repositories.organization import OrganizationRepository
+from app.repositories.tenant import TenantDataRepository, TENANCY_SHARED
+from app.core.placement import placement
+from app.core.config import settings
+from app.core.logging import logger
+from bson import ObjectId
+from bson.errors import InvalidId
+from typing import Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import time
+
+
+class MaintenanceService:
+    """Background purge of tombstoned organizations and reclamation of orphaned data"""
+    
+    def __init__(self, repo: OrganizationRepository):
+        self.repo = repo
+        self._task: Optional[asyncio.Task] = None
+        # (target, collection) -> monotonic time first seen unreferenced
+        self._orphan_candidates: Dict[Tuple[str, str], float] = {}
+        self._admin_cursor: Optional[ObjectId] = None
+        self._tenant_cursors: Dict[str, str] = {}
+    
+    def start(self):
+        """Start the background loop on the running event loop"""
+        if settings.MAINTENANCE_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Cancel the background loop and wait for it to finish"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        last_reconcile = time.monotonic()
+        while True:
+            try:
+                while await self.purge_next():
+                    pass
+                if time.monotonic() - last_reconcile >= settings.RECONCILE_INTERVAL_SECONDS:
+                    last_reconcile = time.monotonic()
+                    await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Maintenance pass failed: {e}")
+            await asyncio.sleep(settings.PURGE_INTERVAL_SECONDS)
+    
+    async def purge_next(self) -> bool:
+        """Purge one tombstoned organization, returning False when none are pending"""
+        org = await self.repo.claim_tombstone(settings.PURGE_LEASE_SECONDS)
+        if not org:
+            return False
+        
+        org_id = str(org["_id"])
+        await self._purge_tenant_data(TenantDataRepository(org))
+        await self.repo.delete_admins_by_organization_id(org_id)
+        await self.repo.delete_organization_by_id(org_id)
+        logger.info(f"Purged organization {org['organization_name']}")
+        return True
+    
+    async def _purge_tenant_data(self, tenant: TenantDataRepository):
+        """Remove tenant data, deleting shared-collection rows in throttled batches"""
+        if not tenant.shared:
+            await tenant.delete_all()
+            return
+        while await tenant.delete_batch(settings.PURGE_BATCH_SIZE):
+            await asyncio.sleep(settings.PURGE_BATCH_DELAY_SECONDS)
+    
+    async def reconcile(self):
+        """One bounded pass reclaiming data left behind by failed creates, renames and moves"""
+        budget = settings.RECONCILE_MAX_ACTIONS
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.RECONCILE_GRACE_SECONDS)
+        
+        # Creates that stopped before linking an admin: tombstone them for the purger
+        for org in await self.repo.find_incomplete(cutoff, budget):
+            await self.repo.tombstone_organization(str(org["_id"]))
+            logger.info(f"Tombstoned incomplete organization {org['organization_name']}")
+            budget -= 1
+        
+        budget -= await self._reclaim_orphan_admins(cutoff, budget)
+        for target in placement.target_names():
+            if budget <= 0:
+                break
+            budget -= await self._reclaim_orphan_collections(target, budget)
+            budget -= await self._reclaim_orphan_shared_rows(target, budget)
+    
+    async def _reclaim_orphan_admins(self, cutoff: datetime, budget: int) -> int:
+        if budget <= 0:
+            return 0
+        admins = await self.repo.get_admins_page(self._admin_cursor, cutoff, settings.RECONCILE_SCAN_BATCH)
+        # Resume after this page next pass, wrapping around at the end
+        self._admin_cursor = admins[-1]["_id"] if admins else None
+        
+        org_ids = set()
+        for admin in admins:
+            try:
+                org_ids.add(ObjectId(admin.get("organization_id")))
+            except (InvalidId, TypeError):
+                pass
+        existing = {str(org_id) for org_id in await self.repo.get_ids(list(org_ids))}
+        orphans = [admin["_id"] for admin in admins if admin.get("organization_id") not in existing][:budget]
+        if orphans:
+            await self.repo.delete_admins_by_ids(orphans)
+            logger.info(f"Deleted {len(orphans)} orphaned admins")
+        return len(orphans)
+    
+    async def _reclaim_orphan_collections(self, target: str, budget: int) -> int:
+        tenant_db = placement.get_database(target)
+        names = [name for name in await tenant_db.list_collection_names() if name.startswith("org_")]
+        referenced = set()
+        for start in range(0, len(names), settings.RECONCILE_SCAN_BATCH):
+            chunk = names[start:start + settings.RECONCILE_SCAN_BATCH]
+            referenced.update(await self.repo.get_referenced_collections(target, chunk))
+        
+        now = time.monotonic()
+        unreferenced = {(target, name) for name in names if name not in referenced}
+        for key in list(self._orphan_candidates):
+            if key[0] == target and key not in unreferenced:
+                del self._orphan_candidates[key]
+        
+        # Only drop collections seen unreferenced for a full grace period (renames and moves
+        # create the new collection before the organization record points at it)
+        dropped = 0
+        for key in sorted(unreferenced):
+            first_seen = self._orphan_candidates.setdefault(key, now)
+            if dropped < budget and now - first_seen >= settings.RECONCILE_GRACE_SECONDS:
+                await tenant_db.drop_collection(key[1])
+                del self._orphan_candidates[key]
+                logger.info(f"Dropped orphaned collection {key[1]} on {target}")
+                dropped += 1
+        return dropped
+    
+    async def _reclaim_orphan_shared_rows(self, target: str, budget: int) -> int:
+        if budget <= 0:
+            return 0
+        collection = placement.get_collection(target, settings.SHARED_TENANT_COLLECTION)
+        # Skip-scan distinct tenant ids along the {tenant_id, _id} index, one seek per id
+        tenant_ids = []
+        cursor = self._tenant_cursors.get(target, "")
+        for _ in range(settings.RECONCILE_SCAN_BATCH):
+            row = await collection.find_one(
+                {"tenant_id": {"$gt": cursor}},
+                {"tenant_id": 1, "_id": 0},
+                sort=[("tenant_id", 1)]
+            )
+            if not row:
+                cursor = ""
+                break
+            cursor = row["tenant_id"]
+            tenant_ids.append(cursor)
+        self._tenant_cursors[target] = cursor
+        
+        valid = {}
+        for tenant_id in tenant_ids:
+            try:
+                valid[ObjectId(tenant_id)] = tenant_id
+            except (InvalidId, TypeError):
+                pass
+        existing = {str(org_id) for org_id in await self.repo.get_ids(list(valid))}
+        
+        reclaimed = 0
+        for tenant_id in tenant_ids:
+            if reclaimed >= budget:
+                break
+            if tenant_id in existing:
+                continue
+            orphan = TenantDataRepository({
+                "_id": tenant_id,
+                "collection_name": settings.SHARED_TENANT_COLLECTION,
+                "placement": target,
+                "tenancy": TENANCY_SHARED
+            })
+            await self._purge_tenant_data(orphan)
+            logger.info(f"Deleted orphaned shared rows for tenant {tenant_id} on {target}")
+            reclaimed += 1
+        return reclaimed
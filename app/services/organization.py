@@ -1,69 +1,101 @@
 from app.repositories.organization import OrganizationRepository
+from app.services.search import SearchService
+from app.services.indexes import FAILED
+from app.services.usage import attribute_request
+from app.repositories.tenant import TenantDataRepository, TENANCY_COLLECTION, TENANCY_SHARED, collection_name_for
 from app.core.database import db
+from app.core.placement import placement, DEFAULT_TARGET
+from app.core.config import settings
 from app.utils.security import SecurityUtils
 from app.utils.exceptions import (
     OrganizationAlreadyExistsException,
     OrganizationNotFoundException,
-    ForbiddenException
+    ForbiddenException,
+    BatchTooLargeException
 )
 from app.schemas.organization import (
     CreateOrganizationRequest,
     UpdateOrganizationRequest,
     OrganizationResponse
 )
-from typing import Optional, Dict, Any
+from app.utils.conditional import utcnow_ms, make_etag
+from concurrent.futures import Executor
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
+import asyncio
 
 
 class OrganizationService:
     """Service class for organization business logic"""
     
-    def __init__(self):
-        self.repo = OrganizationRepository()
+    def __init__(
+        self,
+        repo: Optional[OrganizationRepository] = None,
+        search: Optional[SearchService] = None,
+        executor: Optional[Executor] = None
+    ):
+        self.repo = repo or OrganizationRepository()
+        self.search = search
+        # bcrypt runs here, off the event loop (None = the loop's default executor)
+        self.executor = executor
+    
+    async def _hash_password(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, SecurityUtils.hash_password, password)
     
     async def create_organization(self, request: CreateOrganizationRequest) -> OrganizationResponse:
         """Create new organization with dynamic collection"""
         
         # Check if organization already exists
-        existing_org = await self.repo.get_by_name(request.organization_name)
+        existing_org = await self.repo.get_by_name(request.organization_name, primary=True, include_deleted=True)
         if existing_org:
             raise OrganizationAlreadyExistsException(request.organization_name)
         
         # Check if admin email already exists
-        existing_admin = await self.repo.get_admin_by_email(request.email)
+        existing_admin = await self.repo.get_admin_by_email(request.email, primary=True)
         if existing_admin:
             raise OrganizationAlreadyExistsException(f"Admin with email {request.email}")
         
-        # Generate collection name
-        collection_name = f"org_{request.organization_name}"
+        # Generate collection name and pick a placement target
+        collection_name = collection_name_for(request.organization_name)
+        target = placement.default_target_for(request.organization_name)
         
         # Create organization document
+        now = utcnow_ms()
         org_data = {
             "organization_name": request.organization_name,
             "collection_name": collection_name,
+            "placement": target,
+            "tenancy": settings.TENANCY_MODE,
             "admin_id": "",  # Will be updated after admin creation
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "created_at": now,
+            "updated_at": now
         }
         
-        # Insert organization
-        org_id = await self.repo.create_organization(org_data)
-        
-        # Create admin user
-        admin_data = {
-            "email": request.email,
-            "hashed_password": SecurityUtils.hash_password(request.password),
-            "organization_id": org_id,
-            "organization_name": request.organization_name,
-            "created_at": datetime.utcnow()
-        }
-        admin_id = await self.repo.create_admin(admin_data)
+        # Record the writes so follow-up reads on secondaries see them
+        async with db.write_session(f"org:{request.organization_name}", f"admin:{request.email}") as session:
+            # Insert organization
+            org_id = await self.repo.create_organization(org_data, session=session)
+            
+            # Create admin user
+            admin_data = {
+                "email": request.email,
+                "hashed_password": await self._hash_password(request.password),
+                "organization_id": org_id,
+                "organization_name": request.organization_name,
+                "created_at": now
+            }
+            admin_id = await self.repo.create_admin(admin_data, session=session)
+            
+            # Update organization with admin_id
+            await self.repo.update_organization(
+                org_id, {"admin_id": admin_id, "updated_at": utcnow_ms()}, session=session
+            )
         
-        # Update organization with admin_id
-        await self.repo.update_organization(org_id, {"admin_id": admin_id})
+        if self.search:
+            self.search.upsert(org_id, request.organization_name, request.email)
         
         # Create dynamic collection for the organization
-        await self._create_dynamic_collection(collection_name)
+        await self._create_dynamic_collection({**org_data, "_id": org_id})
         
         return OrganizationResponse(
             organization_name=request.organization_name,
@@ -74,26 +106,73 @@ class OrganizationService:
     
     async def get_organization(self, org_name: str) -> OrganizationResponse:
         """Get organization by name"""
+        response, _, _ = await self.get_organization_versioned(org_name)
+        return response
+    
+    async def get_organizations(self, org_names: List[str]) -> Dict[str, Any]:
+        """Look up many organizations at once, reporting each requested name as found or missing"""
+        # Each name once, in request order
+        names = list(dict.fromkeys(org_names))
+        if len(names) > settings.ORG_BATCH_GET_MAX_NAMES:
+            raise BatchTooLargeException(settings.ORG_BATCH_GET_MAX_NAMES)
+        
+        orgs = {org["organization_name"]: org for org in await self.repo.get_many_with_admins(names)}
+        results = []
+        for name in names:
+            org = orgs.get(name)
+            results.append({
+                "organization_name": name,
+                "found": org is not None,
+                "organization": OrganizationResponse(
+                    organization_name=org["organization_name"],
+                    collection_name=org["collection_name"],
+                    admin_email=org.get("admin_email") or "N/A",
+                    created_at=org["created_at"]
+                ) if org else None
+            })
+        return {"results": results, "found": len(orgs), "missing": len(names) - len(orgs)}
+    
+    async def get_validators(self, org_name: str) -> Tuple[str, datetime]:
+        """Get an organization's ETag and Last-Modified from a projected, index-covered lookup"""
         
-        org = await self.repo.get_by_name(org_name)
+        async with db.read_session(f"org:{org_name}") as session:
+            org = await self.repo.get_validator(org_name, session=session)
         if not org:
             raise OrganizationNotFoundException(org_name)
-        
-        # Get admin details
-        admin = await self.repo.get_admin_by_id(org["admin_id"])
-        
-        return OrganizationResponse(
+        attribute_request(org["_id"], org_name)
+        return self._validators(org)
+    
+    async def get_organization_versioned(self, org_name: str) -> Tuple[OrganizationResponse, str, datetime]:
+        """Get organization by name along with its ETag and Last-Modified"""
+        
+        async with db.read_session(f"org:{org_name}") as session:
+            org = await self.repo.get_by_name(org_name, session=session)
+            if not org:
+                raise OrganizationNotFoundException(org_name)
+            attribute_request(org["_id"], org_name)
+            
+            # Get admin details
+            admin = await self.repo.get_admin_by_id(org["admin_id"], session=session)
+        
+        response = OrganizationResponse(
             organization_name=org["organization_name"],
             collection_name=org["collection_name"],
             admin_email=admin["email"] if admin else "N/A",
             created_at=org["created_at"]
         )
+        return (response, *self._validators(org))
+    
+    @staticmethod
+    def _validators(org: Dict[str, Any]) -> Tuple[str, datetime]:
+        # Legacy documents may lack updated_at
+        last_modified = org.get("updated_at") or org["created_at"]
+        return make_etag(org["_id"], last_modified), last_modified
     
     async def update_organization(self, request: UpdateOrganizationRequest, current_admin_email: str) -> OrganizationResponse:
         """Update organization with new name and sync data to new collection"""
         
         # Get admin to find their organization
-        admin = await self.repo.get_admin_by_email(current_admin_email)
+        admin = await self.repo.get_admin_by_email(current_admin_email, primary=True)
         if not admin:
             raise ForbiddenException("Admin not found")
         
@@ -103,52 +182,70 @@ class OrganizationService:
         # If organization name is not changing, just update admin credentials
         if old_org_name == new_org_name:
             # Update admin password if provided
-            await self.repo.admins_collection.update_one(
-                {"email": current_admin_email},
-                {"$set": {"hashed_password": SecurityUtils.hash_password(request.password)}}
-            )
+            async with db.write_session(f"org:{old_org_name}", f"admin:{current_admin_email}") as session:
+                await self.repo.update_admin(
+                    current_admin_email,
+                    {"hashed_password": await self._hash_password(request.password)},
+                    session=session
+                )
             return await self.get_organization(old_org_name)
         
         # Check if new organization name already exists
-        existing_org = await self.repo.get_by_name(new_org_name)
+        existing_org = await self.repo.get_by_name(new_org_name, primary=True, include_deleted=True)
         if existing_org:
             raise OrganizationAlreadyExistsException(new_org_name)
         
         # Get old organization
-        old_org = await self.repo.get_by_name(old_org_name)
+        old_org = await self.repo.get_by_name(old_org_name, primary=True)
         if not old_org:
             raise OrganizationNotFoundException(old_org_name)
         
-        old_collection_name = old_org["collection_name"]
-        new_collection_name = f"org_{new_org_name}"
-        
-        # Create new collection
-        await self._create_dynamic_collection(new_collection_name)
-        
-        # Sync data from old collection to new collection
-        await self._sync_collection_data(old_collection_name, new_collection_name)
-        
-        # Update organization document
+        # Shared-tenancy data is keyed by organization id, so only collection-per-tenant data moves
+        moves_data = old_org.get("tenancy", TENANCY_COLLECTION) == TENANCY_COLLECTION
+        new_collection_name = f"org_{new_org_name}" if moves_data else old_org["collection_name"]
         org_id = str(old_org["_id"])
-        await self.repo.update_organization(org_id, {
-            "organization_name": new_org_name,
-            "collection_name": new_collection_name,
-            "updated_at": datetime.utcnow()
-        })
-        
-        # Update admin document
-        await self.repo.admins_collection.update_one(
-            {"email": current_admin_email},
-            {
-                "$set": {
+        
+        try:
+            if moves_data:
+                old_org = await self._pause_writes(old_org)
+                new_org = {**old_org, "collection_name": new_collection_name}
+                
+                # Fresh collection on the same placement target
+                await self._prepare_target(new_org)
+                
+                # Sync data from old collection to new collection
+                await self._sync_collection_data(old_org, new_org)
+                
+                # Rebuild the tenant's declared indexes on the new collection
+                await self._apply_indexes(new_org)
+            
+            async with db.write_session(
+                f"org:{new_org_name}", f"org:{old_org_name}", f"admin:{current_admin_email}"
+            ) as session:
+                # Update organization document, resuming writes on the new collection
+                await self.repo.update_organization(org_id, {
                     "organization_name": new_org_name,
-                    "hashed_password": SecurityUtils.hash_password(request.password)
-                }
-            }
-        )
+                    "collection_name": new_collection_name,
+                    "migrating_at": None,
+                    "updated_at": utcnow_ms()
+                }, session=session)
+                
+                # Update admin document
+                await self.repo.update_admin(current_admin_email, {
+                    "organization_name": new_org_name,
+                    "hashed_password": await self._hash_password(request.password)
+                }, session=session)
+        except BaseException:
+            if moves_data:
+                await self._resume_writes(org_id)
+            raise
+        
+        if self.search:
+            self.search.upsert(org_id, new_org_name, current_admin_email)
         
         # Delete old collection
-        await self._delete_dynamic_collection(old_collection_name)
+        if moves_data:
+            await self._delete_dynamic_collection(old_org)
         
         return OrganizationResponse(
             organization_name=new_org_name,
@@ -158,10 +255,10 @@ class OrganizationService:
         )
     
     async def delete_organization(self, org_name: str, current_admin_email: str) -> Dict[str, str]:
-        """Delete organization and its collection"""
+        """Tombstone organization; its collection, admin and metadata are purged in the background"""
         
         # Get admin to verify ownership
-        admin = await self.repo.get_admin_by_email(current_admin_email)
+        admin = await self.repo.get_admin_by_email(current_admin_email, primary=True)
         if not admin:
             raise ForbiddenException("Admin not found")
         
@@ -170,58 +267,141 @@ class OrganizationService:
             raise ForbiddenException("You can only delete your own organization")
         
         # Get organization
-        org = await self.repo.get_by_name(org_name)
+        org = await self.repo.get_by_name(org_name, primary=True)
         if not org:
             raise OrganizationNotFoundException(org_name)
         
-        collection_name = org["collection_name"]
+        # Single tombstone write; MaintenanceService drops the data later
+        async with db.write_session(f"org:{org_name}") as session:
+            await self.repo.tombstone_organization(str(org["_id"]), session=session)
+        if self.search:
+            self.search.remove(str(org["_id"]))
         
-        # Delete dynamic collection
-        await self._delete_dynamic_collection(collection_name)
+        return {"message": f"Organization '{org_name}' deleted successfully"}
+    
+    async def move_organization(self, org_name: str, target: str, batch_size: Optional[int] = None) -> int:
+        """Move an organization's data to another placement target, returning documents copied"""
         
-        # Delete admin
-        await self.repo.delete_admin(org_name)
+        org = await self.repo.get_by_name(org_name, primary=True)
+        if not org:
+            raise OrganizationNotFoundException(org_name)
+        if target not in placement.target_names():
+            raise ValueError(f"Unknown placement target '{target}'")
+        if org.get("placement", DEFAULT_TARGET) == target:
+            return 0
         
-        # Delete organization
-        await self.repo.delete_organization(org_name)
+        return await self._relocate(org, {"placement": target}, batch_size)
+    
+    async def migrate_tenancy(self, org_name: str, tenancy: str, batch_size: Optional[int] = None) -> int:
+        """Move an organization's data between its own collection and the shared collection"""
         
-        return {"message": f"Organization '{org_name}' deleted successfully"}
+        org = await self.repo.get_by_name(org_name, primary=True)
+        if not org:
+            raise OrganizationNotFoundException(org_name)
+        if tenancy not in (TENANCY_COLLECTION, TENANCY_SHARED):
+            raise ValueError(f"Unknown tenancy mode '{tenancy}'")
+        if org.get("tenancy", TENANCY_COLLECTION) == tenancy:
+            return 0
+        
+        collection_name = collection_name_for(org_name, tenancy)
+        changes = {"tenancy": tenancy, "collection_name": collection_name}
+        return await self._relocate(org, changes, batch_size)
     
-    async def _create_dynamic_collection(self, collection_name: str):
-        """Create a new collection for organization"""
-        master_db = db.get_master_db()
-        
-        # Check if collection already exists
-        existing_collections = await master_db.list_collection_names()
-        if collection_name not in existing_collections:
-            # Create collection with validation schema (optional)
-            await master_db.create_collection(
-                collection_name,
-                validator={
-                    "$jsonSchema": {
-                        "bsonType": "object",
-                        "description": "Organization-specific data collection"
-                    }
-                }
-            )
-            print(f"✅ Created collection: {collection_name}")
-    
-    async def _sync_collection_data(self, old_collection: str, new_collection: str):
-        """Sync data from old collection to new collection"""
-        master_db = db.get_master_db()
-        old_col = master_db[old_collection]
-        new_col = master_db[new_collection]
-        
-        # Get all documents from old collection
-        documents = await old_col.find().to_list(length=None)
-        
-        if documents:
-            # Insert into new collection
-            await new_col.insert_many(documents)
-            print(f"✅ Synced {len(documents)} documents from {old_collection} to {new_collection}")
-    
-    async def _delete_dynamic_collection(self, collection_name: str):
-        """Delete organization collection"""
-        master_db = db.get_master_db()
-        await master_db.drop_collection(collection_name)
-        print(f"✅ Deleted collection: {collection_name}")
+    async def _relocate(self, org: Dict[str, Any], changes: Dict[str, Any], batch_size: Optional[int]) -> int:
+        """Copy tenant data to its new home, switch the organization record, then drop the old copy"""
+        
+        org_id = str(org["_id"])
+        try:
+            org = await self._pause_writes(org)
+            new_org = {**org, **changes}
+            await self._prepare_target(new_org)
+            copied = await self._sync_collection_data(org, new_org, batch_size)
+            await self._apply_indexes(new_org)
+            
+            # Only switch the organization record once the copy is complete
+            source_count = await TenantDataRepository(org).count_documents({})
+            dest_count = await TenantDataRepository(new_org).count_documents({})
+            if source_count != dest_count:
+                raise Exception(
+                    f"Copy of {org['organization_name']} data incomplete ({dest_count}/{source_count}); not switched"
+                )
+        except BaseException:
+            await self._resume_writes(org_id)
+            raise
+        
+        await self.repo.update_organization(org_id, {**changes, "migrating_at": None, "updated_at": utcnow_ms()})
+        await self._delete_dynamic_collection(org)
+        return copied
+    
+    async def _pause_writes(self, org: Dict[str, Any]) -> Dict[str, Any]:
+        """Stop document and index writes of a tenant whose data is about to be copied
+        
+        Waits MIGRATION_WRITE_DRAIN_MS for writes that passed the check just before, then
+        returns the organization as it stands with writes paused.
+        """
+        org_id = str(org["_id"])
+        await self.repo.update_organization(org_id, {"migrating_at": utcnow_ms()})
+        await asyncio.sleep(settings.MIGRATION_WRITE_DRAIN_MS / 1000)
+        current = await self.repo.get_by_id(org_id, primary=True)
+        if not current:
+            raise OrganizationNotFoundException(org["organization_name"])
+        return current
+    
+    async def _resume_writes(self, org_id: str):
+        """Lift the pause after a copy that was abandoned; the source is still the live copy"""
+        await self.repo.update_organization(org_id, {"migrating_at": None})
+    
+    async def _create_dynamic_collection(self, org: Dict[str, Any]):
+        """Create the storage for an organization on its placement target"""
+        await TenantDataRepository(org).provision()
+    
+    async def _prepare_target(self, org: Dict[str, Any]):
+        """Empty storage for a copy; whatever an interrupted earlier run left there may be stale"""
+        await self._delete_dynamic_collection(org)
+        await self._create_dynamic_collection(org)
+    
+    async def _apply_indexes(self, org: Dict[str, Any]):
+        """Create an organization's declared indexes on its (new) collection, after the data copy"""
+        tenant = TenantDataRepository(org)
+        specs = org.get("indexes") or {}
+        if tenant.shared or not specs:
+            return
+        errors = await tenant.apply_indexes(specs)
+        for name, error in errors.items():
+            await self.repo.set_index_status(str(org["_id"]), name, FAILED, error)
+    
+    async def _sync_collection_data(
+        self,
+        old_org: Dict[str, Any],
+        new_org: Dict[str, Any],
+        batch_size: Optional[int] = None
+    ) -> int:
+        """Stream an organization's data to its new location in bounded batches"""
+        source = TenantDataRepository(old_org)
+        dest = TenantDataRepository(new_org)
+        batch_size = batch_size or settings.PLACEMENT_COPY_BATCH_SIZE
+        
+        copied = 0
+        batch = []
+        async for document in source.collection.find(source.scope({}), batch_size=batch_size):
+            # Through the tenant-facing form, so ids are (un)namespaced to match the destination
+            batch.append(dest.tag(source.untag(document)))
+            if len(batch) >= batch_size:
+                copied += await self._insert_batch(dest.collection, batch)
+                batch = []
+        if batch:
+            copied += await self._insert_batch(dest.collection, batch)
+        
+        if copied:
+            print(f"✅ Synced {copied} documents from {source.collection_name} to {dest.collection_name}")
+        return copied
+    
+    @staticmethod
+    async def _insert_batch(collection, batch) -> int:
+        """Insert a batch into the emptied target; any failure aborts the copy before the switch"""
+        result = await collection.insert_many(batch, ordered=False)
+        return len(result.inserted_ids)
+    
+    async def _delete_dynamic_collection(self, org: Dict[str, Any]):
+        """Delete an organization's data"""
+        await TenantDataRepository(org).delete_all()
@@ -0,0 +1,82 @@
+from app.repositories.organization import OrganizationRepository
+from app.utils.search_index import SearchIndex
+from app.core.config import settings
+from app.core.logging import logger
+from typing import Callable, Dict, List, Optional
+import asyncio
+import time
+
+
+class SearchService:
+    """Organization search served from an in-memory index
+    
+    The index is built from the database at startup and rebuilt periodically, which
+    also picks up changes made by other worker processes. Writes made through this
+    process are applied immediately.
+    """
+    
+    def __init__(self, repo: OrganizationRepository):
+        self.repo = repo
+        self.index = SearchIndex()
+        self.built_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Changes made while a rebuild is scanning, replayed onto the new index before it goes live
+        self._replay: Optional[List[Callable[[SearchIndex], None]]] = None
+    
+    def start(self):
+        """Start the periodic rebuild loop on the running event loop"""
+        if settings.SEARCH_REFRESH_INTERVAL_SECONDS > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.SEARCH_REFRESH_INTERVAL_SECONDS)
+            try:
+                await self.rebuild()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Search index rebuild failed, keeping the previous index: {e}")
+    
+    async def rebuild(self) -> int:
+        """Build a fresh index from the database and swap it in, returning the number of organizations"""
+        async with self._lock:
+            self._replay = []
+            try:
+                entries = await self.repo.get_search_entries()
+                index = SearchIndex()
+                for entry in entries:
+                    index.upsert(entry["id"], entry["organization_name"], entry["admin_email"])
+                for change in self._replay:
+                    change(index)
+            finally:
+                self._replay = None
+            self.index = index
+            self.built_at = time.time()
+            return len(index)
+    
+    def _apply(self, change: Callable[[SearchIndex], None]):
+        change(self.index)
+        if self._replay is not None:
+            self._replay.append(change)
+    
+    def upsert(self, org_id: str, organization_name: str, admin_email: str):
+        """Index a created or renamed organization"""
+        self._apply(lambda index: index.upsert(org_id, organization_name, admin_email))
+    
+    def remove(self, org_id: str):
+        """Drop a deleted organization from the index"""
+        self._apply(lambda index: index.remove(org_id))
+    
+    def search(self, query: str, limit: int) -> List[Dict[str, str]]:
+        return self.index.search(query, limit)
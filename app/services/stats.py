@@ -0,0 +1,90 @@
+from app.repositories.organization import OrganizationRepository
+from app.repositories.tenant import TenantDataRepository, TENANCY_COLLECTION
+from app.core.placement import DEFAULT_TARGET
+from app.core.config import settings
+from app.utils.exceptions import StaleTokenException
+from app.utils.singleflight import SingleFlight
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from datetime import datetime
+import asyncio
+import time
+
+SIZE_FIELDS = ("count", "size", "storage_size", "total_index_size")
+
+
+class StatsService:
+    """Tenant storage statistics, gathered with bounded concurrency and cached for a short TTL"""
+    
+    def __init__(self, repo: OrganizationRepository):
+        self.repo = repo
+        # key -> (monotonic expiry, value)
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+        # Dashboards polling at the same moment share one collection pass
+        self._flight = SingleFlight()
+    
+    async def _cached(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        value = await self._flight.do(key, fetch)
+        self._store(key, value)
+        return value
+    
+    def _store(self, key: Hashable, value: Any):
+        now = time.monotonic()
+        if len(self._cache) >= settings.STATS_CACHE_MAX_ENTRIES:
+            self._cache = {k: entry for k, entry in self._cache.items() if entry[0] > now}
+        self._cache[key] = (now + settings.STATS_CACHE_TTL_SECONDS, value)
+    
+    @staticmethod
+    def _describe(org: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "organization_name": org["organization_name"],
+            "collection_name": org["collection_name"],
+            "tenancy": org.get("tenancy", TENANCY_COLLECTION),
+            "placement": org.get("placement") or DEFAULT_TARGET,
+            "generated_at": datetime.utcnow()
+        }
+    
+    async def _collect(self, org: Dict[str, Any]) -> Dict[str, Any]:
+        return {**self._describe(org), **await TenantDataRepository(org).storage_stats()}
+    
+    @staticmethod
+    def _org_key(org: Dict[str, Any]) -> Tuple:
+        # By id, so a name reused by another organization never hits this entry; name and
+        # collection too, so figures from before a rename are not served after it
+        return ("org", str(org["_id"]), org["organization_name"], org["collection_name"])
+    
+    async def get_organization_stats(self, admin: Dict[str, Any]) -> Dict[str, Any]:
+        """Storage statistics of the data of the organization an access token was issued for"""
+        org = await self.repo.get_for_admin(admin)
+        if not org:
+            raise StaleTokenException()
+        return await self._cached(self._org_key(org), lambda: self._collect(org))
+    
+    async def get_all_stats(self) -> Dict[str, Any]:
+        """Storage statistics of every organization, at most STATS_CONCURRENCY collections at a time"""
+        return await self._cached("all", self._collect_all)
+    
+    async def _collect_all(self) -> Dict[str, Any]:
+        orgs = await self.repo.get_storage_records()
+        semaphore = asyncio.Semaphore(settings.STATS_CONCURRENCY)
+        
+        async def collect(org: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    stats = await self._collect(org)
+                except Exception as e:
+                    # One unreachable placement target should not blank the whole report
+                    return {**self._describe(org), "error": str(e)}
+            # Per-tenant requests in the next TTL window reuse this pass
+            self._store(self._org_key(org), stats)
+            return stats
+        
+        organizations = await asyncio.gather(*(collect(org) for org in orgs))
+        totals = {field: sum(stats.get(field) or 0 for stats in organizations) for field in SIZE_FIELDS}
+        return {
+            "generated_at": datetime.utcnow(),
+            "organizations": organizations,
+            "totals": totals
+        }
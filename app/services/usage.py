@@ -0,0 +1,131 @@
+from app.repositories.usage import UsageRepository
+from app.core.config import settings
+from app.core.logging import logger
+from typing import Any, Dict, List, Optional, Tuple
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+import asyncio
+
+FIELDS = ("requests", "errors", "latency_ms_sum", "bytes_out")
+
+# Per-request slot the usage middleware reads once the response is sent:
+# {"organization": (organization_id, organization_name) or None}
+request_organization: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_organization", default=None)
+
+
+def attribute_request(org_id: Any, org_name: str):
+    """Count the current request against an organization a handler found by name"""
+    state = request_organization.get()
+    if state is not None:
+        state["organization"] = (str(org_id), org_name)
+
+
+class UsageService:
+    """Per-organization usage counters aggregated in memory and flushed write-behind"""
+    
+    def __init__(self, repo: UsageRepository):
+        self.repo = repo
+        # (organization_id, day) -> counters not yet written
+        self._pending: Dict[Tuple[str, datetime], Dict[str, int]] = {}
+        # organization_id -> latest name seen, stored with the counters
+        self._names: Dict[str, str] = {}
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+    
+    @staticmethod
+    def _today() -> datetime:
+        now = datetime.utcnow()
+        return datetime(now.year, now.month, now.day)
+    
+    def record(self, org_id: str, org_name: str, latency_ms: float, bytes_out: int, error: bool):
+        """Count one request against an organization; never touches the database"""
+        key = (org_id, self._today())
+        counters = self._pending.get(key)
+        if counters is None:
+            # Bound memory between flushes; request-supplied names could otherwise grow it freely
+            if len(self._pending) >= settings.USAGE_MAX_PENDING_KEYS:
+                self.dropped += 1
+                return
+            counters = self._pending[key] = dict.fromkeys(FIELDS, 0)
+        self._names[org_id] = org_name
+        counters["requests"] += 1
+        counters["errors"] += int(error)
+        counters["latency_ms_sum"] += int(latency_ms)
+        counters["bytes_out"] += bytes_out
+    
+    def start(self):
+        """Start the periodic flush loop on the running event loop"""
+        if settings.USAGE_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.USAGE_FLUSH_INTERVAL_SECONDS)
+            await self.flush()
+    
+    async def flush(self) -> int:
+        """Write buffered counters in one bulk_write; on failure they are kept for the next flush"""
+        async with self._lock:
+            batch, self._pending = self._pending, {}
+            names, self._names = self._names, {}
+            if not batch:
+                return 0
+            try:
+                await self.repo.increment_many(batch, names)
+            except asyncio.CancelledError:
+                self._merge(batch, names)
+                raise
+            except Exception as e:
+                self._merge(batch, names)
+                logger.error(f"Usage flush failed, {len(batch)} counters kept for retry: {e}")
+                return 0
+            return len(batch)
+    
+    def _merge(self, batch: Dict[Tuple[str, datetime], Dict[str, int]], names: Dict[str, str]):
+        for org_id, name in names.items():
+            # A name recorded since the failed flush is the newer one
+            self._names.setdefault(org_id, name)
+        for key, values in batch.items():
+            counters = self._pending.get(key)
+            if counters is None:
+                self._pending[key] = values
+            else:
+                for field in FIELDS:
+                    counters[field] += values[field]
+    
+    async def get_usage(self, org_id: str, days: int) -> List[Dict[str, Any]]:
+        """Daily usage for the last `days` days, including this process's counters not flushed yet
+        
+        Other worker processes keep their own buffers, so up to one flush interval of their
+        requests may be missing: recent totals are approximate.
+        """
+        since = self._today() - timedelta(days=days - 1)
+        by_day = {row["day"]: row for row in await self.repo.get_usage(org_id, since)}
+        for (pending_id, day), values in self._pending.items():
+            if pending_id != org_id or day < since:
+                continue
+            row = by_day.setdefault(day, {"day": day})
+            for field in FIELDS:
+                row[field] = row.get(field, 0) + values[field]
+        
+        return [
+            {
+                "day": day,
+                **{field: by_day[day].get(field, 0) for field in FIELDS},
+                "avg_latency_ms": round(by_day[day].get("latency_ms_sum", 0) / by_day[day]["requests"], 2)
+                if by_day[day].get("requests") else 0.0
+            }
+            for day in sorted(by_day)
+        ]
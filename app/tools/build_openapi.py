@@ -0,0 +1,27 @@
+"""
+Prebuild the OpenAPI schema.
+
+    python -m app.tools.build_openapi --output openapi.json
+
+Writes the schema FastAPI would otherwise generate on the first /docs or
+/openapi.json request. Point OPENAPI_SCHEMA_FILE at the output to have the
+app load it at startup instead. Rebuild whenever routes or schemas change.
+"""
+import argparse
+import json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the OpenAPI schema to a file")
+    parser.add_argument("--output", default="openapi.json", help="Destination path")
+    args = parser.parse_args()
+    
+    from app.main import app
+    
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(app.openapi(), f, separators=(",", ":"))
+    print(f"✅ Wrote OpenAPI schema for {len(app.routes)} routes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
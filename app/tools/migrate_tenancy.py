@@ -0,0 +1,64 @@
+"""
+Online migration between tenancy modes.
+
+    python -m app.tools.migrate_tenancy --to shared                 # every tenant
+    python -m app.tools.migrate_tenancy --to collection --org acme  # one tenant
+
+Tenants are migrated one at a time while the service keeps running: each
+tenant's data is streamed to its new location, the document count is verified,
+the organization record is switched, and only then is the old copy removed.
+Until the switch, reads keep going to the old location; the tenant's document
+and index writes are refused with 503 from MIGRATION_WRITE_DRAIN_MS before the
+copy until the switch, so nothing written meanwhile is lost. Set TENANCY_MODE to the new mode first so new organizations
+are created in it.
+"""
+import argparse
+import asyncio
+from app.core.database import db
+from app.core.placement import placement
+from app.repositories.organization import LIVE
+from app.repositories.tenant import TENANCY_COLLECTION, TENANCY_SHARED
+from app.services.organization import OrganizationService
+from app.utils.exceptions import OrganizationNotFoundException
+
+
+async def run(args):
+    await db.connect()
+    await placement.connect()
+    try:
+        org_service = OrganizationService()
+        if args.org:
+            names = [args.org]
+        else:
+            # Legacy documents without a tenancy field are collection-per-tenant;
+            # tombstoned organizations are left to the purger
+            cursor = org_service.repo.collection.find(
+                {"tenancy": {"$ne": args.to}, **LIVE},
+                {"organization_name": 1}
+            )
+            names = [org["organization_name"] async for org in cursor]
+        
+        for org_name in names:
+            try:
+                copied = await org_service.migrate_tenancy(org_name, args.to, args.batch_size)
+            except OrganizationNotFoundException:
+                if args.org:
+                    raise
+                print(f"⏭️  Skipped {org_name}: deleted since the migration started")
+                continue
+            print(f"✅ Migrated {org_name} to {args.to} tenancy ({copied} documents)")
+    finally:
+        await placement.disconnect()
+        await db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate tenants between tenancy modes")
+    parser.add_argument("--to", required=True, choices=[TENANCY_COLLECTION, TENANCY_SHARED])
+    parser.add_argument("--org", help="Only migrate this organization")
+    parser.add_argument("--batch-size", type=int, default=None)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
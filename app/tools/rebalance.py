@@ -0,0 +1,81 @@
+"""
+Tenant rebalancing tool.
+
+    python -m app.tools.rebalance --org acme_corp --to east   # move one tenant
+    python -m app.tools.rebalance --plan                      # list tenants off their hashed target
+    python -m app.tools.rebalance --apply                     # move all of them
+
+Each move streams the tenant collection to the new target in batches, verifies
+the document count, switches the placement record and drops the source copy.
+The tenant's writes are refused with 503 for the duration of its move, so run
+moves while the tenant is quiet.
+"""
+import argparse
+import asyncio
+from app.core.database import db
+from app.core.placement import placement, DEFAULT_TARGET
+from app.repositories.organization import LIVE
+from app.services.organization import OrganizationService
+from app.utils.exceptions import OrganizationNotFoundException
+from typing import List, Tuple
+
+
+async def plan_moves(org_service: OrganizationService) -> List[Tuple[str, str, str]]:
+    """(org_name, current_target, hashed_target) of misplaced tenants
+    
+    Read in full before any move starts, so the cursor is not held open across long
+    copies; tombstoned organizations are left to the purger.
+    """
+    cursor = org_service.repo.collection.find(LIVE, {"organization_name": 1, "placement": 1})
+    moves = []
+    async for org in cursor:
+        current = org.get("placement", DEFAULT_TARGET)
+        desired = placement.default_target_for(org["organization_name"])
+        if current != desired:
+            moves.append((org["organization_name"], current, desired))
+    return moves
+
+
+async def run(args):
+    await db.connect()
+    await placement.connect()
+    try:
+        org_service = OrganizationService()
+        if args.org:
+            copied = await org_service.move_organization(args.org, args.to, args.batch_size)
+            print(f"✅ Moved {args.org} to {args.to} ({copied} documents)")
+            return
+        
+        for org_name, current, desired in await plan_moves(org_service):
+            print(f"{org_name}: {current} -> {desired}")
+            if args.apply:
+                try:
+                    copied = await org_service.move_organization(org_name, desired, args.batch_size)
+                except OrganizationNotFoundException:
+                    print(f"⏭️  Skipped {org_name}: deleted since the plan was made")
+                    continue
+                print(f"✅ Moved {org_name} ({copied} documents)")
+    finally:
+        await placement.disconnect()
+        await db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move tenants between placement targets")
+    parser.add_argument("--org", help="Organization to move")
+    parser.add_argument("--to", help="Destination target for --org")
+    parser.add_argument("--plan", action="store_true", help="List tenants not on their hashed target")
+    parser.add_argument("--apply", action="store_true", help="Move every tenant listed by --plan")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    
+    if args.org and not args.to:
+        parser.error("--org requires --to")
+    if not (args.org or args.plan or args.apply):
+        parser.error("Specify --org/--to, --plan or --apply")
+    
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Startup time profiling.
+
+    python -m app.tools.startup_profile imports --top 15
+    python -m app.tools.startup_profile first-request --runs 5 --budget-ms 1500
+
+`imports` runs `import app.main` under `python -X importtime` in a fresh
+interpreter and reports the total import time and the packages that cost the
+most. `first-request` starts the server in a fresh process and measures the
+time until GET /health answers, i.e. imports, lifespan startup and the first
+request together; with --budget-ms it exits non-zero when the median run is
+over budget. Both use the environment (and .env) of the calling shell, so the
+database in MONGODB_URI must be reachable for `first-request`.
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+def profile_imports() -> Tuple[float, Dict[str, float]]:
+    """Total import time of app.main and self time per top-level package, in ms"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    packages: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        module = name.strip()
+        packages[module.split(".")[0]] += int(self_us) / 1000
+        if module == "app.main":
+            total = int(cumulative_us) / 1000
+    return total, packages
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(timeout: float) -> float:
+    """Milliseconds from process start until GET /health returns a response"""
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy()
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode} before answering")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                conn.request("GET", "/health")
+                conn.getresponse().read()
+                conn.close()
+                return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"No response within {timeout} seconds")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure application startup time")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imports = sub.add_parser("imports", help="Profile `import app.main`")
+    imports.add_argument("--top", type=int, default=15, help="Number of packages to list")
+    first = sub.add_parser("first-request", help="Benchmark time to first request")
+    first.add_argument("--runs", type=int, default=5)
+    first.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait per run")
+    first.add_argument("--budget-ms", type=float, default=None, help="Fail when the median exceeds this")
+    args = parser.parse_args()
+    
+    if args.command == "imports":
+        total, packages = profile_imports()
+        print(f"import app.main: {total:.1f} ms")
+        for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"  {name:<24} {ms:8.1f} ms")
+        return
+    
+    samples: List[float] = [time_to_first_request(args.timeout) for _ in range(args.runs)]
+    median = statistics.median(samples)
+    print(f"time to first request: median {median:.0f} ms, min {min(samples):.0f} ms, max {max(samples):.0f} ms ({args.runs} runs)")
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"❌ Over the startup budget of {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
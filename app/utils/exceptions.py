@@ -26,9 +26,114 @@ class UnauthorizedException(HTTPException):
         )
 
 
+class StaleTokenException(UnauthorizedException):
+    def __init__(self):
+        super().__init__("Organization was renamed or deleted since this token was issued; log in again")
+
+
 class ForbiddenException(HTTPException):
     def __init__(self, detail: str = "Access forbidden"):
         super().__init__(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=detail
         )
+
+
+class TooManyRequestsException(HTTPException):
+    def __init__(self, retry_after: int, detail: str = "Too many requests. Please try again later."):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class IdempotencyConflictException(HTTPException):
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class IdempotencyKeyReusedException(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+
+
+class DatabaseUnavailableException(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database temporarily unavailable. Please retry later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class TenantMigratingException(HTTPException):
+    def __init__(self, retry_after: int = 5):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Organization data is being moved; writes are paused. Please retry later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class IndexAlreadyExistsException(HTTPException):
+    def __init__(self, name: str):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Index '{name}' already exists"
+        )
+
+
+class IndexNotFoundException(HTTPException):
+    def __init__(self, name: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Index '{name}' not found"
+        )
+
+
+class IndexLimitExceededException(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Organizations may declare at most {limit} indexes"
+        )
+
+
+class IndexesNotSupportedException(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Custom indexes are not available for organizations in the shared collection"
+        )
+
+
+class InvalidDocumentRequestException(HTTPException):
+    def __init__(self, detail: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+
+
+class DocumentNotFoundException(HTTPException):
+    def __init__(self, document_id: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document '{document_id}' not found"
+        )
+
+
+class BatchTooLargeException(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {limit} items per request"
+        )
@@ -0,0 +1,214 @@
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+EXACT = "exact"
+PREFIX = "prefix"
+FUZZY = "fuzzy"
+_TIERS = {EXACT: 0, PREFIX: 1, FUZZY: 2}
+
+# Completions cached per trie node; bounds how many prefix matches one query can return
+COMPLETIONS_PER_NODE = 64
+
+# Terms sharing the most trigrams with a query that get an edit-distance check
+FUZZY_CANDIDATES = 32
+
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    return text.strip().lower()
+
+
+def terms_for(organization_name: str, admin_email: str) -> Set[str]:
+    """Searchable terms of a record: name and email whole, plus the parts of the name and the
+    email's local part split on punctuation (domains are shared too widely to be useful)"""
+    terms = set()
+    for value, searchable in (
+        (normalize(organization_name), normalize(organization_name)),
+        (normalize(admin_email), normalize(admin_email).partition("@")[0])
+    ):
+        if not value:
+            continue
+        terms.add(value)
+        terms.update(part for part in _SEPARATORS.split(searchable) if len(part) > 1)
+    return terms
+
+
+def trigrams(term: str) -> Set[str]:
+    # Padded at the front only, so a query also matches the start of longer terms
+    padded = "  " + term
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting an adjacent swap as one edit, giving up with limit + 1 once past limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+            if before is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _shortest(terms) -> List[str]:
+    return sorted(terms, key=lambda term: (len(term), term))[:COMPLETIONS_PER_NODE]
+
+
+class _Node:
+    __slots__ = ("children", "ids", "top")
+    
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Records whose term ends at this node
+        self.ids: Set[str] = set()
+        # Shortest terms in this subtree, so a prefix lookup never walks the subtree
+        self.top: List[str] = []
+
+
+class SearchIndex:
+    """In-memory name/email index: a trie for prefix lookups and trigram postings for typo tolerance"""
+    
+    def __init__(self):
+        self._root = _Node()
+        self._grams: Dict[str, Set[str]] = {}
+        self._term_ids: Dict[str, Set[str]] = {}
+        # record id -> (organization_name, admin_email, terms)
+        self._records: Dict[str, Tuple[str, str, Set[str]]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def upsert(self, record_id: str, organization_name: str, admin_email: str):
+        """Add a record or replace what is indexed for it"""
+        self.remove(record_id)
+        terms = terms_for(organization_name, admin_email)
+        self._records[record_id] = (organization_name, admin_email, terms)
+        for term in terms:
+            path = self._path(term, create=True)
+            path[-1].ids.add(record_id)
+            
+            ids = self._term_ids.get(term)
+            if ids is None:
+                ids = self._term_ids[term] = set()
+                for gram in trigrams(term):
+                    self._grams.setdefault(gram, set()).add(term)
+                for node in path:
+                    if term not in node.top:
+                        node.top = _shortest(node.top + [term])
+            ids.add(record_id)
+    
+    def remove(self, record_id: str):
+        record = self._records.pop(record_id, None)
+        if record is None:
+            return
+        for term in record[2]:
+            path = self._path(term)
+            path[-1].ids.discard(record_id)
+            ids = self._term_ids[term]
+            ids.discard(record_id)
+            if ids:
+                continue
+            
+            del self._term_ids[term]
+            for gram in trigrams(term):
+                postings = self._grams[gram]
+                postings.discard(term)
+                if not postings:
+                    del self._grams[gram]
+            # Refill completion lists bottom-up from the children's lists
+            for depth in range(len(path) - 1, -1, -1):
+                node = path[depth]
+                if term not in node.top:
+                    break
+                candidates = [child_term for child in node.children.values() for child_term in child.top]
+                if node.ids:
+                    candidates.append(term[:depth])
+                node.top = _shortest(candidates)
+        # Emptied trie nodes are left in place; a rebuild starts from a fresh index
+    
+    def _path(self, term: str, create: bool = False) -> List[_Node]:
+        """Nodes from the root to term's node"""
+        path = [self._root]
+        for char in term:
+            path.append(path[-1].children.setdefault(char, _Node()) if create else path[-1].children[char])
+        return path
+    
+    def _find(self, prefix: str) -> Optional[_Node]:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+    
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Best matches for query: exact, then prefix (shortest terms first), then within a small edit distance"""
+        query = normalize(query)
+        if not query:
+            return []
+        # record id -> (tier, distance, term length)
+        best: Dict[str, Tuple[int, int, int]] = {}
+        
+        def offer(record_id: str, tier: str, distance: int, term: str):
+            rank = (_TIERS[tier], distance, len(term))
+            if record_id not in best or rank < best[record_id]:
+                best[record_id] = rank
+        
+        start = self._find(query)
+        if start is not None:
+            # Shortest completions first; stop once the page is full
+            for term in start.top:
+                if len(best) >= limit:
+                    break
+                for record_id in self._term_ids[term]:
+                    offer(record_id, EXACT if term == query else PREFIX, 0, term)
+        
+        if len(best) < limit:
+            self._fuzzy(query, offer)
+        
+        ranked = sorted(best.items(), key=lambda item: (item[1], self._records[item[0]][0]))[:limit]
+        tiers = {value: key for key, value in _TIERS.items()}
+        return [
+            {
+                "organization_name": self._records[record_id][0],
+                "admin_email": self._records[record_id][1],
+                "match": tiers[rank[0]]
+            }
+            for record_id, rank in ranked
+        ]
+    
+    def _fuzzy(self, query: str, offer):
+        if len(query) < 3:
+            return
+        max_distance = 1 if len(query) < 6 else 2
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._grams.get(gram, ()))
+        # One edit disturbs at most three trigrams; of the rest, only verify the closest few
+        needed = max(1, len(query_grams) - 3 * max_distance)
+        for term, count in shared.most_common(FUZZY_CANDIDATES):
+            if count < needed:
+                break
+            # Compare against the whole term and against its start, for typos while still typing
+            distance = min(
+                edit_distance(query, term, max_distance),
+                edit_distance(query, term[:len(query)], max_distance)
+            )
+            if distance <= max_distance:
+                for record_id in self._term_ids[term]:
+                    offer(record_id, FUZZY, distance, term)
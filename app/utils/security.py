@@ -1,24 +1,67 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict
-import bcrypt
-from jose import JWTError, jwt
+import time
 from app.core.config import settings
 
+# bcrypt and jose (with its crypto backends) are imported on first use, keeping
+# them off the import path of app startup and test collection
+
 
 class SecurityUtils:
     
-    @staticmethod
-    def hash_password(password: str) -> str:
+    # Work factor for new hashes; may be raised by calibrate_rounds() at startup
+    bcrypt_rounds: int = settings.BCRYPT_ROUNDS
+    
+    @classmethod
+    def hash_password(cls, password: str) -> str:
         """Hash a password using bcrypt"""
+        import bcrypt
+        
         # Convert to bytes and hash
         pwd_bytes = password.encode('utf-8')
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=cls.bcrypt_rounds)
         hashed = bcrypt.hashpw(pwd_bytes, salt)
         return hashed.decode('utf-8')
     
+    @staticmethod
+    def get_rounds(hashed_password: str) -> int:
+        """Extract the cost factor from a '$2b$<cost>$...' bcrypt hash"""
+        try:
+            return int(hashed_password.split('$')[2])
+        except (IndexError, ValueError):
+            return 0
+    
+    @classmethod
+    def needs_rehash(cls, hashed_password: str) -> bool:
+        """Check whether a stored hash uses a lower cost than configured
+        
+        Stronger hashes are kept, so processes that briefly disagree on the cost never
+        rehash the same password back and forth.
+        """
+        return cls.get_rounds(hashed_password) < cls.bcrypt_rounds
+    
+    @staticmethod
+    def calibrate_rounds(target_ms: int, min_rounds: int = 10, max_rounds: int = 31) -> int:
+        """Pick the highest cost whose hash time stays within target_ms on this machine"""
+        import bcrypt
+        
+        rounds = min_rounds
+        sample = b"calibration-password"
+        while rounds < max_rounds:
+            start = time.perf_counter()
+            bcrypt.hashpw(sample, bcrypt.gensalt(rounds=rounds))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # Each extra round doubles the work
+            if elapsed_ms * 2 > target_ms:
+                break
+            rounds += 1
+        return rounds
+    
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
+        import bcrypt
+        
         pwd_bytes = plain_password.encode('utf-8')
         hash_bytes = hashed_password.encode('utf-8')
         return bcrypt.checkpw(pwd_bytes, hash_bytes)
@@ -26,6 +69,8 @@ class SecurityUtils:
     @staticmethod
     def create_access_token(data: Dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
+        from jose import jwt
+        
         to_encode = data.copy()
         
         if expires_delta:
@@ -40,6 +85,8 @@ class SecurityUtils:
     @staticmethod
     def decode_access_token(token: str) -> Optional[Dict]:
         """Decode and verify JWT token"""
+        from jose import JWTError, jwt
+        
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
             return payload
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one shared in-flight awaitable"""
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+    
+    def in_flight(self) -> int:
+        """Number of keys with a call currently running"""
+        return len(self._calls)
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() or join an identical call already running for key
+        
+        The shared call outlives any one cancelled caller, but is cancelled with the last
+        one: nobody is left to use its result.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda done, key=key, call=call: self._finish(key, call))
+        
+        call.waiters += 1
+        try:
+            # Shield so one cancelled caller does not cancel the result shared with the others
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Released now, so a caller arriving before the task unwinds starts afresh
+                self._release(key, call)
+                call.task.cancel()
+    
+    def _release(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+    
+    def _finish(self, key: Hashable, call: _Call):
+        self._release(key, call)
+        # Mark the exception retrieved in case every waiter was cancelled
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,6 @@
+import os
+
+# Run against the in-process backend unless a real cluster is configured explicitly
+os.environ.setdefault("MONGODB_URI", "memory://")
+# Nothing else writes concurrently with the relocations tests run
+os.environ.setdefault("MIGRATION_WRITE_DRAIN_MS", "0")
@@ -0,0 +1,72 @@
+import time
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+from app import main
+from app.core.database import db
+from app.core.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from app.core.metrics import metrics
+
+
+def test_opens_on_error_rate_and_fails_fast():
+    """Test the circuit opens once failures reach the error rate"""
+    breaker = CircuitBreaker(min_calls=10, error_rate=0.5, open_seconds=60)
+    for _ in range(5):
+        breaker.record(True, 5)
+    for _ in range(4):
+        breaker.record(False)
+    assert breaker.state == CLOSED
+    
+    before = metrics.get("db_circuit_transitions_total", **{"from": CLOSED, "to": OPEN})
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() > 1
+    assert metrics.get("db_circuit_transitions_total", **{"from": CLOSED, "to": OPEN}) == before + 1
+
+
+def test_opens_on_slow_calls():
+    """Test the circuit opens when most calls exceed the latency threshold"""
+    breaker = CircuitBreaker(min_calls=5, slow_call_ms=100, slow_call_rate=0.8)
+    for _ in range(5):
+        breaker.record(True, 500)
+    assert breaker.state == OPEN
+
+
+def test_half_open_trials_close_or_reopen():
+    """Test trial requests after the open period decide the next state"""
+    breaker = CircuitBreaker(min_calls=1, open_seconds=0.01, half_open_calls=2)
+    breaker.record(False)
+    time.sleep(0.02)
+    
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record(True, 1)
+    breaker.record(True, 1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_health_probe_failures_reach_breaker(monkeypatch):
+    """Test health pings that cannot select a server count as breaker failures"""
+    class UnreachableAdmin:
+        async def command(self, name):
+            raise ServerSelectionTimeoutError("No servers available")
+    
+    class UnreachableClient:
+        admin = UnreachableAdmin()
+    
+    breaker = CircuitBreaker(min_calls=2, open_seconds=60)
+    monkeypatch.setattr(main, "breaker", breaker)
+    monkeypatch.setattr(db, "client", UnreachableClient())
+    
+    for _ in range(2):
+        assert (await main.health_check())["status"] == "unhealthy"
+    assert breaker.state == OPEN
+    assert (await main.health_check())["database"] == "circuit open"
@@ -0,0 +1,68 @@
+import gzip
+import pytest
+from app.middleware.compression import CompressionMiddleware, negotiate
+
+
+def json_app(body: bytes, chunks: int = 1):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"etag", b'"abc"')
+            ]
+        })
+        size = -(-len(body) // chunks)
+        for index in range(chunks):
+            more_body = index < chunks - 1
+            await send({"type": "http.response.body", "body": body[index * size:(index + 1) * size], "more_body": more_body})
+    return app
+
+
+async def call(app, accept_encoding: str = "gzip"):
+    sent = []
+    
+    async def send(message):
+        sent.append(message)
+    
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    await app(scope, None, send)
+    headers = dict(sent[0]["headers"])
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return headers, body, len(sent) - 1
+
+
+def test_negotiate_honours_quality_and_offer_order():
+    """Test the highest q-value wins and ties go to the server's preference"""
+    assert negotiate("gzip, br", ["br", "gzip"]) == "br"
+    assert negotiate("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate("gzip;q=0", ["gzip"]) is None
+    assert negotiate("*", ["gzip"]) == "gzip"
+    assert negotiate("identity", ["gzip"]) is None
+
+
+@pytest.mark.asyncio
+async def test_small_bodies_pass_through():
+    """Test responses under the threshold are sent unchanged"""
+    body = b'{"organization_name": "acme_corp"}'
+    headers, sent_body, _ = await call(CompressionMiddleware(json_app(body), minimum_size=1024, encodings=["gzip"]))
+    assert b"content-encoding" not in headers
+    assert sent_body == body
+
+
+@pytest.mark.asyncio
+async def test_streamed_body_is_compressed_chunk_by_chunk():
+    """Test a multi-chunk body is gzip-encoded as it streams, with headers adjusted"""
+    body = b'{"items": [' + b",".join(b'{"n": %d}' % i for i in range(5000)) + b"]}"
+    middleware = CompressionMiddleware(json_app(body, chunks=8), minimum_size=1024, offload_size=4096, encodings=["gzip"])
+    headers, sent_body, messages = await call(middleware, "br;q=0.9, gzip")
+    
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert headers[b"etag"] == b'W/"abc"'
+    assert b"content-length" not in headers
+    assert messages > 1
+    assert gzip.decompress(sent_body) == body
+    assert len(sent_body) < len(body) // 4
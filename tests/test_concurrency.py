@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from app.middleware.concurrency import AdaptiveConcurrencyMiddleware, AdaptiveLimiter, CRITICAL, HIGH, NORMAL, LOW
+from app.utils.security import SecurityUtils
+
+
+@pytest.mark.asyncio
+async def test_excess_requests_are_shed_after_queue_timeout():
+    """Test requests over the limit wait briefly, then are rejected"""
+    limiter = AdaptiveLimiter(initial_limit=2, critical_reserve=0, queue_timeout_ms=10)
+    assert await limiter.acquire(NORMAL)
+    assert await limiter.acquire(NORMAL)
+    assert not await limiter.acquire(NORMAL)
+    assert limiter.snapshot()["rejected"] == 1
+    assert limiter.snapshot()["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_release_admits_highest_priority_waiter_first():
+    """Test a freed slot goes to the highest-priority queued request"""
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1, critical_reserve=0, queue_timeout_ms=1000)
+    assert await limiter.acquire(NORMAL)
+    
+    low = asyncio.ensure_future(limiter.acquire(LOW))
+    critical = asyncio.ensure_future(limiter.acquire(CRITICAL))
+    await asyncio.sleep(0)
+    limiter.release(0.01)
+    
+    assert await critical
+    assert not low.done()
+    limiter.release(0.01)
+    assert await low
+
+
+@pytest.mark.asyncio
+async def test_full_queue_evicts_lower_priority_and_reserve_admits_critical():
+    """Test a full queue drops its lowest-priority waiter for a more important request"""
+    limiter = AdaptiveLimiter(initial_limit=1, critical_reserve=1, max_queue=1, queue_timeout_ms=1000)
+    assert await limiter.acquire(NORMAL)
+    
+    low = asyncio.ensure_future(limiter.acquire(LOW))
+    await asyncio.sleep(0)
+    # Critical evicts the queued low request and is admitted through the reserve slot
+    assert await limiter.acquire(CRITICAL)
+    assert await low is False
+    assert limiter.snapshot()["in_flight"] == 2
+
+
+def test_limit_adapts_to_latency():
+    """Test the limit grows on fast requests and backs off on slow ones"""
+    limiter = AdaptiveLimiter(initial_limit=10, latency_target_ms=100)
+    limiter.in_flight = 20
+    for _ in range(10):
+        limiter.release(0.01)
+    assert limiter.limit > 10
+    
+    grown = limiter.limit
+    limiter.release(0.5)
+    assert limiter.limit == pytest.approx(grown * 0.9)
+
+
+def test_high_class_needs_a_valid_token():
+    """Test only requests with a verifiable bearer token get the high priority class"""
+    middleware = AdaptiveConcurrencyMiddleware(None, AdaptiveLimiter(), routes={"/org/stats": "high"})
+    
+    def classify(authorization=None):
+        headers = [(b"authorization", authorization.encode())] if authorization else []
+        return middleware.classify({"method": "GET", "path": "/org/stats", "headers": headers})
+    
+    token = SecurityUtils.create_access_token({"admin_id": "1", "email": "a@test.com"})
+    assert classify(f"Bearer {token}") == HIGH
+    assert classify() == NORMAL
+    assert classify("Bearer made-up") == NORMAL
+    assert classify(f"Bearer {token[:-2]}xx") == NORMAL
+
+
+def test_route_latency_targets():
+    """Test slow-by-design routes are judged by their own target or not at all"""
+    limiter = AdaptiveLimiter(initial_limit=10, latency_target_ms=100)
+    middleware = AdaptiveConcurrencyMiddleware(
+        None, limiter, routes={}, latency_targets={"POST /admin/login": 0, "/org/export": 2000}
+    )
+    login = middleware.latency_target({"method": "POST", "path": "/admin/login"})
+    export = middleware.latency_target({"method": "GET", "path": "/org/export"})
+    assert middleware.latency_target({"method": "GET", "path": "/org/stats"}) is None
+    
+    limiter.in_flight = 3
+    limiter.release(0.5, login)
+    limiter.release(0.5, export)
+    assert limiter.limit > 10
+    limiter.release(0.5)
+    assert limiter.limit < 10
@@ -0,0 +1,35 @@
+from datetime import datetime
+from bson import ObjectId
+from app.utils.conditional import make_etag, is_not_modified, format_http_date, utcnow_ms
+
+
+def test_etag_tracks_updated_at():
+    """Test the ETag is stable per version and changes with updated_at"""
+    org_id = ObjectId()
+    updated_at = datetime(2025, 12, 12, 10, 0, 0, 123000)
+    etag = make_etag(org_id, updated_at)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag(org_id, updated_at)
+    assert etag != make_etag(org_id, datetime(2025, 12, 12, 10, 0, 1))
+    assert utcnow_ms().microsecond % 1000 == 0
+
+
+def test_if_none_match():
+    """Test If-None-Match matching, including lists, weak tags and *"""
+    last_modified = datetime(2025, 12, 12, 10, 0, 0)
+    etag = make_etag("id", last_modified)
+    assert is_not_modified(etag, None, etag, last_modified)
+    assert is_not_modified(f'"other", W/{etag}', None, etag, last_modified)
+    assert is_not_modified("*", None, etag, last_modified)
+    assert not is_not_modified('"other"', None, etag, last_modified)
+    # If-None-Match takes precedence over If-Modified-Since
+    assert not is_not_modified('"other"', format_http_date(last_modified), etag, last_modified)
+
+
+def test_if_modified_since():
+    """Test If-Modified-Since at one-second resolution"""
+    last_modified = datetime(2025, 12, 12, 10, 0, 0, 500000)
+    etag = make_etag("id", last_modified)
+    assert is_not_modified(None, format_http_date(last_modified), etag, last_modified)
+    assert not is_not_modified(None, format_http_date(datetime(2025, 12, 12, 9, 59, 59)), etag, last_modified)
+    assert not is_not_modified(None, "not a date", etag, last_modified)
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from pymongo import _csot
+from pymongo.errors import ServerSelectionTimeoutError
+from starlette.requests import Request
+from app.core.circuit_breaker import CircuitBreaker, OPEN
+from app.core.metrics import metrics
+from app.middleware import error_handler
+from app.middleware.deadline import DeadlineMiddleware
+
+
+def http_scope(path: str, method: str = "GET", headers=None):
+    return {"type": "http", "method": method, "path": path, "headers": headers or []}
+
+
+class Channel:
+    """Fake server side of an ASGI connection"""
+    
+    def __init__(self, disconnect_after: float = None):
+        self.disconnect_after = disconnect_after
+        self.sent = []
+        self._requested = False
+    
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600 if self.disconnect_after is None else self.disconnect_after)
+        return {"type": "http.disconnect"}
+    
+    async def send(self, message):
+        self.sent.append(message)
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_gets_504_and_driver_timeout():
+    """Test a handler past its deadline is cancelled and answered with 504"""
+    seen = {}
+    
+    async def slow_app(scope, receive, send):
+        seen["timeout"] = _csot.get_timeout()
+        await asyncio.sleep(10)
+    
+    middleware = DeadlineMiddleware(slow_app, routes={"GET /slow": 50})
+    before = metrics.get("http_deadline_exceeded_total", route="/slow")
+    channel = Channel()
+    await middleware(http_scope("/slow"), channel.receive, channel.send)
+    
+    assert seen["timeout"] == pytest.approx(0.05)
+    assert channel.sent[0]["status"] == 504
+    assert metrics.get("http_deadline_exceeded_total", route="/slow") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_handler():
+    """Test work stops as soon as the client goes away"""
+    cancelled = asyncio.Event()
+    
+    async def slow_app(scope, receive, send):
+        await receive()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    middleware = DeadlineMiddleware(slow_app, routes={})
+    channel = Channel(disconnect_after=0.01)
+    await asyncio.wait_for(middleware(http_scope("/copy", "PUT"), channel.receive, channel.send), 1)
+    
+    assert cancelled.is_set()
+    assert channel.sent == []
+    assert metrics.get("http_client_disconnects_total", route="/copy") >= 1
+
+
+def test_header_overrides_route_deadline_up_to_cap():
+    """Test the client header replaces the route deadline but cannot exceed the cap"""
+    middleware = DeadlineMiddleware(None, routes={"PUT /org/update": 60_000})
+    assert middleware.budget_ms(http_scope("/org/update", "PUT")) == 60_000
+    assert middleware.budget_ms(http_scope("/org/update", "PUT", [(b"x-request-deadline-ms", b"250")])) == 250
+    assert middleware.budget_ms(http_scope("/org/update", "PUT", [(b"x-request-deadline-ms", b"1e9")])) == 120_000
+    assert middleware.budget_ms(http_scope("/org/update", "PUT", [(b"x-request-deadline-ms", b"soon")])) == 60_000
+
+
+@pytest.mark.asyncio
+async def test_server_selection_timeout_at_deadline_still_trips_breaker(monkeypatch):
+    """Test an unreachable cluster surfacing as a deadline 504 is still recorded by the breaker"""
+    breaker = CircuitBreaker(min_calls=3, open_seconds=60)
+    monkeypatch.setattr(error_handler, "breaker", breaker)
+    request = Request({"type": "http", "method": "GET", "path": "/org/get", "headers": [], "state": {"deadline": 0}})
+    
+    for _ in range(3):
+        response = await error_handler.pymongo_exception_handler(request, ServerSelectionTimeoutError("No servers"))
+        assert response.status_code == 504
+    assert breaker.state == OPEN
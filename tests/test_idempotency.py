@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from app.core.database import db
+from app.repositories.idempotency import IdempotencyRepository
+from app.schemas.organization import DeleteOrganizationRequest
+from app.services.idempotency import IdempotencyService
+
+
+@pytest_asyncio.fixture
+async def idempotency():
+    await db.connect()
+    repo = IdempotencyRepository()
+    await repo.ensure_indexes()
+    yield IdempotencyService(repo)
+    await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_run_once(idempotency):
+    """Test duplicates wait for the in-flight request and replay its response"""
+    key = str(uuid.uuid4())
+    payload = DeleteOrganizationRequest(organization_name="acme_corp")
+    calls = 0
+    
+    async def operation():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"message": "done"}
+    
+    responses = await asyncio.gather(*(
+        idempotency.run("test", key, payload, operation) for _ in range(10)
+    ))
+    assert calls == 1
+    assert all(response.body == b'{"message":"done"}' for response in responses)
+    assert [response.headers["idempotent-replayed"] for response in responses].count("false") == 1
+    
+    # Later retries are answered from the cache, then from the database
+    replay = await idempotency.run("test", key, payload, operation)
+    assert replay.headers["idempotent-replayed"] == "true"
+    idempotency._cache.clear()
+    await idempotency.run("test", key, payload, operation)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_client_errors_replay_and_key_reuse_is_rejected(idempotency):
+    """Test 4xx outcomes are stored and a key cannot be reused for another body"""
+    key = str(uuid.uuid4())
+    
+    async def operation():
+        raise HTTPException(status_code=400, detail="Organization 'acme_corp' already exists")
+    
+    first = await idempotency.run("test", key, DeleteOrganizationRequest(organization_name="acme_corp"), operation)
+    assert first.status_code == 400
+    
+    with pytest.raises(HTTPException) as error:
+        await idempotency.run("test", key, DeleteOrganizationRequest(organization_name="globex"), operation)
+    assert error.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_unexpected_failure_releases_key(idempotency):
+    """Test a failed request leaves the key free for a retry"""
+    key = str(uuid.uuid4())
+    payload = DeleteOrganizationRequest(organization_name="acme_corp")
+    
+    async def failing():
+        raise RuntimeError("boom")
+    
+    async def succeeding():
+        return {"message": "done"}
+    
+    with pytest.raises(RuntimeError):
+        await idempotency.run("test", key, payload, failing)
+    response = await idempotency.run("test", key, payload, succeeding)
+    assert response.status_code == 200
@@ -0,0 +1,58 @@
+from app.middleware.login_throttle import LoginThrottle
+
+
+def test_allows_free_attempts():
+    """Test failures within the free allowance are not locked out"""
+    throttle = LoginThrottle(email_free_attempts=3, ip_free_attempts=10)
+    for _ in range(3):
+        throttle.record_failure("a@test.com", "1.1.1.1")
+    assert throttle.retry_after("a@test.com", "1.1.1.1") == 0
+
+
+def test_exponential_backoff():
+    """Test lockout window doubles with each failure past the allowance"""
+    throttle = LoginThrottle(email_free_attempts=1, ip_free_attempts=100, base_delay=10, max_lockout=60)
+    throttle.record_failure("a@test.com", "1.1.1.1")
+    throttle.record_failure("a@test.com", "1.1.1.1")
+    assert 0 < throttle.retry_after("a@test.com", "1.1.1.1") <= 10
+    throttle.record_failure("a@test.com", "1.1.1.1")
+    assert 10 < throttle.retry_after("A@test.com", "2.2.2.2") <= 20
+    for _ in range(10):
+        throttle.record_failure("a@test.com", "1.1.1.1")
+    assert throttle.retry_after("a@test.com", "2.2.2.2") <= 60
+
+
+def test_ip_lockout_and_success_reset():
+    """Test IP counters lock out across emails and success clears only the email"""
+    throttle = LoginThrottle(email_free_attempts=1, ip_free_attempts=2)
+    throttle.record_failure("a@test.com", "1.1.1.1")
+    throttle.record_failure("b@test.com", "1.1.1.1")
+    throttle.record_failure("c@test.com", "1.1.1.1")
+    assert throttle.retry_after("d@test.com", "1.1.1.1") > 0
+    
+    throttle.record_failure("e@test.com", "3.3.3.3")
+    throttle.record_failure("e@test.com", "3.3.3.3")
+    throttle.record_success("e@test.com", "3.3.3.3")
+    assert throttle.retry_after("e@test.com", "4.4.4.4") == 0
+
+
+def test_evicts_oldest_entries():
+    """Test counter storage stays bounded"""
+    throttle = LoginThrottle(max_entries=4)
+    for i in range(10):
+        throttle.record_failure(f"user{i}@test.com", "1.1.1.1")
+    assert len(throttle.storage) == 4
+
+
+def test_reservations_limit_concurrent_attempts():
+    """Test attempts in flight count against the allowance before any of them fails"""
+    throttle = LoginThrottle(email_free_attempts=2, ip_free_attempts=100, base_delay=10)
+    assert [throttle.reserve("a@test.com", "1.1.1.1") for _ in range(3)] == [0, 0, 0]
+    assert throttle.reserve("a@test.com", "1.1.1.1") > 0
+    
+    # An attempt that ends without a wrong password is given back
+    throttle.release("a@test.com", "1.1.1.1")
+    assert throttle.retry_after("a@test.com", "1.1.1.1") == 0
+    throttle.record_success("a@test.com", "1.1.1.1")
+    assert "email:a@test.com" not in throttle.storage
+    assert throttle.storage["ip:1.1.1.1"].failures == 1
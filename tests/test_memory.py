@@ -0,0 +1,137 @@
+import pytest
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne, InsertOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from app.core.memory import MemoryClient
+
+
+@pytest.fixture
+def collection(request):
+    """Collection in a memory server private to the test"""
+    return MemoryClient(f"memory://{request.node.name}")["test_db"]["items"]
+
+
+@pytest.mark.asyncio
+async def test_crud_and_query_operators(collection):
+    """Test inserts, filters with operators and null semantics"""
+    await collection.insert_many([
+        {"name": "a", "size": 1, "tags": ["x", "y"]},
+        {"name": "b", "size": 5, "deleted_at": None},
+        {"name": "c", "size": 10, "deleted_at": "2024-01-01"}
+    ])
+    
+    assert await collection.count_documents({"deleted_at": None}) == 2
+    assert await collection.count_documents({"size": {"$gte": 5, "$lt": 10}}) == 1
+    assert await collection.count_documents({"tags": "y"}) == 1
+    assert await collection.count_documents({"$or": [{"name": "a"}, {"size": {"$in": [10]}}]}) == 2
+    assert await collection.count_documents({"size": {"$not": {"$gt": 1}}}) == 1
+    
+    result = await collection.update_one({"name": "a"}, {"$set": {"size": 2}, "$unset": {"tags": ""}})
+    assert result.matched_count == 1 and result.modified_count == 1
+    document = await collection.find_one({"name": "a"}, {"_id": 0})
+    assert document == {"name": "a", "size": 2}
+    
+    assert (await collection.delete_many({"size": {"$gt": 1}})).deleted_count == 3
+    assert await collection.count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_cursor_sort_skip_limit_and_batches(collection):
+    """Test cursors order, page and stream results"""
+    await collection.insert_many([{"n": n} for n in range(250)])
+    
+    page = await collection.find({}, {"_id": 0}).sort("n", -1).skip(10).limit(5).to_list(length=None)
+    assert [document["n"] for document in page] == [239, 238, 237, 236, 235]
+    
+    streamed = [document["n"] async for document in collection.find({"n": {"$lt": 120}}, batch_size=50)]
+    assert streamed == list(range(120))
+
+
+@pytest.mark.asyncio
+async def test_unique_index_and_upserts(collection):
+    """Test unique indexes reject duplicates and $inc upserts accumulate"""
+    await collection.create_index([("org", 1), ("day", 1)], unique=True)
+    await collection.insert_one({"org": "acme", "day": 1})
+    with pytest.raises(DuplicateKeyError):
+        await collection.insert_one({"org": "acme", "day": 1})
+    
+    for _ in range(2):
+        await collection.bulk_write([UpdateOne({"org": "globex", "day": 1}, {"$inc": {"requests": 3}}, upsert=True)])
+    assert (await collection.find_one({"org": "globex"}))["requests"] == 6
+    
+    with pytest.raises(BulkWriteError) as error:
+        await collection.bulk_write([InsertOne({"org": "acme", "day": 1}), InsertOne({"org": "acme", "day": 2})], ordered=False)
+    assert error.value.details["nInserted"] == 1
+    assert error.value.details["writeErrors"][0]["code"] == 11000
+
+
+@pytest.mark.asyncio
+async def test_find_one_and_update_returns_requested_version(collection):
+    """Test find_one_and_update returns the document before or after the update"""
+    inserted = await collection.insert_one({"state": "new"})
+    assert isinstance(inserted.inserted_id, ObjectId)
+    
+    before = await collection.find_one_and_update({"state": "new"}, {"$set": {"state": "claimed"}})
+    assert before["state"] == "new"
+    after = await collection.find_one_and_update(
+        {"_id": inserted.inserted_id},
+        {"$set": {"state": "done"}},
+        return_document=ReturnDocument.AFTER
+    )
+    assert after["state"] == "done"
+    assert await collection.find_one_and_update({"state": "new"}, {"$set": {"state": "x"}}) is None
+
+
+@pytest.mark.asyncio
+async def test_collections_and_data_survive_reconnect(request):
+    """Test collection management and that data outlives a client, like a server"""
+    uri = f"memory://{request.node.name}"
+    database = MemoryClient(uri)["test_db"]
+    await database.create_collection("org_acme")
+    await database["org_acme"].insert_one({"k": 1})
+    assert await database.list_collection_names() == ["org_acme"]
+    
+    reconnected = MemoryClient(uri)["test_db"]
+    assert await reconnected["org_acme"].count_documents({}) == 1
+    await reconnected.drop_collection("org_acme")
+    assert await database.list_collection_names() == []
+
+
+@pytest.mark.asyncio
+async def test_coll_stats_and_group(collection):
+    """Test $collStats storage figures and $group sums used for tenant statistics"""
+    with pytest.raises(OperationFailure) as error:
+        await collection.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(length=None)
+    assert error.value.code == 26
+    
+    await collection.insert_many([{"tenant_id": "a", "n": 1}, {"tenant_id": "a", "n": 2}, {"tenant_id": "b", "n": 3}])
+    stats, = await collection.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(length=None)
+    assert stats["storageStats"]["count"] == 3
+    assert stats["storageStats"]["size"] > 0
+    
+    rows = await collection.aggregate([
+        {"$match": {"tenant_id": "a"}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "total": {"$sum": "$n"}, "size": {"$sum": {"$bsonSize": "$$ROOT"}}}}
+    ]).to_list(length=None)
+    assert rows[0]["count"] == 2 and rows[0]["total"] == 3
+    assert rows[0]["size"] < stats["storageStats"]["size"]
+
+
+@pytest.mark.asyncio
+async def test_add_fields_convert_and_lookup(collection):
+    """Test the string-to-ObjectId join used to resolve organizations with their admins"""
+    admins = collection.database["admins"]
+    admin_id = (await admins.insert_one({"email": "a@example.com"})).inserted_id
+    await collection.insert_many([{"name": "linked", "admin_id": str(admin_id)}, {"name": "pending", "admin_id": ""}])
+    
+    rows = await collection.aggregate([
+        {"$addFields": {"admin_oid": {"$convert": {"input": "$admin_id", "to": "objectId", "onError": None}}}},
+        {"$lookup": {"from": "admins", "localField": "admin_oid", "foreignField": "_id", "as": "admin"}},
+        {"$addFields": {"admin_email": {"$first": "$admin.email"}}},
+        {"$project": {"_id": 0, "name": 1, "admin_email": 1}},
+        {"$sort": {"name": 1}}
+    ]).to_list(length=None)
+    assert rows == [{"name": "linked", "admin_email": "a@example.com"}, {"name": "pending", "admin_email": None}]
+    
+    with pytest.raises(OperationFailure):
+        await collection.aggregate([{"$addFields": {"x": {"$convert": {"input": "$name", "to": "objectId"}}}}]).to_list(length=None)
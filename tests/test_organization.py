@@ -1,8 +1,17 @@
+import uuid
+from collections import OrderedDict
+import bson
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from app.main import app
-from app.core.database import db
+from app.core.database import db, Database
+from app.middleware.causal import CAUSAL_COOKIE, decode_token
+from app.middleware.rate_limit import rate_limiter
+from app.core.config import settings
+from app.core.placement import placement
+from app.repositories.tenant import TenantDataRepository
+from app.tools.rebalance import plan_moves
 
 
 async def cleanup_test_data():
@@ -13,7 +22,24 @@ async def cleanup_test_data():
             "test_company_pytest",
             "duplicate_test", 
             "login_test",
-            "get_test"
+            "get_test",
+            "idempotent_test",
+            "searchable_widgets",
+            "stats_test",
+            "index_test",
+            "index_test_renamed",
+            "documents_test",
+            "batch_get_test",
+            "shared_docs_a",
+            "shared_docs_b",
+            "migrate_test",
+            "rerun_test",
+            "paused_test",
+            "rebalance_live",
+            "rebalance_gone",
+            "causal_test",
+            "reuse_alpha",
+            "reuse_beta"
         ]
         
         test_emails = [
@@ -21,9 +47,30 @@ async def cleanup_test_data():
             "dup@test.com",
             "dup2@test.com",
             "login@test.com",
-            "get@test.com"
+            "get@test.com",
+            "idempotent@test.com",
+            "search@test.com",
+            "stats@test.com",
+            "index@test.com",
+            "documents@test.com",
+            "batch@test.com",
+            "shared_a@test.com",
+            "shared_b@test.com",
+            "migrate@test.com",
+            "rerun@test.com",
+            "paused@test.com",
+            "rebalance_live@test.com",
+            "rebalance_gone@test.com",
+            "causal@test.com",
+            "reuse_first@test.com",
+            "reuse_second@test.com"
         ]
         
+        # Delete rows of test organizations kept in the shared collection
+        cursor = master_db.organizations.find({"organization_name": {"$in": test_orgs}}, {"_id": 1})
+        tenant_ids = [str(org["_id"]) async for org in cursor]
+        await master_db[settings.SHARED_TENANT_COLLECTION].delete_many({"tenant_id": {"$in": tenant_ids}})
+        
         for org_name in test_orgs:
             # Delete organization document
             await master_db.organizations.delete_many({"organization_name": org_name})
@@ -39,7 +86,7 @@ async def cleanup_test_data():
             await master_db.admins.delete_many({"email": email})
         
         print("✅ Test data cleaned up successfully")
-        
+    
     except Exception as e:
         print(f"❌ Cleanup error: {e}")
 
@@ -59,6 +106,12 @@ async def setup_database():
     await db.disconnect()
 
 
+@pytest.fixture(autouse=True)
+def reset_rate_limit():
+    """Give every test its own per-IP request budget; the whole module comes from one client IP"""
+    rate_limiter.storage.clear()
+
+
 @pytest.fixture(scope="module")
 def client():
     """Create test client"""
@@ -166,3 +219,429 @@ def test_invalid_password_login(client):
         }
     )
     assert response.status_code == 401
+
+
+def test_conditional_get_organization(client):
+    """Test ETag revalidation returns 304 Not Modified"""
+    response1 = client.get("/org/get?organization_name=get_test")
+    assert response1.status_code == 200
+    etag = response1.headers["etag"]
+    assert "max-age" in response1.headers["cache-control"]
+    
+    response2 = client.get(
+        "/org/get?organization_name=get_test",
+        headers={"If-None-Match": etag}
+    )
+    assert response2.status_code == 304
+    assert response2.headers["etag"] == etag
+    
+    response3 = client.get(
+        "/org/get?organization_name=get_test",
+        headers={"If-Modified-Since": response1.headers["last-modified"]}
+    )
+    assert response3.status_code == 304
+
+
+def test_idempotent_create_replays_response(client):
+    """Test a retried create with the same Idempotency-Key returns the original response"""
+    body = {
+        "organization_name": "idempotent_test",
+        "email": "idempotent@test.com",
+        "password": "IdemPass123"
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    
+    response1 = client.post("/org/create", json=body, headers=headers)
+    assert response1.status_code == 201
+    assert response1.headers["idempotent-replayed"] == "false"
+    
+    response2 = client.post("/org/create", json=body, headers=headers)
+    assert response2.status_code == 201
+    assert response2.headers["idempotent-replayed"] == "true"
+    assert response2.json() == response1.json()
+    
+    # Without the key the retry runs again and hits the duplicate check
+    response3 = client.post("/org/create", json=body)
+    assert response3.status_code == 400
+
+
+def test_search_organizations(client, monkeypatch):
+    """Test operators find a new organization by prefix, by email and despite a typo"""
+    monkeypatch.setattr(settings, "OPERATOR_API_KEY", "operator-secret")
+    response = client.post(
+        "/org/create",
+        json={
+            "organization_name": "searchable_widgets",
+            "email": "search@test.com",
+            "password": "SearchPass123"
+        }
+    )
+    assert response.status_code == 201
+    
+    # Results expose admin emails of every tenant
+    assert client.get("/org/search", params={"q": "searchab"}).status_code == 403
+    headers = {"X-Operator-Key": "operator-secret"}
+    assert client.get("/org/search", params={"q": "se"}, headers=headers).status_code == 422
+    
+    for query, match in (("searchab", "prefix"), ("search@test", "prefix"), ("widgtes", "fuzzy")):
+        response = client.get("/org/search", params={"q": query}, headers=headers)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert {"organization_name": "searchable_widgets", "admin_email": "search@test.com", "match": match} in results
+
+
+def test_organization_stats(client):
+    """Test an admin gets storage statistics for their own organization only"""
+    body = {"organization_name": "stats_test", "email": "stats@test.com", "password": "StatsPass123"}
+    assert client.post("/org/create", json=body).status_code == 201
+    token = client.post("/admin/login", json={"email": body["email"], "password": body["password"]}).json()["access_token"]
+    
+    response = client.get("/org/stats", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["organization_name"] == "stats_test"
+    assert data["count"] == 0
+    
+    # The operator-wide report is off unless OPERATOR_API_KEY is set
+    assert client.get("/org/stats/all", headers={"X-Operator-Key": "guess"}).status_code == 403
+
+
+def test_tenant_indexes_survive_rename(client):
+    """Test declared indexes are built, listed, rebuilt after a rename and dropped"""
+    body = {"organization_name": "index_test", "email": "index@test.com", "password": "IndexPass123"}
+    assert client.post("/org/create", json=body).status_code == 201
+    token = client.post("/admin/login", json={"email": body["email"], "password": body["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    index = {"keys": [{"field": "customer.id", "direction": 1}, {"field": "created_at", "direction": -1}]}
+    response = client.post("/org/indexes", json=index, headers=headers)
+    assert response.status_code == 202
+    assert response.json()["name"] == "customer_id_1_created_at_-1"
+    assert client.post("/org/indexes", json=index, headers=headers).status_code == 409
+    assert client.post("/org/indexes", json={**index, "name": "_id_"}, headers=headers).status_code == 422
+    
+    response = client.put(
+        "/org/update",
+        json={"organization_name": "index_test_renamed", "email": body["email"], "password": body["password"]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    token = client.post("/admin/login", json={"email": body["email"], "password": body["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    listing = client.get("/org/indexes", headers=headers).json()
+    assert listing["organization_name"] == "index_test_renamed"
+    assert [(item["name"], item["status"]) for item in listing["indexes"]] == [("customer_id_1_created_at_-1", "ready")]
+    
+    assert client.delete("/org/indexes/customer_id_1_created_at_-1", headers=headers).status_code == 200
+    assert client.get("/org/indexes", headers=headers).json()["indexes"] == []
+    assert client.delete("/org/indexes/customer_id_1_created_at_-1", headers=headers).status_code == 404
+
+
+def test_tenant_documents(client):
+    """Test bulk writes, keyset-paged queries and raw BSON reads on the tenant collection"""
+    body = {"organization_name": "documents_test", "email": "documents@test.com", "password": "DocumentsPass123"}
+    assert client.post("/org/create", json=body).status_code == 201
+    token = client.post("/admin/login", json={"email": body["email"], "password": body["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    operations = [{"op": "insert", "document": {"sku": f"A-{i}", "qty": i}} for i in range(5)]
+    operations.append({"op": "update", "filter": {"sku": "A-0"}, "update": {"$set": {"qty": 10}}})
+    operations.append({"op": "update", "filter": {"sku": "B-1"}, "update": {"$set": {"qty": 1}}, "upsert": True})
+    operations.append({"op": "delete", "filter": {"sku": "A-4"}})
+    response = client.post("/org/documents/bulk", json={"operations": operations}, headers=headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["inserted_count"], result["modified_count"], result["upserted_count"], result["deleted_count"]) == (5, 1, 1, 1)
+    assert len(result["inserted_ids"]) == 5 and list(result["upserted_ids"]) == ["6"]
+    
+    duplicate = {"op": "insert", "document": {"_id": result["inserted_ids"][1], "sku": "dup"}}
+    result = client.post(
+        "/org/documents/bulk", json={"operations": [duplicate, {"op": "insert", "document": {"sku": "C"}}], "ordered": False}, headers=headers
+    ).json()
+    assert result["inserted_count"] == 1 and [error["index"] for error in result["errors"]] == [0]
+    
+    query = {"filter": {"qty": {"$gte": 1}}, "projection": {"sku": 1}, "batch_size": 2}
+    seen = []
+    while True:
+        page = client.post("/org/documents/query", json=query, headers=headers).json()
+        assert all(set(document) == {"_id", "sku"} for document in page["documents"])
+        seen += [document["sku"] for document in page["documents"]]
+        if not page["next_cursor"]:
+            break
+        query["cursor"] = page["next_cursor"]
+    assert sorted(seen) == ["A-0", "A-1", "A-2", "A-3", "B-1"]
+    
+    bad = {"filter": {"$where": "true"}}
+    assert client.post("/org/documents/query", json=bad, headers=headers).status_code == 400
+    
+    document_id = result["inserted_ids"][0]["$oid"]
+    response = client.get(f"/org/documents/{document_id}", headers={**headers, "Accept": "application/bson"})
+    assert response.headers["content-type"] == "application/bson"
+    assert bson.decode(response.content)["sku"] == "C"
+    assert client.delete(f"/org/documents/{document_id}", headers=headers).status_code == 200
+    assert client.get(f"/org/documents/{document_id}", headers=headers).status_code == 404
+
+
+def test_batch_get_organizations(client):
+    """Test many organizations resolve in one request, with missing names reported per item"""
+    body = {"organization_name": "batch_get_test", "email": "batch@test.com", "password": "BatchPass123"}
+    assert client.post("/org/create", json=body).status_code == 201
+    
+    names = ["batch_get_test", "batch_get_missing", "batch_get_test"]
+    response = client.post("/org/batch-get", json={"names": names})
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["found"], data["missing"]) == (1, 1)
+    assert [(item["organization_name"], item["found"]) for item in data["results"]] == [
+        ("batch_get_test", True), ("batch_get_missing", False)
+    ]
+    assert data["results"][0]["organization"]["admin_email"] == body["email"]
+    assert data["results"][0]["organization"]["collection_name"] == "org_batch_get_test"
+    assert data["results"][1]["organization"] is None
+    
+    too_many = {"names": [f"org_{i}" for i in range(201)]}
+    assert client.post("/org/batch-get", json=too_many).status_code == 400
+
+
+def test_shared_tenant_documents_stay_isolated(client, monkeypatch):
+    """Test tenants in the shared collection cannot read or re-key each other's documents"""
+    monkeypatch.setattr(settings, "TENANCY_MODE", "shared")
+    headers = {}
+    for tenant in ("a", "b"):
+        body = {"organization_name": f"shared_docs_{tenant}", "email": f"shared_{tenant}@test.com", "password": "SharedPass123"}
+        assert client.post("/org/create", json=body).status_code == 201
+        token = client.post("/admin/login", json={"email": body["email"], "password": body["password"]}).json()["access_token"]
+        headers[tenant] = {"Authorization": f"Bearer {token}"}
+    
+    insert = {"operations": [{"op": "insert", "document": {"sku": "a-only"}}]}
+    assert client.post("/org/documents/bulk", json=insert, headers=headers["a"]).json()["inserted_count"] == 1
+    
+    for update in ({"$set": {"tenant_id": "other"}}, {"$rename": {"sku": "tenant_id"}}, {"$unset": {"tenant_id": ""}}):
+        operation = {"op": "update", "filter": {}, "update": update}
+        response = client.post("/org/documents/bulk", json={"operations": [operation]}, headers=headers["a"])
+        assert response.status_code == 400
+    
+    page = client.post("/org/documents/query", json={}, headers=headers["a"]).json()
+    assert [document["sku"] for document in page["documents"]] == ["a-only"]
+    assert "tenant_id" not in page["documents"][0]
+    assert client.post("/org/documents/query", json={}, headers=headers["b"]).json()["documents"] == []
+
+
+def test_document_pages_cross_id_types(client):
+    """Test keyset pages continue past the last _id of one BSON type into the next"""
+    token = client.post(
+        "/admin/login", json={"email": "documents@test.com", "password": "DocumentsPass123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    operations = [{"op": "delete", "filter": {}, "many": True}]
+    operations += [{"op": "insert", "document": document} for document in ({"_id": "a"}, {"_id": "b"}, {}, {}, {"_id": 7})]
+    assert client.post("/org/documents/bulk", json={"operations": operations}, headers=headers).status_code == 200
+    
+    for direction in (1, -1):
+        query = {"batch_size": 2, "direction": direction}
+        ids = []
+        while True:
+            page = client.post("/org/documents/query", json=query, headers=headers).json()
+            ids += [document["_id"] for document in page["documents"]]
+            if not page["next_cursor"]:
+                break
+            query["cursor"] = page["next_cursor"]
+        assert len(ids) == 5
+        # Server order: numbers, then strings, then ObjectIds
+        assert ids[::direction][:3] == [7, "a", "b"]
+
+
+def test_shared_tenants_reuse_document_ids(client, monkeypatch):
+    """Test tenants in the shared collection can pick the same _id without colliding"""
+    monkeypatch.setattr(settings, "TENANCY_MODE", "shared")
+    headers = {}
+    for tenant in ("a", "b"):
+        token = client.post(
+            "/admin/login", json={"email": f"shared_{tenant}@test.com", "password": "SharedPass123"}
+        ).json()["access_token"]
+        headers[tenant] = {"Authorization": f"Bearer {token}"}
+        operations = [
+            {"op": "delete", "filter": {}, "many": True},
+            {"op": "insert", "document": {"_id": "shared-id", "owner": tenant}},
+            {"op": "update", "filter": {"_id": "upserted"}, "update": {"$set": {"owner": tenant}}, "upsert": True}
+        ]
+        result = client.post("/org/documents/bulk", json={"operations": operations}, headers=headers[tenant]).json()
+        assert result["errors"] == []
+        assert result["inserted_ids"] == ["shared-id"]
+        assert result["upserted_ids"] == {"2": "upserted"}
+    
+    for tenant in ("a", "b"):
+        response = client.get("/org/documents/shared-id", headers=headers[tenant])
+        assert response.json() == {"_id": "shared-id", "owner": tenant}
+        query = {"filter": {"_id": {"$gte": "s", "$lt": "t"}}}
+        page = client.post("/org/documents/query", json=query, headers=headers[tenant]).json()
+        assert page["documents"] == [{"_id": "shared-id", "owner": tenant}]
+    
+    assert client.delete("/org/documents/shared-id", headers=headers["a"]).status_code == 200
+    assert client.get("/org/documents/shared-id", headers=headers["b"]).json()["owner"] == "b"
+    
+    operation = {"op": "update", "filter": {}, "update": {"$set": {"_id": "moved"}}}
+    assert client.post("/org/documents/bulk", json={"operations": [operation]}, headers=headers["b"]).status_code == 400
+
+
+def test_migrate_tenancy_round_trip(client):
+    """Test data keeps its ids and content moving into the shared collection and back"""
+    body = {"organization_name": "migrate_test", "email": "migrate@test.com", "password": "MigratePass123"}
+    assert client.post("/org/create", json=body).status_code == 201
+    token = client.post("/admin/login", json={"email": body["email"], "password": body["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    documents = [{"_id": "text"}, {"_id": 7, "nested": {"n": 1}}, {"_id": {"$oid": "65f000000000000000000001"}}]
+    operations = [{"op": "insert", "document": document} for document in documents]
+    assert client.post("/org/documents/bulk", json={"operations": operations}, headers=headers).status_code == 200
+    
+    def all_documents():
+        return client.post("/org/documents/query", json={}, headers=headers).json()["documents"]
+    
+    before = all_documents()
+    assert len(before) == 3
+    org_service = client.app.state.container.org_service
+    for tenancy in ("shared", "collection"):
+        assert client.portal.call(org_service.migrate_tenancy, "migrate_test", tenancy) == 3
+        assert all_documents() == before
+
+
+def test_rerun_relocation_replaces_stale_copy(client):
+    """Test re-running a relocation drops what an interrupted earlier run left in the target"""
+    body = {"organization_name": "rerun_test", "email": "rerun@test.com", "password": "RerunPass123"}
+    assert client.post("/org/create", json=body).status_code == 201
+    token = client.post("/admin/login", json={"email": body["email"], "password": body["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    operation = {"op": "insert", "document": {"_id": "text", "version": "fresh"}}
+    assert client.post("/org/documents/bulk", json={"operations": [operation]}, headers=headers).status_code == 200
+    
+    # An earlier attempt copied the document before it was last changed
+    org_service = client.app.state.container.org_service
+    org = client.portal.call(org_service.repo.get_by_name, "rerun_test")
+    target = TenantDataRepository({**org, "tenancy": "shared", "collection_name": settings.SHARED_TENANT_COLLECTION})
+    client.portal.call(target.provision)
+    client.portal.call(target.collection.insert_one, target.tag({"_id": "text", "version": "stale"}))
+    
+    assert client.portal.call(org_service.migrate_tenancy, "rerun_test", "shared") == 1
+    document = client.get("/org/documents/text", headers=headers).json()
+    assert document == {"_id": "text", "version": "fresh"}
+
+
+def test_writes_pause_while_tenant_data_moves(client, monkeypatch):
+    """Test document and index writes are refused while a copy runs and resume after it"""
+    body = {"organization_name": "paused_test", "email": "paused@test.com", "password": "PausedPass123"}
+    assert client.post("/org/create", json=body).status_code == 201
+    token = client.post("/admin/login", json={"email": body["email"], "password": body["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    insert = {"operations": [{"op": "insert", "document": {"_id": "kept"}}]}
+    assert client.post("/org/documents/bulk", json=insert, headers=headers).status_code == 200
+    
+    org_service = client.app.state.container.org_service
+    refused = []
+    sync_collection_data = org_service._sync_collection_data
+    
+    async def failing_sync(old_org, new_org, batch_size=None):
+        org = await org_service.repo.get_by_id(str(old_org["_id"]), primary=True)
+        refused.append(org.get("migrating_at") is not None)
+        raise RuntimeError("copy interrupted")
+    
+    monkeypatch.setattr(org_service, "_sync_collection_data", failing_sync)
+    with pytest.raises(RuntimeError):
+        client.portal.call(org_service.migrate_tenancy, "paused_test", "shared")
+    assert refused == [True]
+    # An abandoned copy lifts the pause; the source is still authoritative
+    assert client.post("/org/documents/bulk", json=insert, headers=headers).status_code == 200
+    
+    org = client.portal.call(org_service.repo.get_by_name, "paused_test")
+    client.portal.call(org_service.repo.update_organization, str(org["_id"]), {"migrating_at": org["created_at"]})
+    response = client.post("/org/documents/bulk", json=insert, headers=headers)
+    assert response.status_code == 503 and "Retry-After" in response.headers
+    assert client.delete("/org/documents/kept", headers=headers).status_code == 503
+    assert client.post("/org/indexes", json={"keys": [{"field": "a"}]}, headers=headers).status_code == 503
+    assert client.get("/org/documents/kept", headers=headers).status_code == 200
+    
+    monkeypatch.setattr(org_service, "_sync_collection_data", sync_collection_data)
+    assert client.portal.call(org_service.migrate_tenancy, "paused_test", "shared") == 1
+    assert client.delete("/org/documents/kept", headers=headers).status_code == 200
+
+
+def test_rebalance_plan_skips_deleted_organizations(client, monkeypatch):
+    """Test the rebalance plan lists live misplaced tenants only"""
+    for name in ("rebalance_live", "rebalance_gone"):
+        body = {"organization_name": name, "email": f"{name}@test.com", "password": "RebalancePass123"}
+        assert client.post("/org/create", json=body).status_code == 201
+    org_service = client.app.state.container.org_service
+    gone = client.portal.call(org_service.repo.get_by_name, "rebalance_gone")
+    assert client.portal.call(org_service.repo.tombstone_organization, str(gone["_id"]))
+    
+    monkeypatch.setattr(placement, "default_target_for", lambda org_name: "elsewhere")
+    moves = client.portal.call(plan_moves, org_service)
+    names = [org_name for org_name, _, desired in moves]
+    assert "rebalance_live" in names and "rebalance_gone" not in names
+
+
+def test_reads_follow_writes_across_workers(client, monkeypatch):
+    """Test a client's reads wait for its own writes on workers that did not serve them"""
+    body = {"organization_name": "causal_test", "email": "causal@test.com", "password": "CausalPass123"}
+    assert client.post("/org/create", json=body).status_code == 201
+    cluster_time, write_time = decode_token(client.cookies[CAUSAL_COOKIE])
+    
+    # The worker serving the reads never saw the write
+    monkeypatch.setattr(Database, "_causal_tokens", OrderedDict())
+    repo = client.app.state.container.org_service.repo
+    get_by_name = repo.get_by_name
+    read_times = []
+    
+    async def recording_get_by_name(org_name, session=None, **kwargs):
+        read_times.append(session.operation_time if session is not None else None)
+        return await get_by_name(org_name, session=session, **kwargs)
+    
+    monkeypatch.setattr(repo, "get_by_name", recording_get_by_name)
+    params = {"organization_name": "causal_test"}
+    assert client.get("/org/get", params=params).status_code == 200
+    assert read_times[-1] >= write_time
+    
+    # Without the token, or with a tampered one, reads are not held to the write
+    client.cookies.set(CAUSAL_COOKIE, client.cookies[CAUSAL_COOKIE][:-2] + "AA")
+    assert client.get("/org/get", params=params).status_code == 200
+    client.cookies.delete(CAUSAL_COOKIE)
+    assert client.get("/org/get", params=params).status_code == 200
+    assert read_times[-2:] == [None, None]
+
+
+def test_stale_token_cannot_reach_reused_name(client):
+    """Test a token issued before a rename does not reach a new organization with the old name"""
+    first = {"organization_name": "reuse_alpha", "email": "reuse_first@test.com", "password": "ReuseFirst123"}
+    assert client.post("/org/create", json=first).status_code == 201
+    token = client.post("/admin/login", json={"email": first["email"], "password": first["password"]}).json()["access_token"]
+    stale = {"Authorization": f"Bearer {token}"}
+    insert = {"operations": [{"op": "insert", "document": {"owner": "first"}}]}
+    assert client.post("/org/documents/bulk", json=insert, headers=stale).status_code == 200
+    
+    rename = {**first, "organization_name": "reuse_beta"}
+    assert client.put("/org/update", json=rename, headers=stale).status_code == 200
+    second = {"organization_name": "reuse_alpha", "email": "reuse_second@test.com", "password": "ReuseSecond123"}
+    assert client.post("/org/create", json=second).status_code == 201
+    token = client.post("/admin/login", json={"email": second["email"], "password": second["password"]}).json()["access_token"]
+    fresh = {"Authorization": f"Bearer {token}"}
+    insert = {"operations": [{"op": "insert", "document": {"owner": "second"}}]}
+    assert client.post("/org/documents/bulk", json=insert, headers=fresh).status_code == 200
+    
+    assert client.post("/org/documents/query", json={}, headers=stale).status_code == 401
+    assert client.post("/org/documents/bulk", json=insert, headers=stale).status_code == 401
+    index = {"keys": [{"field": "owner"}]}
+    assert client.post("/org/indexes", json=index, headers=stale).status_code == 401
+    assert client.get("/org/indexes", headers=stale).status_code == 401
+    assert client.delete("/org/indexes/owner_1", headers=stale).status_code == 401
+    assert client.get("/org/stats", headers=stale).status_code == 401
+    
+    # A fresh login reaches the renamed organization and its own data
+    token = client.post("/admin/login", json={"email": first["email"], "password": first["password"]}).json()["access_token"]
+    page = client.post("/org/documents/query", json={}, headers={"Authorization": f"Bearer {token}"}).json()
+    assert [document["owner"] for document in page["documents"]] == ["first"]
+    
+    # Usage history stays with the renamed organization
+    (today,) = client.get("/org/usage", headers=fresh).json()["days"]
+    assert today["requests"] == 1
+    (today,) = client.get("/org/usage", headers={"Authorization": f"Bearer {token}"}).json()["days"]
+    assert today["requests"] > 1
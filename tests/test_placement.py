@@ -0,0 +1,30 @@
+import pytest
+from app.core.placement import PlacementRouter, DEFAULT_TARGET
+
+
+def test_single_target_without_configuration():
+    """Test every tenant lands on the master database when no targets are configured"""
+    router = PlacementRouter([])
+    assert router.default_target_for("acme_corp") == DEFAULT_TARGET
+    assert router.target_names() == [DEFAULT_TARGET]
+
+
+def test_consistent_hashing_spreads_and_is_stable():
+    """Test placement is deterministic and adding a target only moves some tenants"""
+    targets = [{"name": "a", "database": "db_a"}, {"name": "b", "database": "db_b"}]
+    router = PlacementRouter(targets)
+    names = [f"org_{i}" for i in range(1000)]
+    before = {name: router.default_target_for(name) for name in names}
+    assert set(before.values()) == {"a", "b"}
+    assert before == {name: PlacementRouter(targets).default_target_for(name) for name in names}
+
+    grown = PlacementRouter(targets + [{"name": "c", "database": "db_c"}])
+    moved = [name for name in names if grown.default_target_for(name) != before[name]]
+    assert all(grown.default_target_for(name) == "c" for name in moved)
+    assert len(moved) < len(names) / 2
+
+
+def test_reserved_target_name():
+    """Test the master target name cannot be redefined"""
+    with pytest.raises(ValueError):
+        PlacementRouter([{"name": DEFAULT_TARGET, "database": "other"}])
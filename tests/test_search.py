@@ -0,0 +1,47 @@
+from app.utils.search_index import SearchIndex, edit_distance
+
+
+def build_index():
+    index = SearchIndex()
+    index.upsert("1", "acme_corp", "admin@acme.com")
+    index.upsert("2", "acme", "ops@acme.io")
+    index.upsert("3", "globex", "root@globex.com")
+    return index
+
+
+def test_exact_match_ranks_before_prefix_matches():
+    """Test exact names come first, then shorter prefix completions"""
+    results = build_index().search("acme")
+    assert [hit["organization_name"] for hit in results] == ["acme", "acme_corp"]
+    assert [hit["match"] for hit in results] == ["exact", "exact"]
+    
+    results = build_index().search("acm")
+    assert [hit["organization_name"] for hit in results] == ["acme", "acme_corp"]
+    assert results[0]["match"] == "prefix"
+
+
+def test_typos_match_within_edit_distance():
+    """Test misspelt names and partially typed names with a typo are found"""
+    index = build_index()
+    assert [hit["organization_name"] for hit in index.search("glbex")] == ["globex"]
+    assert index.search("glbex")[0]["match"] == "fuzzy"
+    assert [hit["organization_name"] for hit in index.search("gloeb")] == ["globex"]
+    assert index.search("zzzz") == []
+
+
+def test_upsert_and_remove_update_the_index():
+    """Test renames replace the old terms and deletes drop the record"""
+    index = build_index()
+    index.upsert("3", "initech", "root@initech.com")
+    assert index.search("globex") == []
+    assert index.search("initech")[0]["organization_name"] == "initech"
+    
+    index.remove("3")
+    assert index.search("initech") == []
+    assert len(index) == 2
+
+
+def test_edit_distance_gives_up_past_limit():
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 1) == 2
+    assert edit_distance("gloeb", "globe", 1) == 1
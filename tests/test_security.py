@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app import server
+from app.core.config import Settings, settings
+from app.services.auth import AuthService
+from app.utils.security import SecurityUtils
+
+
+def test_hash_uses_configured_rounds(monkeypatch):
+    """Test new hashes use the configured bcrypt cost"""
+    monkeypatch.setattr(SecurityUtils, "bcrypt_rounds", 4)
+    hashed = SecurityUtils.hash_password("Password123")
+    assert SecurityUtils.get_rounds(hashed) == 4
+    assert SecurityUtils.verify_password("Password123", hashed)
+    assert not SecurityUtils.needs_rehash(hashed)
+    
+    monkeypatch.setattr(SecurityUtils, "bcrypt_rounds", 5)
+    assert SecurityUtils.needs_rehash(hashed)
+    
+    # A stronger hash than configured is kept
+    monkeypatch.setattr(SecurityUtils, "bcrypt_rounds", 3)
+    assert not SecurityUtils.needs_rehash(hashed)
+
+
+def test_calibrate_rounds_respects_bounds():
+    """Test calibration never goes below the minimum cost"""
+    assert SecurityUtils.calibrate_rounds(target_ms=0, min_rounds=4) == 4
+    assert SecurityUtils.calibrate_rounds(target_ms=10_000, min_rounds=4, max_rounds=6) == 6
+
+
+def test_calibration_is_shared_with_workers(monkeypatch):
+    """Test the supervisor hands its calibrated cost to workers through the environment"""
+    monkeypatch.setattr(settings, "BCRYPT_TARGET_HASH_MS", 0)
+    monkeypatch.setattr(settings, "BCRYPT_MIN_ROUNDS", 4)
+    monkeypatch.setenv("BCRYPT_CALIBRATE", "true")
+    monkeypatch.delenv("BCRYPT_ROUNDS", raising=False)
+    assert server.calibrate_bcrypt() == 4
+    
+    worker_settings = Settings()
+    assert worker_settings.BCRYPT_ROUNDS == 4
+    assert not worker_settings.BCRYPT_CALIBRATE
+
+
+@pytest.mark.asyncio
+async def test_password_work_runs_on_the_service_executor(monkeypatch):
+    """Test bcrypt is run on the container's executor rather than the event loop thread"""
+    monkeypatch.setattr(SecurityUtils, "bcrypt_rounds", 4)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-hash")
+    service = AuthService(repo=object(), executor=executor)
+    threads = []
+    verify_password = SecurityUtils.verify_password
+    
+    def recording_verify(password, hashed):
+        threads.append(threading.current_thread().name)
+        return verify_password(password, hashed)
+    
+    monkeypatch.setattr(SecurityUtils, "verify_password", recording_verify)
+    hashed = await service._hash_password("Password123")
+    assert await service._verify_password("Password123", hashed)
+    assert threads[0].startswith("password-hash")
+    executor.shutdown()
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from app.utils.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_result():
+    """Test identical concurrent calls run the function once"""
+    flight = SingleFlight()
+    calls = 0
+    
+    async def lookup():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"organization_name": "acme_corp"}
+    
+    results = await asyncio.gather(*(flight.do("acme_corp", lookup) for _ in range(50)))
+    assert calls == 1
+    assert all(result == {"organization_name": "acme_corp"} for result in results)
+    assert flight.in_flight() == 0
+    
+    await flight.do("acme_corp", lookup)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_and_key_is_released():
+    """Test a failed call reaches every waiter and does not stick"""
+    flight = SingleFlight()
+    
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+    
+    results = await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    """Test cancelling one caller leaves the shared call running for the rest"""
+    flight = SingleFlight()
+    
+    async def lookup():
+        await asyncio.sleep(0.05)
+        return 42
+    
+    first = asyncio.ensure_future(flight.do("k", lookup))
+    second = asyncio.ensure_future(flight.do("k", lookup))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == 42
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_last_cancelled_waiter_cancels_shared_call():
+    """Test the shared call stops once every caller has gone"""
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+    
+    async def lookup():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    callers = [asyncio.ensure_future(flight.do("k", lookup)) for _ in range(2)]
+    await started.wait()
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.in_flight() == 0
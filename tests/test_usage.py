@@ -0,0 +1,67 @@
+import pytest
+from app.services.usage import UsageService
+
+
+class RecordingUsageRepository:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.batches = []
+    
+    async def increment_many(self, counters, names):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.batches.append((counters, names))
+        return len(counters)
+    
+    async def get_usage(self, org_id, since):
+        return []
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_aggregated_counters_once():
+    """Test requests are summed in memory and written in one batch"""
+    repo = RecordingUsageRepository()
+    usage = UsageService(repo)
+    usage.record("org-1", "acme_corp", 12.5, 100, error=False)
+    usage.record("org-1", "acme_corp", 30.0, 50, error=True)
+    usage.record("org-2", "globex", 5.0, 10, error=False)
+    
+    assert await usage.flush() == 2
+    assert len(repo.batches) == 1
+    counters = {org_id: values for (org_id, _), values in repo.batches[0][0].items()}
+    assert counters["org-1"] == {"requests": 2, "errors": 1, "latency_ms_sum": 42, "bytes_out": 150}
+    assert await usage.flush() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_counters():
+    """Test counters survive a failed write and merge with new ones"""
+    repo = RecordingUsageRepository(fail=True)
+    usage = UsageService(repo)
+    usage.record("org-1", "acme_corp", 10.0, 100, error=False)
+    assert await usage.flush() == 0
+    
+    repo.fail = False
+    usage.record("org-1", "acme_corp", 10.0, 100, error=False)
+    assert await usage.flush() == 1
+    (values,) = repo.batches[0][0].values()
+    assert values["requests"] == 2 and values["bytes_out"] == 200
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_organization_id_across_renames():
+    """Test a renamed organization keeps its counters and a reused name starts empty"""
+    repo = RecordingUsageRepository()
+    usage = UsageService(repo)
+    usage.record("org-1", "acme_corp", 10.0, 100, error=False)
+    usage.record("org-1", "acme_renamed", 10.0, 100, error=False)
+    usage.record("org-2", "acme_corp", 10.0, 100, error=False)
+    
+    (renamed,) = await usage.get_usage("org-1", 1)
+    assert renamed["requests"] == 2
+    (reused,) = await usage.get_usage("org-2", 1)
+    assert reused["requests"] == 1
+    
+    assert await usage.flush() == 2
+    counters, names = repo.batches[0]
+    assert names == {"org-1": "acme_renamed", "org-2": "acme_corp"}